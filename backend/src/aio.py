@@ -0,0 +1,98 @@
+"""Event-loop helpers: off-loop file I/O and a loop-lag monitor.
+
+Async handlers must not touch the filesystem directly — one slow disk read
+stalls every concurrent request, including open SSE chat streams. `run_io()`
+runs a blocking call on a small dedicated thread pool, kept separate from the
+default executor (which `asyncio.to_thread` shares with agent calls) so a burst
+of LLM work cannot starve file reads and vice versa.
+
+`LoopLagMonitor` measures how late a periodic timer fires. Anything above the
+threshold means some code held the event loop; those stalls are logged and
+kept for GET /api/admin/loop-lag.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from src.config import IO_WORKERS, LOOP_LAG_THRESHOLD_MS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="pulse-io")
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking `fn(*args, **kwargs)` on the I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(fn, *args, **kwargs))
+
+
+# ---------------------------------------------------------------------------
+# Loop-lag monitor
+# ---------------------------------------------------------------------------
+
+class LoopLagMonitor:
+    """Samples event-loop responsiveness and records stalls over a threshold."""
+
+    def __init__(
+        self,
+        threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+        interval: float = 0.1,
+        keep: int = 50,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.interval = interval
+        self.samples = 0
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self.recent: deque[dict] = deque(maxlen=keep)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record((loop.time() - start - self.interval) * 1000)
+
+    def record(self, lag_ms: float) -> None:
+        self.samples += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms >= self.threshold_ms:
+            self.stalls += 1
+            self.recent.append({"time": round(time.time(), 3), "lag_ms": round(lag_ms, 1)})
+            logger.warning("Event loop blocked for %.0f ms", lag_ms)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "threshold_ms": self.threshold_ms,
+            "samples": self.samples,
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "recent_stalls": list(self.recent),
+        }
+
+
+lag_monitor = LoopLagMonitor()
@@ -0,0 +1,381 @@
+"""Batch BPMN parsing as resumable background jobs.
+
+Migrating a process library means parsing hundreds of descriptions. A batch
+is submitted once (POST /api/bpmn/batches) and runs as a `src.jobs.Job`:
+
+  - items are parsed by up to `concurrency` worker threads; structured text
+    goes through the rule-based parser and known text through the parse
+    cache, so only the rest reach the LLM
+  - LLM calls share a token-bucket `RateLimiter` (BPMN_BATCH_RPM requests
+    per minute across all batches; every request of a parse counts, including
+    tier escalations and retries); a rate-limited or unavailable response
+    (503) backs the limiter off and the item is retried up to
+    BPMN_BATCH_MAX_ATTEMPTS times, while invalid input (422) fails the item
+    at once
+  - every finished item is written to SQLite (BPMN_BATCH_DB_PATH) and
+    emitted as an "item" job event carrying its index, id, status, source,
+    attempts and error, so clients follow progress as items complete; the
+    XML and JSON stay in the database (GET /batches/{id}/items) rather than
+    in the jobs held in memory
+  - batches still queued or running at startup are resumed: items already
+    in the database are not parsed again
+  - only the last HISTORY_SIZE jobs are held in memory; older or
+    pre-restart batches are still served from the database
+    (`describe`, `stored_events`)
+
+A failed item never fails the batch; the job result counts successes and
+failures.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from src.bpmn.cache import ParseCache
+from src.bpmn.generator import generate_bpmn_xml
+from src.bpmn.parser import parse_process_text
+from src.bpmn.rules import parse_structured
+from src.jobs import Job, JobCancelled
+
+HISTORY_SIZE = 20
+RETRY_BACKOFF_S = 5.0   # first retry delay; doubles per attempt
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id          TEXT PRIMARY KEY,
+    status      TEXT NOT NULL,
+    concurrency INTEGER NOT NULL,
+    created_by  TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    error       TEXT
+);
+CREATE TABLE IF NOT EXISTS batch_items (
+    batch_id     TEXT NOT NULL,
+    position     INTEGER NOT NULL,
+    item_id      TEXT NOT NULL,
+    text         TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    source       TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    process_json TEXT,
+    bpmn_xml     TEXT,
+    finished_at  REAL,
+    PRIMARY KEY (batch_id, position)
+);
+"""
+
+# What an "item" event carries; the XML and JSON are fetched from the store
+_EVENT_FIELDS = ("index", "id", "status", "source", "attempts", "error")
+
+
+def _summary(item: dict) -> dict:
+    return {key: item.get(key) for key in _EVENT_FIELDS}
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `per_minute` acquisitions per minute."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until the caller may make a request; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def backoff(self, seconds: float) -> None:
+        """Hold every caller for `seconds` (e.g. after the API reports a rate limit)."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class BatchStore:
+    """SQLite persistence of batches and their per-item results."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the router never creates the file
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def create(self, batch_id: str, items: list[dict], concurrency: int, created_by: str) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "INSERT INTO batches (id, status, concurrency, created_by, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?)",
+                (batch_id, concurrency, created_by, time.time()),
+            )
+            db.executemany(
+                "INSERT INTO batch_items (batch_id, position, item_id, text) VALUES (?, ?, ?, ?)",
+                [(batch_id, i, item["id"], item["text"]) for i, item in enumerate(items)],
+            )
+
+    def set_status(self, batch_id: str, status: str, error: str | None = None) -> None:
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE batches SET status = ?, error = ? WHERE id = ?", (status, error, batch_id)
+            )
+
+    def get(self, batch_id: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT id, status, concurrency, created_by, created_at, error "
+                "FROM batches WHERE id = ?",
+                (batch_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "status", "concurrency", "created_by", "created_at", "error")
+        return dict(zip(keys, row))
+
+    def unfinished(self) -> list[dict]:
+        """Batches that were queued or running when the process stopped."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT id, concurrency, created_by FROM batches "
+                "WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [{"id": r[0], "concurrency": r[1], "created_by": r[2]} for r in rows]
+
+    def pending(self, batch_id: str) -> list[tuple[int, str, str]]:
+        """(position, item_id, text) of items without a result yet."""
+        with self._lock:
+            return self._db().execute(
+                "SELECT position, item_id, text FROM batch_items "
+                "WHERE batch_id = ? AND status = 'pending' ORDER BY position",
+                (batch_id,),
+            ).fetchall()
+
+    def save_result(self, batch_id: str, position: int, result: dict) -> None:
+        process_json = result.get("process_json")
+        with self._lock, self._db() as db:
+            db.execute(
+                "UPDATE batch_items SET status = ?, source = ?, attempts = ?, error = ?, "
+                "process_json = ?, bpmn_xml = ?, finished_at = ? "
+                "WHERE batch_id = ? AND position = ?",
+                (
+                    result["status"], result.get("source"), result["attempts"],
+                    result.get("error"),
+                    json.dumps(process_json, ensure_ascii=False) if process_json else None,
+                    result.get("bpmn_xml"), time.time(), batch_id, position,
+                ),
+            )
+
+    def counts(self, batch_id: str) -> dict:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT status, COUNT(*) FROM batch_items WHERE batch_id = ? GROUP BY status",
+                (batch_id,),
+            ).fetchall()
+        counts = {"pending": 0, "succeeded": 0, "failed": 0, **dict(rows)}
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def items(self, batch_id: str, offset: int = 0, limit: int = 100,
+              status: str | None = None) -> list[dict]:
+        query = (
+            "SELECT position, item_id, status, source, attempts, error, process_json, bpmn_xml "
+            "FROM batch_items WHERE batch_id = ?"
+        )
+        args: list = [batch_id]
+        if status:
+            query += " AND status = ?"
+            args.append(status)
+        query += " ORDER BY position LIMIT ? OFFSET ?"
+        args += [limit, offset]
+        with self._lock:
+            rows = self._db().execute(query, args).fetchall()
+        return [
+            {
+                "index": r[0], "id": r[1], "status": r[2], "source": r[3], "attempts": r[4],
+                "error": r[5], "process_json": json.loads(r[6]) if r[6] else None,
+                "bpmn_xml": r[7],
+            }
+            for r in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class BatchJobManager:
+    """Runs batches as jobs, persisting results to a BatchStore."""
+
+    def __init__(
+        self,
+        store: BatchStore,
+        limiter: RateLimiter,
+        cache: ParseCache | None = None,
+        max_attempts: int = 3,
+        history_size: int = HISTORY_SIZE,
+    ) -> None:
+        self.store = store
+        self.limiter = limiter
+        self.cache = cache
+        self.max_attempts = max_attempts
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+
+    def submit(self, items: list[dict], concurrency: int, created_by: str) -> Job:
+        """Persist a new batch of {"id", "text"} items and start parsing it."""
+        job = Job("bpmn-batch", {"items": len(items), "concurrency": concurrency})
+        self.store.create(job.id, items, concurrency, created_by)
+        return self._start(job, concurrency)
+
+    def resume(self) -> list[Job]:
+        """Restart every batch left unfinished by a previous process."""
+        jobs = []
+        for batch in self.store.unfinished():
+            job = Job("bpmn-batch", {"concurrency": batch["concurrency"], "resumed": True})
+            job.id = batch["id"]
+            jobs.append(self._start(job, batch["concurrency"]))
+        return jobs
+
+    def get(self, batch_id: str) -> Job | None:
+        return self._jobs.get(batch_id)
+
+    def history(self) -> list[Job]:
+        """Jobs newest first."""
+        return list(reversed(self._jobs.values()))
+
+    def describe(self, batch_id: str) -> dict | None:
+        """The batch as Job.to_dict(), from memory or, once evicted, the database."""
+        job = self.get(batch_id)
+        if job is not None:
+            return job.to_dict()
+        batch = self.store.get(batch_id)
+        if batch is None:
+            return None
+        return {
+            "id": batch["id"],
+            "kind": "bpmn-batch",
+            "status": batch["status"],
+            "params": {"concurrency": batch["concurrency"]},
+            "created_at": batch["created_at"],
+            "started_at": None,
+            "finished_at": None,
+            "duration_s": None,
+            "result": self.store.counts(batch_id),
+            "error": batch["error"],
+        }
+
+    def stored_events(self, batch_id: str, since: int = 0) -> list[dict]:
+        """Job-style events replayed from the database for a batch not in memory:
+        one "item" per finished item, then the batch's final status."""
+        batch = self.store.get(batch_id)
+        if batch is None:
+            return []
+        events = []
+        offset = 0
+        while page := self.store.items(batch_id, offset, 500):
+            events += [
+                {"event": "item", **_summary(item)} for item in page if item["status"] != "pending"
+            ]
+            offset += len(page)
+        events.append({"event": batch["status"], "error": batch["error"]})
+        for seq, event in enumerate(events, 1):
+            event["seq"] = seq
+        return events[since:]
+
+    def _start(self, job: Job, concurrency: int) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history_size:
+                self._jobs.popitem(last=False)
+
+        def _target() -> None:
+            job.run(lambda j: self._run(j, concurrency))
+            self.store.set_status(job.id, job.status, job.error)
+
+        threading.Thread(target=_target, name=f"bpmn-batch-{job.id}", daemon=True).start()
+        return job
+
+    # -- worker side ---------------------------------------------------------
+
+    def _run(self, job: Job, concurrency: int) -> dict:
+        self.store.set_status(job.id, "running")
+        pending = self.store.pending(job.id)
+        counts = self.store.counts(job.id)
+        job.emit("progress", total=counts["total"], remaining=len(pending))
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [pool.submit(self._process, job, *item) for item in pending]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is not None:
+                        job.emit("item", **_summary(result))
+                    job.check_cancelled()
+            except JobCancelled:
+                for future in futures:
+                    future.cancel()
+                raise
+        return self.store.counts(job.id)
+
+    def _process(self, job: Job, position: int, item_id: str, text: str) -> dict | None:
+        try:
+            job.check_cancelled()
+        except JobCancelled:
+            return None
+        result: dict = {"index": position, "id": item_id, "attempts": 0}
+        while True:
+            result["attempts"] += 1
+            try:
+                result.update(self._parse(text), status="succeeded")
+                break
+            except HTTPException as exc:
+                retryable = exc.status_code == 503 and result["attempts"] < self.max_attempts
+                if not retryable:
+                    result.update(status="failed", error=str(exc.detail))
+                    break
+                delay = RETRY_BACKOFF_S * 2 ** (result["attempts"] - 1)
+                self.limiter.backoff(delay)
+            except Exception as exc:  # recorded per item; the batch carries on
+                result.update(status="failed", error=str(exc))
+                break
+        self.store.save_result(job.id, position, result)
+        return result
+
+    def _parse(self, text: str) -> dict:
+        """Parse one item, calling the LLM (rate limited) only when needed."""
+        process_flow = parse_structured(text)
+        source = "rules"
+        if process_flow is None and self.cache is not None:
+            cached = self.cache.get(text)
+            if cached is not None:
+                return {**cached, "source": "cache"}
+        if process_flow is None:
+            process_flow = parse_process_text(text, throttle=self.limiter.acquire)
+            source = "llm"
+        process_json = process_flow.model_dump()
+        bpmn_xml = generate_bpmn_xml(process_flow)
+        if source == "llm" and self.cache is not None:
+            self.cache.put(text, process_json, bpmn_xml)
+        return {"process_json": process_json, "bpmn_xml": bpmn_xml, "source": source}
@@ -0,0 +1,135 @@
+"""Content-addressed cache of BPMN parse results.
+
+Parsing calls the LLM and then the XML generator, so the same template text
+or a re-click costs seconds and a Groq request every time. Results are keyed by
+sha256 of the normalised input text (whitespace collapsed, lower-cased) plus
+the models that may produce it (`tiers.model_key()`), a hash of the parser
+prompt and the generator's XML_VERSION, so editing the prompt, switching
+either model, retuning the tiers or changing the layout invalidates old
+entries without a manual flush.
+
+Two tiers:
+  - an in-memory LRU of recent results
+  - a SQLite table (BPMN_CACHE_PATH) that survives restarts and is shared by
+    every worker process
+
+Each entry holds the validated ProcessFlow JSON and the generated XML, i.e.
+exactly what POST /api/bpmn/parse returns.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from src.bpmn.generator import XML_VERSION
+from src.bpmn.parser import PARSER_SYSTEM_PROMPT
+
+PROMPT_VERSION = hashlib.sha256(PARSER_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parses (
+    key          TEXT PRIMARY KEY,
+    process_json TEXT NOT NULL,
+    bpmn_xml     TEXT NOT NULL,
+    created_at   REAL NOT NULL
+)
+"""
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace and case so trivially different inputs share a key."""
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+def parse_cache_key(
+    text: str,
+    model: str,
+    prompt_version: str = PROMPT_VERSION,
+    xml_version: str = XML_VERSION,
+) -> str:
+    """Return the cache key for parsing `text` with `model`, the given prompt and generator."""
+    raw = f"{model}\0{prompt_version}\0{xml_version}\0{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """In-memory LRU in front of a SQLite store of parse results."""
+
+    def __init__(self, path: Path | str, model: str, max_entries: int = 256) -> None:
+        self.path = Path(path)
+        self.model = model
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru: OrderedDict[str, dict] = OrderedDict()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the router never creates the file
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+        return self._conn
+
+    def _remember(self, key: str, result: dict) -> None:
+        self._lru[key] = result
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, text: str) -> dict | None:
+        """Return {"bpmn_xml", "process_json"} for `text`, or None on a miss."""
+        key = parse_cache_key(text, self.model)
+        with self._lock:
+            result = self._lru.get(key)
+            if result is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return result
+            row = self._db().execute(
+                "SELECT process_json, bpmn_xml FROM parses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            result = {"bpmn_xml": row[1], "process_json": json.loads(row[0])}
+            self._remember(key, result)
+            self.disk_hits += 1
+            return result
+
+    def put(self, text: str, process_json: dict, bpmn_xml: str) -> None:
+        key = parse_cache_key(text, self.model)
+        result = {"bpmn_xml": bpmn_xml, "process_json": process_json}
+        with self._lock:
+            self._remember(key, result)
+            with self._db():
+                self._db().execute(
+                    "INSERT OR REPLACE INTO parses (key, process_json, bpmn_xml, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(process_json, ensure_ascii=False), bpmn_xml, time.time()),
+                )
+
+    def stats(self) -> dict:
+        return {
+            "memory_entries": len(self._lru),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -3,10 +3,13 @@
 Converts a validated ProcessFlow into BPMN 2.0 XML renderable by bpmn-js.
 
 Layout algorithm:
-  - Actors → horizontal swimlanes stacked vertically (160px each)
-  - Elements ordered left-to-right by BFS depth from start event
+  - Actors → horizontal swimlanes stacked vertically (160px each, plus 110px
+    per extra row when elements share a lane and column)
+  - Elements ordered left-to-right by column (see src/bpmn/layout.py; BFS depth
+    from start event by default, or a layered layout)
   - Pool/participant wraps all lanes with a 30px header strip on the left
   - Each lane has an additional 30px label strip, then element columns at 190px spacing
+  - Sequence flows are routed orthogonally around shapes (src/bpmn/routing.py)
 
 ASCII layout:
   ┌────────────────────────────────────────────────────────┐
@@ -18,9 +21,11 @@ ASCII layout:
 """
 
 import xml.etree.ElementTree as ET
-from collections import deque
 
+from src.bpmn.layout import layout_process
 from src.bpmn.models import Activity, BPMNEvent, Gateway, ProcessFlow
+from src.bpmn.routing import EdgeRouter, Rect
+from src.config import BPMN_LAYOUT
 
 # ---------------------------------------------------------------------------
 # Namespace URIs and registration
@@ -62,8 +67,16 @@ POOL_Y = 52           # top edge of the pool shape
 POOL_HEADER_W = 30    # width of pool participant label strip
 LANE_HEADER_W = 30    # additional width for lane label strip inside pool
 LANE_HEIGHT = 160     # height of each swimlane
+ROW_HEIGHT = 110      # extra lane height per additional row of elements
 COL_MARGIN = 60       # x-margin from lane header to first element center
 STEP_WIDTH = 190      # center-to-center horizontal spacing between columns
+CORRIDOR_MARGIN = 15  # distance of the edge-routing corridors from lane borders
+
+# Identifies the XML this module produces for a given ProcessFlow. Stored XML
+# (parse cache, compiled templates) is only reused when it matches, so bump
+# GENERATOR_VERSION with any change to layout, routing or element output.
+GENERATOR_VERSION = 3
+XML_VERSION = f"{GENERATOR_VERSION}-{BPMN_LAYOUT}"
 
 # Element (w, h) by type
 EVENT_W, EVENT_H = 36, 36
@@ -80,9 +93,13 @@ def _col_cx(col: int) -> int:
     return POOL_X + POOL_HEADER_W + LANE_HEADER_W + COL_MARGIN + col * STEP_WIDTH
 
 
-def _lane_cy(lane_idx: int) -> int:
-    """Y center of lane `lane_idx`."""
-    return POOL_Y + lane_idx * LANE_HEIGHT + LANE_HEIGHT // 2
+def _lane_tops(heights: list[int]) -> list[int]:
+    """Y of the top edge of each lane, given every lane's height."""
+    tops, y = [], POOL_Y
+    for height in heights:
+        tops.append(y)
+        y += height
+    return tops
 
 
 def _elem_size(elem) -> tuple[int, int]:
@@ -93,69 +110,16 @@ def _elem_size(elem) -> tuple[int, int]:
     return TASK_W, TASK_H
 
 
-# ---------------------------------------------------------------------------
-# Column assignment (BFS longest-path, loop-back safe)
-# ---------------------------------------------------------------------------
-
-def _assign_columns(process: ProcessFlow) -> dict[str, int]:
-    """Assign a horizontal column index to every element.
-
-    Uses BFS from start events with a visited-set guard so that loop-back
-    edges (e.g. rejected case → re-assess) don't cause unbounded column growth.
-    """
-    all_ids: set[str] = (
-        {e.id for e in process.events}
-        | {a.id for a in process.activities}
-        | {g.id for g in process.gateways}
-    )
-
-    successors: dict[str, list[str]] = {}
-    for sf in process.sequence_flows:
-        if sf.source_id in all_ids and sf.target_id in all_ids:
-            successors.setdefault(sf.source_id, []).append(sf.target_id)
-
-    # Seed from start events; fall back to elements with no predecessors
-    start_ids = [e.id for e in process.events if e.event_type == "start"]
-    if not start_ids:
-        all_targets = {sf.target_id for sf in process.sequence_flows if sf.target_id in all_ids}
-        start_ids = list(all_ids - all_targets) or [next(iter(all_ids))]
-
-    columns: dict[str, int] = {}
-    visited: set[str] = set()
-    queue: deque[str] = deque()
-
-    for sid in start_ids:
-        columns[sid] = 0
-        queue.append(sid)
-
-    while queue:
-        current = queue.popleft()
-        if current in visited:
-            continue
-        visited.add(current)
-        cur_col = columns.get(current, 0)
-        for succ in successors.get(current, []):
-            if succ not in visited:
-                proposed = cur_col + 1
-                if columns.get(succ, -1) < proposed:
-                    columns[succ] = proposed
-                queue.append(succ)
-
-    # Assign any elements not reachable from start events
-    max_col = max(columns.values(), default=0)
-    for i, eid in enumerate(sorted(all_ids - set(columns.keys()))):
-        columns[eid] = max_col + 1 + i
-
-    return columns
-
-
 # ---------------------------------------------------------------------------
 # Main generator
 # ---------------------------------------------------------------------------
 
-def generate_bpmn_xml(process: ProcessFlow) -> str:
+def generate_bpmn_xml(process: ProcessFlow, layout: str = BPMN_LAYOUT) -> str:
     """Convert a ProcessFlow into a BPMN 2.0 XML string.
 
+    `layout` names the placement algorithm in src/bpmn/layout.py ("bfs" or
+    "layered").
+
     Returns a UTF-8 XML string with:
       - bpmn:collaboration / bpmn:participant (pool)
       - bpmn:process with bpmn:laneSet (one lane per actor)
@@ -175,12 +139,19 @@ def generate_bpmn_xml(process: ProcessFlow) -> str:
     for g in process.gateways:
         all_elements[g.id] = g
 
-    columns = _assign_columns(process)
+    placement = layout_process(process, layout)
+    columns, rows = placement.columns, placement.rows
     max_col = max(columns.values(), default=0)
 
-    num_lanes = len(process.actors)
+    lane_heights = [
+        LANE_HEIGHT + (placement.lane_rows.get(a.id, 1) - 1) * ROW_HEIGHT for a in process.actors
+    ]
+    lane_tops = _lane_tops(lane_heights)
     pool_width = POOL_HEADER_W + LANE_HEADER_W + COL_MARGIN + (max_col + 1) * STEP_WIDTH + 80
-    pool_height = num_lanes * LANE_HEIGHT
+    pool_height = sum(lane_heights)
+
+    def center_y(eid: str, lane_i: int) -> int:
+        return lane_tops[lane_i] + LANE_HEIGHT // 2 + rows.get(eid, 0) * ROW_HEIGHT
 
     # Map actor_id → list of element IDs in that lane
     lane_elements: dict[str, list[str]] = {a.id: [] for a in process.actors}
@@ -279,13 +250,14 @@ def generate_bpmn_xml(process: ProcessFlow) -> str:
             f"Lane_{actor.id}_di",
             f"Lane_{actor.id}",
             POOL_X + POOL_HEADER_W,
-            POOL_Y + i * LANE_HEIGHT,
+            lane_tops[i],
             pool_width - POOL_HEADER_W,
-            LANE_HEIGHT,
+            lane_heights[i],
             horizontal=True,
         )
 
     # Element shapes
+    shapes: dict[str, Rect] = {}
     for eid, elem in all_elements.items():
         col = columns.get(eid, 0)
         lid = getattr(elem, "lane_id", process.actors[0].id)
@@ -294,10 +266,11 @@ def generate_bpmn_xml(process: ProcessFlow) -> str:
         lane_i = actor_idx[lid]
 
         cx = _col_cx(col)
-        cy = _lane_cy(lane_i)
+        cy = center_y(eid, lane_i)
         w, h = _elem_size(elem)
 
         shape = _add_shape(plane, f"{eid}_di", eid, cx - w // 2, cy - h // 2, w, h)
+        shapes[eid] = (cx - w // 2, cy - h // 2, cx + w // 2, cy + h // 2)
 
         # Label bounds below small shapes (events and gateways)
         if isinstance(elem, (BPMNEvent, Gateway)):
@@ -308,47 +281,39 @@ def generate_bpmn_xml(process: ProcessFlow) -> str:
             lb.set("width", "100")
             lb.set("height", "27")
 
-    # Sequence flow edges
+    # Sequence flow edges, routed orthogonally around the shapes
+    corridors = []
+    for i, actor in enumerate(process.actors):
+        top, bottom = lane_tops[i], lane_tops[i] + lane_heights[i]
+        corridors += [top + CORRIDOR_MARGIN, bottom - CORRIDOR_MARGIN]
+        corridors += [
+            top + LANE_HEIGHT // 2 + r * ROW_HEIGHT + ROW_HEIGHT // 2
+            for r in range(placement.lane_rows.get(actor.id, 1) - 1)
+        ]
+    router = EdgeRouter(shapes, STEP_WIDTH, corridors)
+
     for sf in process.sequence_flows:
-        src = all_elements.get(sf.source_id)
-        tgt = all_elements.get(sf.target_id)
-        if not src or not tgt:
+        if sf.source_id not in shapes or sf.target_id not in shapes:
             continue
 
-        src_lid = getattr(src, "lane_id", process.actors[0].id)
-        tgt_lid = getattr(tgt, "lane_id", process.actors[0].id)
-        if src_lid not in actor_idx:
-            src_lid = process.actors[0].id
-        if tgt_lid not in actor_idx:
-            tgt_lid = process.actors[0].id
-
-        src_col = columns.get(sf.source_id, 0)
-        tgt_col = columns.get(sf.target_id, 0)
-        src_cx = _col_cx(src_col)
-        src_cy = _lane_cy(actor_idx[src_lid])
-        tgt_cx = _col_cx(tgt_col)
-        tgt_cy = _lane_cy(actor_idx[tgt_lid])
-        src_w, _ = _elem_size(src)
-        tgt_w, _ = _elem_size(tgt)
-
         edge = ET.SubElement(plane, _bdi("BPMNEdge"))
         edge.set("id", f"{sf.id}_di")
         edge.set("bpmnElement", sf.id)
 
-        # Waypoints: right edge of source → left edge of target
-        _add_waypoint(edge, src_cx + src_w // 2, src_cy)
-        _add_waypoint(edge, tgt_cx - tgt_w // 2, tgt_cy)
+        # Waypoints: orthogonal route around the other shapes (src/bpmn/routing.py)
+        points = router.route(sf.source_id, sf.target_id)
+        for x, y in points:
+            _add_waypoint(edge, x, y)
 
         # Edge label for condition
         if sf.condition_label:
-            mid_x = (src_cx + tgt_cx) // 2
-            mid_y = min(src_cy, tgt_cy) - 18
+            x, y, w, h = router.place_label(points, sf.condition_label)
             lbl = ET.SubElement(edge, _bdi("BPMNLabel"))
             lb = ET.SubElement(lbl, _dc("Bounds"))
-            lb.set("x", str(mid_x - 25))
-            lb.set("y", str(mid_y))
-            lb.set("width", "50")
-            lb.set("height", "14")
+            lb.set("x", str(x))
+            lb.set("y", str(y))
+            lb.set("width", str(w))
+            lb.set("height", str(h))
 
     xml_str = ET.tostring(root, encoding="unicode")
     return f'<?xml version="1.0" encoding="UTF-8"?>\n{xml_str}'
@@ -0,0 +1,221 @@
+"""Element placement for the BPMN generator.
+
+A layout gives every element a column (left to right) and a row inside its
+swimlane; lanes are as tall as their busiest column needs.
+
+Algorithms (selected with BPMN_LAYOUT or generate_bpmn_xml(layout=...)):
+
+  bfs      Column = BFS depth from the start events, one row per lane. The
+           original layout: cheap, but elements sharing a lane and column are
+           drawn on top of each other and nothing reduces crossings.
+
+  layered  Sugiyama-style:
+             1. cycle breaking — DFS from the start events; loop-back flows
+                are reversed for layering only
+             2. longest-path layering over the resulting DAG
+             3. elements sharing a lane and column get separate rows
+             4. barycentric crossing reduction — alternate down/up sweeps
+                order each (column, lane) cell by the mean position of its
+                neighbours in the previous column
+           Every step is O(V + E) plus a sort per cell, so 2,000 elements lay
+           out in a few tens of milliseconds.
+"""
+
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+from src.bpmn.models import ProcessFlow
+
+SWEEPS = 4  # down+up barycenter passes; crossings rarely improve after a few
+
+
+@dataclass
+class Layout:
+    columns: dict[str, int]
+    rows: dict[str, int] = field(default_factory=dict)        # row inside the lane, 0 = top
+    lane_rows: dict[str, int] = field(default_factory=dict)   # rows per lane (missing = 1)
+
+
+def _graph(process: ProcessFlow) -> tuple[list[str], dict[str, list[str]]]:
+    """Element ids in declaration order and their successors (valid flows only)."""
+    ids = [e.id for e in (*process.events, *process.activities, *process.gateways)]
+    known = set(ids)
+    successors: dict[str, list[str]] = {i: [] for i in ids}
+    for sf in process.sequence_flows:
+        if sf.source_id in known and sf.target_id in known:
+            successors[sf.source_id].append(sf.target_id)
+    return ids, successors
+
+
+def _lanes(process: ProcessFlow) -> dict[str, str]:
+    lanes = {a.id for a in process.actors}
+    fallback = process.actors[0].id
+    return {
+        e.id: e.lane_id if e.lane_id in lanes else fallback
+        for e in (*process.events, *process.activities, *process.gateways)
+    }
+
+
+# ---------------------------------------------------------------------------
+# BFS (original)
+# ---------------------------------------------------------------------------
+
+def bfs_layout(process: ProcessFlow) -> Layout:
+    """Assign a horizontal column index to every element.
+
+    Uses BFS from start events with a visited-set guard so that loop-back
+    edges (e.g. rejected case → re-assess) don't cause unbounded column growth.
+    """
+    ids, successors = _graph(process)
+    all_ids = set(ids)
+
+    # Seed from start events; fall back to elements with no predecessors
+    start_ids = [e.id for e in process.events if e.event_type == "start"]
+    if not start_ids:
+        all_targets = {t for targets in successors.values() for t in targets}
+        start_ids = list(all_ids - all_targets) or [next(iter(all_ids))]
+
+    columns: dict[str, int] = {}
+    visited: set[str] = set()
+    queue: deque[str] = deque()
+
+    for sid in start_ids:
+        columns[sid] = 0
+        queue.append(sid)
+
+    while queue:
+        current = queue.popleft()
+        if current in visited:
+            continue
+        visited.add(current)
+        cur_col = columns.get(current, 0)
+        for succ in successors.get(current, []):
+            if succ not in visited:
+                proposed = cur_col + 1
+                if columns.get(succ, -1) < proposed:
+                    columns[succ] = proposed
+                queue.append(succ)
+
+    # Assign any elements not reachable from start events
+    max_col = max(columns.values(), default=0)
+    for i, eid in enumerate(sorted(all_ids - set(columns.keys()))):
+        columns[eid] = max_col + 1 + i
+
+    return Layout(columns)
+
+
+# ---------------------------------------------------------------------------
+# Layered (Sugiyama)
+# ---------------------------------------------------------------------------
+
+def _acyclic(process: ProcessFlow, ids: list[str],
+             successors: dict[str, list[str]]) -> dict[str, list[str]]:
+    """Successors with every DFS back edge reversed (and self-loops dropped)."""
+    starts = [e.id for e in process.events if e.event_type == "start"]
+    state: dict[str, int] = {}  # 1 = on the DFS stack, 2 = finished
+    dag: dict[str, list[str]] = {i: [] for i in ids}
+    for root in (*starts, *ids):
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, targets = stack[-1]
+            target = next(targets, None)
+            if target is None:
+                state[node] = 2
+                stack.pop()
+            elif target == node:
+                continue
+            elif state.get(target) == 1:
+                dag[target].append(node)  # loop-back: lay out as if reversed
+            else:
+                dag[node].append(target)
+                if target not in state:
+                    state[target] = 1
+                    stack.append((target, iter(successors[target])))
+    return dag
+
+
+def _longest_path(ids: list[str], dag: dict[str, list[str]]) -> dict[str, int]:
+    indegree = dict.fromkeys(ids, 0)
+    for targets in dag.values():
+        for t in targets:
+            indegree[t] += 1
+    layer = dict.fromkeys(ids, 0)
+    queue = deque(i for i in ids if indegree[i] == 0)
+    while queue:
+        node = queue.popleft()
+        for t in dag[node]:
+            layer[t] = max(layer[t], layer[node] + 1)
+            indegree[t] -= 1
+            if indegree[t] == 0:
+                queue.append(t)
+    return layer
+
+
+def layered_layout(process: ProcessFlow, sweeps: int = SWEEPS) -> Layout:
+    """Sugiyama-style layered layout; see the module docstring."""
+    ids, successors = _graph(process)
+    lane_of = _lanes(process)
+    lane_index = {a.id: i for i, a in enumerate(process.actors)}
+    dag = _acyclic(process, ids, successors)
+    columns = _longest_path(ids, dag)
+
+    # Neighbours in earlier / later columns, whichever way the flow points
+    before: dict[str, list[str]] = defaultdict(list)
+    after: dict[str, list[str]] = defaultdict(list)
+    for source, targets in dag.items():
+        for target in targets:
+            after[source].append(target)
+            before[target].append(source)
+
+    cells: dict[tuple[int, str], list[str]] = defaultdict(list)  # (column, lane) → ids
+    for i in ids:
+        cells[(columns[i], lane_of[i])].append(i)
+    by_column: dict[int, list[list[str]]] = defaultdict(list)
+    for (column, _lane), members in cells.items():
+        by_column[column].append(members)
+
+    # Vertical position: lane index plus the fractional row inside the cell
+    position: dict[str, float] = {}
+
+    def place(members: list[str]) -> None:
+        for row, node in enumerate(members):
+            position[node] = lane_index[lane_of[node]] + (row + 1) / (len(members) + 1)
+
+    for members in cells.values():
+        place(members)
+
+    order = sorted(by_column)
+    for sweep in range(sweeps * 2):
+        downward = sweep % 2 == 0
+        neighbours = before if downward else after
+        for column in (order if downward else reversed(order)):
+            for members in by_column[column]:
+                if len(members) < 2:
+                    continue
+                barycenter = {
+                    node: sum(position[n] for n in neighbours[node]) / len(neighbours[node])
+                    if neighbours.get(node) else position[node]
+                    for node in members
+                }
+                members.sort(key=barycenter.__getitem__)
+                place(members)
+
+    rows: dict[str, int] = {}
+    lane_rows: dict[str, int] = {}
+    for (_column, lane), members in cells.items():
+        for row, node in enumerate(members):
+            rows[node] = row
+        lane_rows[lane] = max(lane_rows.get(lane, 1), len(members))
+    return Layout(columns, rows, lane_rows)
+
+
+LAYOUTS = {"bfs": bfs_layout, "layered": layered_layout}
+
+
+def layout_process(process: ProcessFlow, algorithm: str = "bfs") -> Layout:
+    if algorithm not in LAYOUTS:
+        raise ValueError(f"Unknown layout {algorithm!r}; expected one of {', '.join(LAYOUTS)}")
+    return LAYOUTS[algorithm](process)
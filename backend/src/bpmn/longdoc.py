@@ -0,0 +1,276 @@
+"""Long-document parsing: split, parse sections concurrently, merge.
+
+A single parse call is capped at 5,000 characters, but real SOPs run to
+20–50k. `parse_long_text`:
+
+  1. splits the text at section boundaries — markdown headings,
+     "Phase 2 …" / "Section B …" / "Stage …" / "Part …" lines and ALL-CAPS
+     title lines — folding heading-only fragments into the next section and
+     splitting any section over BPMN_SECTION_CHARS at paragraph, then line,
+     boundaries
+  2. parses the sections concurrently (at most BPMN_LONG_PARSE_WORKERS at a
+     time) with the normal parser, so structured sections still skip the LLM
+     and wall time tracks the slowest section rather than the sum
+  3. merges the partial ProcessFlows: actors with the same name (ignoring
+     case, spacing and a leading "the") become one lane, element ids are
+     prefixed with their section ("s2_act_3"), and each section's main-path
+     end event is replaced by flows into whatever followed the next
+     section's start event. The main path is the end reachable from the
+     start without taking a labelled gateway branch, else the end reached
+     from the section's last activity; other ends (a rejection, an early
+     exit) keep their terminal state
+"""
+
+import logging
+import re
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from src.bpmn.models import Actor, ProcessFlow, SequenceFlow
+from src.bpmn.parser import parse_text
+from src.bpmn.validator import repair_flow
+from src.config import BPMN_LONG_PARSE_WORKERS, BPMN_SECTION_CHARS
+
+logger = logging.getLogger(__name__)
+
+MIN_SECTION_CHARS = 200  # shorter fragments (e.g. a lone heading) join the next section
+
+_HEADING_RE = re.compile(
+    r"^(?:#{1,6}\s+\S.*"
+    r"|(?i:phase|section|stage|part)\s+(?:\d+|[ivx]+|[a-z])\b.{0,80}"
+    r"|[A-Z][A-Z0-9 &/,'()-]{3,80})$"
+)
+_ARTICLE_RE = re.compile(r"^the\s+")
+
+
+# ---------------------------------------------------------------------------
+# Splitting
+# ---------------------------------------------------------------------------
+
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+    return bool(line) and bool(_HEADING_RE.match(line)) and (
+        line.startswith("#") or not line.endswith(".")
+    )
+
+
+def _pack(parts: list[str], separator: str, limit: int) -> list[str]:
+    """Greedily join consecutive parts into pieces of at most `limit` chars."""
+    pieces: list[str] = []
+    current = ""
+    for part in parts:
+        if current and len(current) + len(separator) + len(part) > limit:
+            pieces.append(current)
+            current = part
+        else:
+            current = f"{current}{separator}{part}" if current else part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_oversized(section: str, limit: int) -> list[str]:
+    """Break `section` into pieces of at most `limit` chars at paragraph, then line, boundaries."""
+    if len(section) <= limit:
+        return [section]
+    parts: list[str] = []
+    for paragraph in section.split("\n\n"):
+        if len(paragraph) <= limit:
+            parts.append(paragraph)
+            continue
+        lines = [
+            line[i:i + limit]  # a single enormous line is hard-cut
+            for line in paragraph.split("\n")
+            for i in range(0, max(len(line), 1), limit)
+        ]
+        parts.extend(_pack(lines, "\n", limit))
+    return _pack(parts, "\n\n", limit)
+
+
+def split_sections(text: str, max_chars: int = BPMN_SECTION_CHARS) -> list[str]:
+    """Split a long process document into independently parseable sections."""
+    sections: list[list[str]] = [[]]
+    for line in text.strip().splitlines():
+        if _is_heading(line) and any(s.strip() for s in sections[-1]):
+            sections.append([])
+        sections[-1].append(line)
+
+    merged: list[str] = []
+    carry = ""
+    for lines in sections:
+        section = "\n".join(lines).strip()
+        if carry:
+            section = f"{carry}\n{section}"
+            carry = ""
+        if len(section) < MIN_SECTION_CHARS:
+            carry = section
+            continue
+        merged.append(section)
+    if carry:
+        if merged:
+            merged[-1] = f"{merged[-1]}\n{carry}"
+        else:
+            merged.append(carry)
+    return [piece for s in merged for piece in _split_oversized(s, max_chars) if piece.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Merging
+# ---------------------------------------------------------------------------
+
+def _actor_key(name: str) -> str:
+    return _ARTICLE_RE.sub("", " ".join(name.lower().split()))
+
+
+def _reachable(flow: ProcessFlow, sources: list[str], labelled: bool = True) -> set[str]:
+    """Element ids reachable from `sources`, optionally not crossing labelled flows."""
+    seen = set(sources)
+    frontier = list(sources)
+    while frontier:
+        node = frontier.pop()
+        for sf in flow.sequence_flows:
+            if sf.source_id == node and sf.target_id not in seen and (
+                labelled or not sf.condition_label
+            ):
+                seen.add(sf.target_id)
+                frontier.append(sf.target_id)
+    return seen
+
+
+def _main_ends(flow: ProcessFlow) -> list[str]:
+    """The end event(s) where the section's main path continues into the next section."""
+    ends = [e.id for e in flow.events if e.event_type == "end"]
+    if len(ends) <= 1:
+        return ends
+    starts = [e.id for e in flow.events if e.event_type == "start"]
+    unconditioned = _reachable(flow, starts, labelled=False)
+    main = [e for e in ends if e in unconditioned]
+    if not main and flow.activities:
+        after_last = _reachable(flow, [flow.activities[-1].id])
+        main = [e for e in ends if e in after_last]
+    return main or ends
+
+
+def merge_flows(flows: list[ProcessFlow], name: str, description: str = "") -> ProcessFlow:
+    """Merge per-section flows into one process; see the module docstring."""
+    actors: dict[str, Actor] = {}
+    events, activities, gateways, sequence = [], [], [], []
+    sections: list[tuple[list[str], list[str]]] = []  # (start ids, main end ids) per section
+
+    for n, flow in enumerate(flows, 1):
+        prefix = f"s{n}_"
+        lanes: dict[str, str] = {}
+        for actor in flow.actors:
+            key = _actor_key(actor.name)
+            if key not in actors:
+                actors[key] = Actor(
+                    id=f"actor_{len(actors) + 1}", name=actor.name, description=actor.description
+                )
+            lanes[actor.id] = actors[key].id
+        fallback = lanes[flow.actors[0].id]
+
+        def renamed(element, prefix=prefix, lanes=lanes, fallback=fallback):
+            return element.model_copy(update={
+                "id": prefix + element.id,
+                "lane_id": lanes.get(element.lane_id, fallback),
+            })
+
+        events += [renamed(e) for e in flow.events]
+        activities += [renamed(a) for a in flow.activities]
+        gateways += [renamed(g) for g in flow.gateways]
+        sequence += [
+            sf.model_copy(update={
+                "id": prefix + sf.id,
+                "source_id": prefix + sf.source_id,
+                "target_id": prefix + sf.target_id,
+            })
+            for sf in flow.sequence_flows
+        ]
+        sections.append((
+            [prefix + e.id for e in flow.events if e.event_type == "start"],
+            [prefix + end for end in _main_ends(flow)],
+        ))
+
+    # Stitch: whatever reached section N's main end now continues after section N+1's start
+    stitched: set[str] = set()
+    for (_starts, ends), (next_starts, _next_ends) in zip(sections, sections[1:]):
+        into_end = [sf for sf in sequence if sf.target_id in ends]
+        out_of_start = [sf for sf in sequence if sf.source_id in next_starts]
+        if not into_end or not out_of_start:
+            continue
+        for before in into_end:
+            for after in out_of_start:
+                sequence.append(SequenceFlow(
+                    id=f"{before.id}__{after.id}",
+                    source_id=before.source_id,
+                    target_id=after.target_id,
+                    condition_label=before.condition_label or after.condition_label,
+                ))
+        stitched.update(ends)
+        stitched.update(next_starts)
+
+    process = ProcessFlow(
+        name=name,
+        description=description,
+        actors=list(actors.values()),
+        events=[e for e in events if e.id not in stitched],
+        activities=activities,
+        gateways=gateways,
+        sequence_flows=[
+            sf for sf in sequence if sf.source_id not in stitched and sf.target_id not in stitched
+        ],
+    )
+    process, _ = repair_flow(process)
+    return process
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def _title(text: str, sections: list[ProcessFlow]) -> str:
+    first = text.strip().splitlines()[0].lstrip("#").strip()
+    return first if 0 < len(first) <= 120 else sections[0].name
+
+
+def parse_long_text(
+    text: str,
+    parse: Callable[[str], ProcessFlow] = parse_text,
+    max_workers: int = BPMN_LONG_PARSE_WORKERS,
+    section_chars: int = BPMN_SECTION_CHARS,
+) -> tuple[ProcessFlow, int]:
+    """Parse a long process document section by section.
+
+    Returns (merged flow, number of sections). A section that cannot be
+    parsed — an HTTPException or any other error — fails the whole document
+    with the section number in the detail, without waiting for sections
+    still in flight.
+    """
+    sections = split_sections(text, section_chars)
+    if len(sections) == 1:
+        return parse(sections[0]), 1
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(sections)))
+    futures = [pool.submit(parse, section) for section in sections]
+    flows = []
+    for n, future in enumerate(futures, 1):
+        try:
+            flows.append(future.result())
+        except Exception as exc:
+            # Fail now: sections not yet started are dropped, and sections still
+            # waiting on the LLM finish in the background without holding the caller
+            pool.shutdown(wait=False, cancel_futures=True)
+            if isinstance(exc, HTTPException):
+                status, detail = exc.status_code, exc.detail
+            else:
+                logger.exception("Section %d of %d failed to parse", n, len(sections))
+                status, detail = 500, f"Internal error ({type(exc).__name__})"
+            raise HTTPException(
+                status_code=status,
+                detail=f"Section {n} of {len(sections)}: {detail}",
+            ) from exc
+    pool.shutdown()
+
+    return merge_flows(flows, _title(text, flows)), len(sections)
@@ -1,19 +1,25 @@
 """LLM-based parser: plain text → structured ProcessFlow.
 
-Uses Groq llama-3.3-70b with JSON mode to extract BPMN elements.
-Falls back to one retry with a correction prompt on parse/validation failure.
+Uses Groq llama-3.3-70b with JSON mode to extract BPMN elements; short,
+simple texts try the 8B router model first (src/bpmn/tiers.py).
+Output is checked and repaired locally (src/bpmn/validator.py); only defects
+that cannot be repaired fall back to one retry with a correction prompt.
 """
 
-import json
 import logging
+import time
+from collections.abc import Callable, Iterator
 
 from fastapi import HTTPException
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_groq import ChatGroq
-from pydantic import ValidationError
 
 from src.bpmn.models import ProcessFlow
-from src.config import GROQ_API_KEY, LLM_MODEL
+from src.bpmn.rules import parse_structured
+from src.bpmn.stream import IncrementalFlowParser, StreamAborted
+from src.bpmn.tiers import is_simple, tier_stats
+from src.bpmn.validator import UnrepairableFlow, extract_json, repair_process
+from src.config import GROQ_API_KEY, LLM_MODEL, ROUTER_MODEL
 
 logger = logging.getLogger(__name__)
 
@@ -90,28 +96,69 @@ IMPORTANT: Return ONLY the JSON object. No text before or after it.\
 # Public API
 # ---------------------------------------------------------------------------
 
-def parse_process_text(text: str) -> ProcessFlow:
+def parse_text(text: str) -> ProcessFlow:
+    """Parse with the rule-based fast path, calling the LLM only if the text
+    does not follow the structured grammar (see src/bpmn/rules.py)."""
+    process_flow = parse_structured(text)
+    if process_flow is not None:
+        logger.info("Parsed %r with the rule-based parser", process_flow.name)
+        return process_flow
+    return parse_process_text(text)
+
+
+def parse_process_text(text: str, throttle: Callable[[], object] | None = None) -> ProcessFlow:
     """Parse plain-text process description into a validated ProcessFlow.
 
-    Calls Groq with JSON mode. On parse/validation failure, retries once
-    with the bad response shown back to the model. Raises HTTPException on
-    repeated failure or service unavailability.
+    Calls Groq with JSON mode and repairs structural defects locally. Short,
+    simple texts go to the small ROUTER_MODEL first and escalate to LLM_MODEL
+    unless its output is a sound graph (see src/bpmn/tiers.py). LLM_MODEL
+    gets one retry with the bad response shown back to it. Raises
+    HTTPException on repeated failure or service unavailability.
+
+    `throttle`, if given, is called before every LLM request (up to three per
+    parse), e.g. to block on a rate limiter.
     """
-    llm = ChatGroq(
-        model=LLM_MODEL,
-        temperature=0,
-        groq_api_key=GROQ_API_KEY,
-        model_kwargs={"response_format": {"type": "json_object"}},
-    )
+    messages = _messages(text)
+    if is_simple(text):
+        process_flow = _parse_small(messages, throttle)
+        if process_flow is not None:
+            return process_flow
+        tier_stats.escalated()
+
+    start = time.perf_counter()
+    ok = False
+    try:
+        process_flow = _parse_large(messages, throttle)
+        ok = True
+        return process_flow
+    finally:
+        tier_stats.record("large", LLM_MODEL, ok, time.perf_counter() - start)
 
-    messages = [
-        SystemMessage(content=PARSER_SYSTEM_PROMPT),
-        HumanMessage(content=f"Process description:\n\n{text}"),
-    ]
+
+def _parse_small(messages: list, throttle: Callable[[], object] | None) -> ProcessFlow | None:
+    """One ROUTER_MODEL attempt; None (never an exception) means escalate.
+
+    Only a sound graph counts: output that would need graph repairs is
+    escalated rather than patched, so the small tier never returns a guess.
+    """
+    start = time.perf_counter()
+    try:
+        raw = _invoke(_llm(ROUTER_MODEL), messages, throttle).content.strip()
+        process_flow, _ = repair_process(extract_json(raw), repair_graph=False)
+    except Exception as exc:
+        logger.info("Small model parse failed (%s) — escalating to %s", exc, LLM_MODEL)
+        process_flow = None
+    tier_stats.record("small", ROUTER_MODEL, process_flow is not None,
+                      time.perf_counter() - start)
+    return process_flow
+
+
+def _parse_large(messages: list, throttle: Callable[[], object] | None) -> ProcessFlow:
+    llm = _llm()
 
     # Attempt 1
     try:
-        response = llm.invoke(messages)
+        response = _invoke(llm, messages, throttle)
     except Exception as exc:
         logger.error("Groq API error during BPMN parse: %s", exc)
         raise HTTPException(status_code=503, detail="Parse service temporarily unavailable")
@@ -119,27 +166,92 @@ def parse_process_text(text: str) -> ProcessFlow:
     raw = response.content.strip()
 
     try:
-        data = json.loads(raw)
-        return ProcessFlow.model_validate(data)
-    except (json.JSONDecodeError, ValidationError) as first_err:
-        logger.warning("First parse attempt failed (%s) — retrying", type(first_err).__name__)
+        return _validated(raw)
+    except (ValueError, UnrepairableFlow) as exc:
+        logger.warning("First parse attempt failed (%s) — retrying", exc)
+        error = exc  # `exc` is unbound once the except block ends
+    return _retry(llm, messages, raw, error, throttle)
+
+
+def stream_process_text(text: str) -> Iterator[tuple[str, dict | ProcessFlow]]:
+    """Parse like parse_process_text, but stream the LLM response.
 
-    # Attempt 2: show the bad response back and ask for a fix
+    Yields ("actor" | "event" | "activity" | "gateway" | "flow", item) as each
+    item of the response completes (provisional: before local repair), then
+    ("process", ProcessFlow). Stops reading the stream, and raises 422, as soon
+    as the response clearly cannot validate (see src/bpmn/stream.py).
+    """
+    llm = _llm()
+    messages = _messages(text)
+    parser = IncrementalFlowParser()
+    stream = llm.stream(messages)
+    try:
+        for chunk in stream:
+            yield from parser.feed(chunk.content)
+    except StreamAborted as exc:
+        logger.warning("Aborted BPMN parse stream after %d chars: %s", len(parser.text), exc)
+        raise HTTPException(
+            status_code=422, detail=f"Could not parse process flow: {exc}"
+        ) from exc
+    except Exception as exc:
+        logger.error("Groq API error during BPMN parse stream: %s", exc)
+        raise HTTPException(status_code=503, detail="Parse service temporarily unavailable")
+    finally:
+        stream.close()  # stops generation (and token usage) on an early exit
+
+    raw = parser.text.strip()
+    try:
+        process_flow = _validated(raw)
+    except (ValueError, UnrepairableFlow) as exc:
+        logger.warning("Streamed parse failed (%s) — retrying", exc)
+        process_flow = _retry(llm, messages, raw, exc)
+    yield "process", process_flow
+
+
+def _llm(model: str = LLM_MODEL) -> ChatGroq:
+    return ChatGroq(
+        model=model,
+        temperature=0,
+        groq_api_key=GROQ_API_KEY,
+        model_kwargs={"response_format": {"type": "json_object"}},
+    )
+
+
+def _invoke(llm: ChatGroq, messages: list, throttle: Callable[[], object] | None):
+    if throttle is not None:
+        throttle()
+    return llm.invoke(messages)
+
+
+def _messages(text: str) -> list:
+    return [
+        SystemMessage(content=PARSER_SYSTEM_PROMPT),
+        HumanMessage(content=f"Process description:\n\n{text}"),
+    ]
+
+
+def _retry(
+    llm: ChatGroq,
+    messages: list,
+    raw: str,
+    error: Exception,
+    throttle: Callable[[], object] | None = None,
+) -> ProcessFlow:
+    """Attempt 2: show the bad response back and ask for a fix."""
     retry_messages = messages + [
         AIMessage(content=raw),
         HumanMessage(
             content=(
                 "Your response could not be validated against the required schema. "
-                f"Error: {str(first_err)[:300]}. "
+                f"Error: {str(error)[:300]}. "
                 "Please return ONLY the corrected JSON object — no markdown, no code fences, no explanation."
             )
         ),
     ]
 
     try:
-        retry_response = llm.invoke(retry_messages)
-        data = json.loads(retry_response.content.strip())
-        return ProcessFlow.model_validate(data)
+        retry_response = _invoke(llm, retry_messages, throttle)
+        return _validated(retry_response.content.strip())
     except Exception as exc:
         logger.error("Retry parse attempt also failed: %s", exc)
         raise HTTPException(
@@ -150,3 +262,11 @@ def parse_process_text(text: str) -> ProcessFlow:
                 "sequential steps, and explicit decision points."
             ),
         )
+
+
+def _validated(raw: str) -> ProcessFlow:
+    """Parse and repair one LLM response; raises if it needs another LLM call."""
+    process_flow, repairs = repair_process(extract_json(raw))
+    if repairs:
+        logger.info("Repaired parse output locally: %s", "; ".join(repairs))
+    return process_flow
@@ -0,0 +1,175 @@
+"""Orthogonal routing of sequence flows around laid-out shapes.
+
+The generator used to draw every flow as one straight segment from the
+source's right edge to the target's left edge, so loop-backs and cross-lane
+flows cut through whatever sat between them. `EdgeRouter` returns
+axis-aligned waypoints instead, trying the simplest shape first:
+
+  straight   source and target on one line with nothing in between
+  Z          right, down/up in the channel after the source (or before the
+             target), right again
+  corridor   right into the channel after the source, along a free
+             horizontal corridor (lane edges, gaps between rows), down the
+             channel before the target — used for loop-backs and anything
+             the Z shapes would cut through
+
+Channels are the empty vertical strips between layout columns; corridors
+are supplied by the generator. Every candidate segment is checked against a
+uniform-grid spatial index of the shape bounds, so a check costs the few
+cells it crosses rather than a scan of every shape. Condition labels are
+placed beside the route's first or longest horizontal segment, at the first
+spot that overlaps neither a shape nor an earlier label.
+"""
+
+from collections import defaultdict
+
+Rect = tuple[int, int, int, int]  # x1, y1, x2, y2
+LabelBox = tuple[int, int, int, int]  # x, y, width, height (BPMN dc:Bounds)
+Point = tuple[int, int]
+
+GRID_CELL = 200       # spatial index cell size (px)
+CLEARANCE = 6         # shapes are inflated by this much for collision checks
+CHANNEL_NUDGE = 6     # offset between flows sharing a channel or corridor
+MAX_NUDGES = 7        # 0, +6, -6, ... +18, -18 then wrap; keeps flows inside the channel
+LABEL_H = 14
+LABEL_CHAR_W = 6      # approximate label width per character
+
+
+class GridIndex:
+    """Uniform-grid spatial index of rectangles."""
+
+    def __init__(self, cell: int = GRID_CELL) -> None:
+        self.cell = cell
+        self._cells: dict[tuple[int, int], list[tuple[str, Rect]]] = defaultdict(list)
+
+    def _span(self, rect: Rect):
+        x1, y1, x2, y2 = rect
+        for gx in range(x1 // self.cell, x2 // self.cell + 1):
+            for gy in range(y1 // self.cell, y2 // self.cell + 1):
+                yield gx, gy
+
+    def insert(self, key: str, rect: Rect) -> None:
+        for cell in self._span(rect):
+            self._cells[cell].append((key, rect))
+
+    def hits(self, rect: Rect, ignore: tuple[str, ...] = ()) -> bool:
+        """True if `rect` overlaps any indexed rectangle not in `ignore`."""
+        x1, y1, x2, y2 = rect
+        for cell in self._span(rect):
+            for key, (a1, b1, a2, b2) in self._cells.get(cell, ()):
+                if key not in ignore and x1 < a2 and a1 < x2 and y1 < b2 and b1 < y2:
+                    return True
+        return False
+
+
+def _segment(p: Point, q: Point) -> Rect:
+    return min(p[0], q[0]), min(p[1], q[1]), max(p[0], q[0]) + 1, max(p[1], q[1]) + 1
+
+
+def _simplify(points: list[Point]) -> list[Point]:
+    """Drop repeated points and the middle of collinear runs."""
+    out: list[Point] = []
+    for p in points:
+        if out and p == out[-1]:
+            continue
+        if len(out) >= 2 and (out[-2][0] == out[-1][0] == p[0] or out[-2][1] == out[-1][1] == p[1]):
+            out[-1] = p
+        else:
+            out.append(p)
+    return out
+
+
+class EdgeRouter:
+    """Routes flows between the shapes of one diagram; see the module docstring."""
+
+    def __init__(self, shapes: dict[str, Rect], step: int, corridors: list[int]) -> None:
+        self.shapes = shapes
+        self.step = step
+        self.corridors = sorted(set(corridors))
+        self._index = GridIndex()
+        for key, (x1, y1, x2, y2) in shapes.items():
+            self._index.insert(key, (x1 - CLEARANCE, y1 - CLEARANCE,
+                                     x2 + CLEARANCE, y2 + CLEARANCE))
+        self._labels = GridIndex()
+        self._label_count = 0
+        self._used: dict[tuple[str, int], int] = defaultdict(int)
+
+    def _clear(self, points: list[Point], ends: tuple[str, ...]) -> bool:
+        return not any(
+            self._index.hits(_segment(p, q), ends) for p, q in zip(points, points[1:])
+        )
+
+    def _nudged(self, axis: str, value: int) -> int:
+        """`value` offset so flows sharing a channel or corridor don't overlap."""
+        n = self._used[(axis, value)] % MAX_NUDGES
+        return value + (n + 1) // 2 * CHANNEL_NUDGE * (1 if n % 2 else -1)
+
+    def _claim(self, axis: str, value: int) -> None:
+        """Record one more flow in `value`'s channel or corridor."""
+        self._used[(axis, value)] += 1
+
+    def route(self, source: str, target: str) -> list[Point]:
+        """Orthogonal waypoints from `source`'s right edge to `target`'s left edge."""
+        sx1, sy1, sx2, sy2 = self.shapes[source]
+        tx1, ty1, tx2, ty2 = self.shapes[target]
+        start = (sx2, (sy1 + sy2) // 2)
+        end = (tx1, (ty1 + ty2) // 2)
+        ends = (source, target)
+        after = (sx1 + sx2) // 2 + self.step // 2    # channel right of the source
+        before = (tx1 + tx2) // 2 - self.step // 2   # channel left of the target
+
+        if end[0] > start[0]:
+            if start[1] == end[1] and self._clear([start, end], ends):
+                return [start, end]
+            for x in (after, before):
+                # Prefer the nudged position; fall back to the channel centre
+                # rather than cut through a shape
+                for nx in dict.fromkeys((self._nudged("x", x), x)):
+                    route = [start, (nx, start[1]), (nx, end[1]), end]
+                    if start[0] < nx < end[0] and self._clear(route, ends):
+                        self._claim("x", x)
+                        return _simplify(route)
+
+        # Corridor: nearest free horizontal line between the two channels
+        middle = (start[1] + end[1]) // 2
+        candidates = sorted(self.corridors, key=lambda y: abs(y - start[1]) + abs(y - end[1])
+                            + abs(y - middle) // 4)
+        chosen = None
+        for y in candidates:
+            route = [start, (after, start[1]), (after, y), (before, y), (before, end[1]), end]
+            if self._clear(route, ends):
+                chosen = y
+                break
+        if chosen is None:
+            chosen = candidates[0] if candidates else min(sy1, ty1) - 2 * CLEARANCE
+        y, a, b = self._nudged("y", chosen), self._nudged("x", after), self._nudged("x", before)
+        route = [start, (a, start[1]), (a, y), (b, y), (b, end[1]), end]
+        if not self._clear(route, ends):
+            y, a, b = chosen, after, before  # the nudge would cut a shape
+            route = [start, (a, start[1]), (a, y), (b, y), (b, end[1]), end]
+        self._claim("y", chosen)
+        self._claim("x", after)
+        self._claim("x", before)
+        return _simplify(route)
+
+    def place_label(self, points: list[Point], text: str) -> LabelBox:
+        """Bounds (x, y, width, height) for a flow label that avoids shapes and labels."""
+        width = max(30, min(len(text) * LABEL_CHAR_W, 120))
+        segments = [(p, q) for p, q in zip(points, points[1:]) if p[1] == q[1]]
+        longest = max(segments, key=lambda s: abs(s[1][0] - s[0][0]), default=None)
+        first = segments[0] if segments else (points[0], points[-1])
+        candidates = []
+        for p, q in filter(None, (first, longest)):
+            left = min(p[0], q[0])
+            mid = (p[0] + q[0]) // 2 - width // 2
+            for x in (left + 4, mid):
+                candidates += [(x, p[1] - LABEL_H - 4), (x, p[1] + 4)]
+        for x, y in candidates:
+            rect = (x, y, x + width, y + LABEL_H)
+            if not self._index.hits(rect) and not self._labels.hits(rect):
+                break
+        else:
+            x, y = candidates[0]
+        self._label_count += 1
+        self._labels.insert(f"label_{self._label_count}", (x, y, x + width, y + LABEL_H))
+        return x, y, width, LABEL_H
@@ -0,0 +1,477 @@
+"""Deterministic rule-based parser for structured process descriptions.
+
+Much of the input is already a numbered step list with named actors, like
+data/templates/telco_case_management.txt. `parse_structured()` turns text that
+follows the grammar below straight into a ProcessFlow in a few milliseconds,
+and returns None for anything else, so the caller can fall back to the LLM.
+
+Grammar (blank lines are ignored; matching is case-insensitive)::
+
+    [Process name line]
+    [Free-text description lines]
+    Actors: A, B, C                      -- or a bullet list:
+    Actors:
+    - Actor Name [(alias or description)]
+    [Process Flow: | Steps:]
+    1. <step>
+    2. <step>
+       - If <condition>: <branch>        -- also "If <condition>, then <branch>"
+         - <more branch sentences>       -- deeper bullets continue the branch
+       - Otherwise: <branch>             -- or "Else: <branch>"
+       - <question>?                     -- optional gateway question
+    3. If <condition> then step 5; otherwise step 7
+    4. If <condition>: <branch>          -- a step made only of "If ..." /
+    5. Otherwise: <branch>                  "Otherwise ..." joins the decision
+                                            after the step before it
+
+A step is "<Actor>: <action>" or starts with an actor's name (or its alias in
+parentheses, or an unambiguous last word such as "Frontliner"). Its first
+sentence names the activity; "<action>: <question>?" also names the gateway.
+A branch is a sequence of sentences: each sentence becomes an activity in
+the lane of the actor it starts with (else the step's actor), until one of
+  - "Return to / Go to / Continue to step N"   -> jump to step N
+  - "Process ends" / "Done"                    -> end event
+  - "Continue ..."                             -> the next step
+A branch without a directive continues with the next step, and a decision
+with a single branch gets an "Otherwise" flow to the next step. After the
+last step the flow ends.
+
+Text is rejected (None) when there is no actor list, fewer than two
+consecutive numbered steps, a step whose actor cannot be determined, a
+reference to a step that does not exist, or a line that fits nowhere.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from src.bpmn.models import Activity, Actor, BPMNEvent, Gateway, ProcessFlow, SequenceFlow
+from src.bpmn.validator import repair_flow
+
+MAX_NAME_LENGTH = 60
+MAX_LABEL_LENGTH = 30
+
+_STEP_RE = re.compile(r"^(\d+)[.)]\s+(.*)$")
+_BULLET_RE = re.compile(r"^[-*•]\s+(.*)$")
+_ACTORS_RE = re.compile(r"^(?:actors|roles|participants|lanes)\s*:\s*(.*)$", re.I)
+_FLOW_HEADER_RE = re.compile(r"^(?:process\s+flow|process\s+steps|steps|flow)\s*:\s*$", re.I)
+_IF_RE = re.compile(r"^if\s+(.+?)\s*(?::|,\s*then\b|\bthen\b)\s*(.*)$", re.I)
+_ELSE_RE = re.compile(r"^(?:otherwise|else)\b\s*[:,]?\s*(.*)$", re.I)
+_INLINE_IF_RE = re.compile(
+    r"\bif\s+(.+?)\s*,?\s+then\s+(?:go\s+to\s+|continue\s+(?:at|with)\s+)?step\s+(\d+)", re.I
+)
+_INLINE_ELSE_RE = re.compile(r"\b(?:otherwise|else)\s*,?\s+(?:go\s+to\s+)?step\s+(\d+)", re.I)
+_JUMP_RE = re.compile(
+    r"\b(?:return|go\s+back|loop\s+back|go|proceed|continue|jump|back)\s+to\s+step\s+(\d+)", re.I
+)
+_END_RE = re.compile(
+    r"^(?:the\s+)?(?:process|flow|workflow)\s+(?:ends|is\s+complete|is\s+done|terminates)\b"
+    r"|^(?:done|end)\b",
+    re.I,
+)
+_CONTINUE_RE = re.compile(r"^(?:continue|proceed)\b", re.I)
+_PAREN_RE = re.compile(r"\s*\([^)]*\)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+_SERVICE_RE = re.compile(
+    r"\b(?:automated|automatically|notifications?|notified|sms|e-?mail)\b", re.I
+)
+
+# Branch/step targets: ("step", n), ("end", None) or ("next", None)
+Target = tuple[str, int | None]
+
+
+@dataclass
+class _Branch:
+    label: str
+    sentences: list[str]
+    indent: int = 0
+    target: Target | None = None
+
+
+@dataclass
+class _Step:
+    number: int
+    text: str
+    actor: str | None = None
+    question: str | None = None
+    bullets: list[tuple[int, str]] = field(default_factory=list)
+    actions: list[str] = field(default_factory=list)
+    branches: list[_Branch] = field(default_factory=list)
+    target: Target | None = None
+    owner: "_Step | None" = None  # set when this step joins an earlier decision
+
+
+class _NoMatch(Exception):
+    """The text does not follow the structured grammar."""
+
+
+# ---------------------------------------------------------------------------
+# Text helpers
+# ---------------------------------------------------------------------------
+
+def _strip_parens(text: str) -> str:
+    return _PAREN_RE.sub("", text).strip()
+
+
+def _sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(_strip_parens(text)) if s.strip(" .")]
+
+
+def _capitalize(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+def _short(text: str, limit: int) -> str:
+    text = text.strip().rstrip(".:;,")
+    if len(text) <= limit:
+        return text
+    for sep in (", ", "; ", " - ", ": "):
+        cut = text.find(sep, 10)
+        if 0 < cut <= limit:
+            return text[:cut]
+    return text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def _condition_label(condition: str) -> str:
+    condition = _strip_parens(condition)
+    shouted = [w for w in re.findall(r"[A-Za-z]+", condition) if len(w) > 1 and w.isupper()]
+    if shouted:
+        return shouted[0].title()
+    return _capitalize(_short(condition, MAX_LABEL_LENGTH))
+
+
+def _directive(sentence: str) -> Target | None:
+    jump = _JUMP_RE.search(sentence)
+    if jump:
+        return ("step", int(jump.group(1)))
+    if _END_RE.match(sentence):
+        return ("end", None)
+    if _CONTINUE_RE.match(sentence):
+        return ("next", None)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Actors
+# ---------------------------------------------------------------------------
+
+def _parse_actors(names: list[str]) -> tuple[list[Actor], list[tuple[str, str]]]:
+    """Actors plus (alias, actor id) pairs, longest alias first."""
+    actors = []
+    aliases: list[tuple[str, str]] = []
+    last_words: dict[str, list[str]] = {}
+    for i, raw in enumerate(names, start=1):
+        name = raw.strip().rstrip(".")
+        if not name:
+            continue
+        base = _strip_parens(name)
+        if not base:
+            continue  # "- (HR)": nothing to name the lane with
+        actor_id = f"actor_{i}"
+        inner = re.findall(r"\(([^)]*)\)", name)
+        actors.append(Actor(id=actor_id, name=base, description=", ".join(inner)))
+        aliases.append((base.lower(), actor_id))
+        aliases.extend((alias.strip().lower(), actor_id) for alias in inner if alias.strip())
+        last_words.setdefault(base.split()[-1].lower(), []).append(actor_id)
+    for word, ids in last_words.items():
+        if len(ids) == 1 and len(word) > 3 and (word, ids[0]) not in aliases:
+            aliases.append((word, ids[0]))
+    aliases.sort(key=lambda a: len(a[0]), reverse=True)
+    return actors, aliases
+
+
+def _actor_of(text: str, aliases: list[tuple[str, str]]) -> tuple[str | None, str]:
+    """(actor id, action text) for "Actor: action" or text starting with an actor."""
+    head, sep, rest = text.partition(":")
+    if sep:
+        for alias, actor_id in aliases:
+            if head.strip().lower() in (alias, f"the {alias}"):
+                return actor_id, rest.strip()
+    lowered = text.lower().removeprefix("the ")
+    for alias, actor_id in aliases:
+        if re.match(rf"{re.escape(alias)}\b", lowered):
+            return actor_id, text
+    return None, text
+
+
+# ---------------------------------------------------------------------------
+# Line structure
+# ---------------------------------------------------------------------------
+
+def _split_sections(text: str) -> tuple[str, str, list[str], list[_Step]]:
+    """(name, description, actor names, steps) from the raw text."""
+    head: list[str] = []
+    actor_names: list[str] = []
+    steps: list[_Step] = []
+    in_actors = False
+
+    for raw in text.splitlines():
+        if not raw.strip():
+            continue
+        indent = len(raw) - len(raw.lstrip())
+        line = raw.strip()
+
+        step = _STEP_RE.match(line)
+        if step and indent < 2:
+            in_actors = False
+            steps.append(_Step(number=int(step.group(1)), text=step.group(2).strip()))
+            continue
+        if steps:
+            bullet = _BULLET_RE.match(line)
+            if bullet:
+                steps[-1].bullets.append((indent, bullet.group(1).strip()))
+            elif steps[-1].bullets:
+                i, previous = steps[-1].bullets[-1]
+                steps[-1].bullets[-1] = (i, f"{previous} {line}")
+            else:
+                steps[-1].text = f"{steps[-1].text} {line}"
+            continue
+
+        actors = _ACTORS_RE.match(line)
+        if actors:
+            in_actors = True
+            if actors.group(1):
+                actor_names.extend(re.split(r",\s*|\s+and\s+", actors.group(1).rstrip(".")))
+            continue
+        if _FLOW_HEADER_RE.match(line):
+            in_actors = False
+            continue
+        bullet = _BULLET_RE.match(line)
+        if in_actors and bullet:
+            actor_names.append(bullet.group(1))
+        elif not actor_names:
+            head.append(line)
+        else:
+            raise _NoMatch(f"unexpected line: {line[:40]}")
+
+    name = head[0].rstrip(".:") if head else "Process"
+    return name, " ".join(head[1:]), actor_names, steps
+
+
+def _parse_branches(step: _Step) -> None:
+    """Sort a step's bullets into question, actions and branches."""
+    for indent, text in step.bullets:
+        current = step.branches[-1] if step.branches else None
+        if_match = _IF_RE.match(text)
+        else_match = _ELSE_RE.match(text)
+        if current is not None and indent > current.indent and not if_match and not else_match:
+            current.sentences.extend(_sentences(text))
+        elif if_match:
+            branch = _Branch(_condition_label(if_match.group(1)), [], indent)
+            branch.sentences = _sentences(if_match.group(2))
+            step.branches.append(branch)
+        elif else_match:
+            step.branches.append(_Branch("Otherwise", _sentences(else_match.group(1)), indent))
+        elif text.endswith("?") and step.question is None:
+            step.question = text
+        elif current is None:
+            step.actions.extend(_sentences(text))
+        else:
+            raise _NoMatch(f"bullet after a branch: {text[:40]}")
+
+    # Inline "If X then step N; otherwise step M" in the step text itself
+    for match in _INLINE_IF_RE.finditer(step.text):
+        step.branches.append(_Branch(
+            _condition_label(match.group(1)), [], target=("step", int(match.group(2)))
+        ))
+    otherwise = _INLINE_ELSE_RE.search(step.text)
+    if otherwise:
+        step.branches.append(_Branch("Otherwise", [], target=("step", int(otherwise.group(1)))))
+    step.text = _INLINE_ELSE_RE.sub("", _INLINE_IF_RE.sub("", step.text)).strip(" ;,.")
+
+
+# ---------------------------------------------------------------------------
+# Graph construction
+# ---------------------------------------------------------------------------
+
+class _Builder:
+    def __init__(self, actors: list[Actor], aliases: list[tuple[str, str]]) -> None:
+        self.aliases = aliases
+        self.actors = actors
+        self.events: list[BPMNEvent] = []
+        self.activities: list[Activity] = []
+        self.gateways: list[Gateway] = []
+        self.flows: list[SequenceFlow] = []
+        self.lane: dict[str, str] = {}
+        self.ends: dict[str, str] = {}
+        # (source id, target, label) resolved once every step has an entry
+        self.pending: list[tuple[str, Target, str | None, int]] = []
+
+    def activity(self, sentence: str, default_actor: str, description: str = "") -> str:
+        actor, _ = _actor_of(sentence, self.aliases)
+        lane = actor or default_actor
+        name = sentence
+        for alias, actor_id in self.aliases:
+            if actor_id == lane and name.lower().removeprefix("the ").startswith(alias):
+                name = name[name.lower().index(alias) + len(alias):].strip(" :,")
+                break
+        element_id = f"act_{len(self.activities) + 1}"
+        self.activities.append(Activity(
+            id=element_id,
+            name=_capitalize(_short(name or sentence, MAX_NAME_LENGTH)),
+            activity_type="serviceTask" if _SERVICE_RE.search(sentence) else "userTask",
+            lane_id=lane,
+            description=description or sentence,
+        ))
+        self.lane[element_id] = lane
+        return element_id
+
+    def gateway(self, name: str, lane: str) -> str:
+        element_id = f"gw_{len(self.gateways) + 1}"
+        self.gateways.append(Gateway(
+            id=element_id, name=_short(name, MAX_NAME_LENGTH), gateway_type="exclusive",
+            lane_id=lane,
+        ))
+        self.lane[element_id] = lane
+        return element_id
+
+    def event(self, event_id: str, name: str, kind: str, lane: str) -> str:
+        self.events.append(BPMNEvent(id=event_id, name=name, event_type=kind, lane_id=lane))
+        self.lane[event_id] = lane
+        return event_id
+
+    def end(self, lane: str) -> str:
+        if lane not in self.ends:
+            index = len(self.ends) + 1
+            self.ends[lane] = self.event(f"evt_end_{index}", "End", "end", lane)
+        return self.ends[lane]
+
+    def flow(self, source: str, target: str, label: str | None = None) -> None:
+        self.flows.append(SequenceFlow(
+            id=f"sf_{len(self.flows) + 1}", source_id=source, target_id=target,
+            condition_label=label,
+        ))
+
+    def defer(self, source: str, target: Target, label: str | None, next_step: int) -> None:
+        self.pending.append((source, target, label, next_step))
+
+    def branch(self, gateway: str, branch: _Branch, actor: str, next_step: int) -> None:
+        previous, label = gateway, branch.label
+        target = branch.target
+        for sentence in branch.sentences:
+            directive = _directive(sentence)
+            if directive is not None:
+                target = directive
+                break
+            element = self.activity(sentence, actor)
+            self.flow(previous, element, label)
+            previous, label = element, None
+        self.defer(previous, target or ("next", None), label, next_step)
+
+
+def _build(name: str, description: str, actors, aliases, steps: list[_Step]) -> ProcessFlow:
+    builder = _Builder(actors, aliases)
+    entries: dict[int, str] = {}
+    last_step = steps[-1].number
+
+    owners = [s for s in steps if s.owner is None]
+    for index, step in enumerate(owners):
+        following = owners[index + 1].number if index + 1 < len(owners) else last_step + 1
+        main = [s for s in _sentences(step.text) if _directive(s) is None]
+        for s in _sentences(step.text):
+            step.target = step.target or _directive(s)
+
+        element = builder.activity(main[0], step.actor, description=step.text) if main else None
+        if element is not None:
+            entries[step.number] = element
+        for action in step.actions:
+            next_element = builder.activity(action, step.actor)
+            if element is None:
+                entries[step.number] = next_element
+            else:
+                builder.flow(element, next_element)
+            element = next_element
+
+        if step.branches:
+            question = step.question or f"{step.branches[0].label}?"
+            gateway = builder.gateway(question, builder.lane.get(element, step.actor))
+            if element is None:
+                entries[step.number] = gateway
+            else:
+                builder.flow(element, gateway)
+            for joined in steps:
+                if joined.owner is step:
+                    entries[joined.number] = gateway
+            for branch in step.branches:
+                builder.branch(gateway, branch, step.actor, following)
+            if len(step.branches) == 1:
+                builder.defer(gateway, ("next", None), "Otherwise", following)
+        elif element is not None:
+            builder.defer(element, step.target or ("next", None), None, following)
+        else:
+            raise _NoMatch(f"step {step.number} has no action")
+
+    first = entries[steps[0].number]
+    builder.event("evt_start", "Start", "start", builder.lane[first])
+    builder.flow("evt_start", first)
+
+    for source, (kind, number), label, next_step in builder.pending:
+        if kind == "next":
+            number = next_step
+        if kind == "end" or number == last_step + 1:
+            target = builder.end(builder.lane[source])
+        elif number in entries:
+            target = entries[number]
+        else:
+            raise _NoMatch(f"reference to missing step {number}")
+        builder.flow(source, target, label)
+
+    if not actors or not builder.activities:
+        raise _NoMatch("no activities")  # e.g. every step is only a directive
+    return ProcessFlow(
+        name=name,
+        description=description,
+        actors=actors,
+        events=builder.events,
+        activities=builder.activities,
+        gateways=builder.gateways,
+        sequence_flows=builder.flows,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def parse_structured(text: str) -> ProcessFlow | None:
+    """Parse text that follows the structured grammar; None if it does not."""
+    try:
+        name, description, actor_names, steps = _split_sections(text)
+        actors, aliases = _parse_actors(actor_names)
+        if not actors or len(steps) < 2:
+            return None
+        if [s.number for s in steps] != list(range(1, len(steps) + 1)):
+            return None
+
+        previous: _Step | None = None
+        for step in steps:
+            if previous is not None and _INLINE_IF_RE.match(step.text):
+                # "3. If X then step 5; otherwise step 7": a decision after step 2
+                step.actor = previous.actor
+                _parse_branches(step)
+                previous = step
+                continue
+            joins = _IF_RE.match(step.text) or _ELSE_RE.match(step.text)
+            if joins and previous is not None:
+                # "3. If X: ..." / "4. Otherwise: ..." extend the decision after step 2
+                owner = previous.owner or previous
+                label = _condition_label(joins.group(1)) if _IF_RE.match(step.text) else "Otherwise"
+                body = joins.group(joins.lastindex)
+                owner.branches.append(_Branch(label, _sentences(body)))
+                step.owner = owner
+                continue
+            step.actor, step.text = _actor_of(step.text, aliases)
+            if step.actor is None:
+                return None
+            if ":" in step.text:
+                action, _, question = step.text.partition(":")
+                question = question.strip()
+                if not question or question.endswith("?"):
+                    step.text = action.strip()
+                    step.question = question or None
+            _parse_branches(step)
+            previous = step
+
+        process_flow, _ = repair_flow(_build(name, description, actors, aliases, steps))
+        return process_flow
+    except _NoMatch:
+        return None
@@ -0,0 +1,136 @@
+"""Incremental parsing of a streamed ProcessFlow JSON response.
+
+`IncrementalFlowParser.feed()` takes the LLM output chunk by chunk and returns
+each actor, event, activity, gateway and sequence flow as soon as its JSON
+object closes, so the client can draw swimlanes while the model is still
+writing flows. It tracks only what it needs — string/escape state, the open
+brackets and the current top-level key — and never re-scans earlier chunks.
+
+It raises `StreamAborted` as soon as the output clearly cannot become a valid
+ProcessFlow, so the caller can stop the stream (and stop paying for tokens):
+
+  - the response does not start with a JSON object
+  - a section (actors, events, …) is not a list
+  - brackets do not balance
+  - the activities list closes empty
+  - the response grows past MAX_RESPONSE_CHARS (a runaway generation)
+
+Objects that fail their own model validation are not emitted but do not
+abort: the validator usually repairs them once the whole response is in.
+"""
+
+import json
+
+from pydantic import BaseModel, ValidationError
+
+from src.bpmn.models import Activity, Actor, BPMNEvent, Gateway, SequenceFlow
+
+MAX_RESPONSE_CHARS = 60_000
+
+SECTIONS: dict[str, tuple[str, type[BaseModel]]] = {
+    "actors": ("actor", Actor),
+    "events": ("event", BPMNEvent),
+    "activities": ("activity", Activity),
+    "gateways": ("gateway", Gateway),
+    "sequence_flows": ("flow", SequenceFlow),
+}
+
+
+class StreamAborted(ValueError):
+    """The streamed response cannot become a valid ProcessFlow."""
+
+
+class IncrementalFlowParser:
+    """Emits complete section items from a ProcessFlow JSON stream."""
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.counts = dict.fromkeys(SECTIONS, 0)  # items emitted
+        self._seen = dict.fromkeys(SECTIONS, 0)   # objects closed, valid or not
+        self._stack: list[str] = []  # closing bracket expected at each open level
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: str | None = None
+        self._key: str | None = None
+        self._value_next = False  # a top-level value starts at the next token
+        self._section: str | None = None
+        self._item_start: int | None = None
+        self._started = False
+
+    def feed(self, chunk: str) -> list[tuple[str, dict]]:
+        """Consume `chunk`; return (kind, item) for every object it completed."""
+        start = len(self.text)
+        self.text += chunk
+        if len(self.text) > MAX_RESPONSE_CHARS:
+            raise StreamAborted(f"response exceeded {MAX_RESPONSE_CHARS} characters")
+        items = []
+        for i in range(start, len(self.text)):
+            item = self._step(i, self.text[i])
+            if item is not None:
+                items.append(item)
+        return items
+
+    def _step(self, i: int, c: str) -> tuple[str, dict] | None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                if len(self._stack) == 1:
+                    self._last_string = self.text[self._string_start + 1:i]
+            return None
+
+        if c.isspace():
+            return None
+        if not self._started:
+            if c != "{":
+                raise StreamAborted("response is not a JSON object")
+            self._started = True
+        depth = len(self._stack)
+        if depth == 0 and c != "{":
+            return None  # trailing text after the object is ignored
+
+        if depth == 1 and self._value_next:
+            self._value_next = False
+            self._section = None
+            if self._key in SECTIONS:
+                if c != "[":
+                    raise StreamAborted(f"{self._key} is not a list")
+                self._section = self._key
+
+        if c == '"':
+            self._in_string = True
+            self._string_start = i
+        elif c == ":" and depth == 1:
+            self._key = self._last_string
+            self._value_next = True
+        elif c in "{[":
+            if depth == 2 and self._section and c == "{":
+                self._item_start = i
+            self._stack.append("}" if c == "{" else "]")
+        elif c in "}]":
+            if not self._stack or self._stack.pop() != c:
+                raise StreamAborted("unbalanced brackets")
+            depth = len(self._stack)
+            if depth == 2 and c == "}" and self._item_start is not None:
+                item = self._complete(self.text[self._item_start:i + 1])
+                self._item_start = None
+                return item
+            if depth == 1 and c == "]" and self._section:
+                if self._section == "activities" and not self._seen["activities"]:
+                    raise StreamAborted("no activities")
+                self._section = None
+        return None
+
+    def _complete(self, raw: str) -> tuple[str, dict] | None:
+        kind, model = SECTIONS[self._section]
+        self._seen[self._section] += 1
+        try:
+            item = model.model_validate(json.loads(raw)).model_dump()
+        except (ValueError, ValidationError):
+            return None  # left for the validator to repair from the full response
+        self.counts[self._section] += 1
+        return kind, item
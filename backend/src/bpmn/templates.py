@@ -0,0 +1,235 @@
+"""Precompiled process flow templates.
+
+Each data/templates/<id>.txt is compiled once — parsed by the LLM and turned
+into BPMN XML — and the result is written next to it as
+<id>.compiled.json, together with the sha256 of the text, the model and the
+parser prompt version it was built with. A compiled file that no longer
+matches its text (or the current model/prompt) is stale and ignored; one
+built by an older generator or another BPMN_LAYOUT keeps its parsed flow and
+only has its XML regenerated.
+
+`TemplateLibrary` holds every template in memory with its serialized
+response body and ETag, so GET /api/bpmn/templates and
+GET /api/bpmn/templates/{id} never touch disk or the LLM. A DirectoryWatcher
+over data/templates reloads the library when a .txt file changes and
+compiles new or edited templates in the background.
+
+Build step (e.g. in CI or the Docker image):
+    cd backend
+    python -m src.bpmn.templates compile
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+from src.bpmn.cache import PROMPT_VERSION, normalize_text
+from src.bpmn.generator import XML_VERSION, generate_bpmn_xml
+from src.bpmn.models import ProcessFlow
+from src.etag import json_bytes, make_etag
+from src.org_store import write_json_atomic
+from src.watcher import DirectoryWatcher
+
+logger = logging.getLogger(__name__)
+
+COMPILED_SUFFIX = ".compiled.json"
+
+Compiler = Callable[[str], ProcessFlow]
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Template:
+    """One template: its text plus, once compiled, the parsed flow and XML."""
+
+    def __init__(self, path: Path, text: str, compiled: dict | None) -> None:
+        self.id = path.stem
+        self.name = path.stem.replace("_", " ").title()
+        self.path = path
+        self.text = text
+        self.process_json: dict | None = compiled["process_json"] if compiled else None
+        self.bpmn_xml: str | None = compiled["bpmn_xml"] if compiled else None
+        self.body, self.etag = self._serialize()
+
+    @property
+    def compiled(self) -> bool:
+        return self.bpmn_xml is not None
+
+    def summary(self) -> dict:
+        return {"id": self.id, "name": self.name, "text": self.text, "compiled": self.compiled}
+
+    def _serialize(self) -> tuple[bytes, str]:
+        body = json_bytes({
+            **self.summary(),
+            "bpmn_xml": self.bpmn_xml,
+            "process_json": self.process_json,
+        })
+        return body, make_etag(body)
+
+
+class TemplateLibrary:
+    """In-memory templates from one directory, compiled ahead of time."""
+
+    def __init__(self, templates_dir: Path, model: str) -> None:
+        self.templates_dir = templates_dir
+        self.model = model
+        self.templates: dict[str, Template] = {}
+        self.listing: tuple[bytes, str] = (b"[]", make_etag(b"[]"))  # (body, etag)
+        self._by_text: dict[str, Template] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._compile_lock = threading.Lock()
+
+    def compiled_path(self, template_id: str) -> Path:
+        return self.templates_dir / f"{template_id}{COMPILED_SUFFIX}"
+
+    # -- Loading -----------------------------------------------------------
+
+    def _read_compiled(self, path: Path, text: str) -> dict | None:
+        try:
+            with open(self.compiled_path(path.stem), "r", encoding="utf-8") as f:
+                compiled = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable %s: %s", path.stem + COMPILED_SUFFIX, exc)
+            return None
+        fresh = (
+            compiled.get("source_sha256") == _sha256(text)
+            and compiled.get("model") == self.model
+            and compiled.get("prompt_version") == PROMPT_VERSION
+        )
+        if not fresh:
+            return None
+        if compiled.get("xml_version") != XML_VERSION:
+            # The parse is still valid; only the drawing changed
+            process_flow = ProcessFlow.model_validate(compiled["process_json"])
+            compiled["bpmn_xml"] = generate_bpmn_xml(process_flow)
+            compiled["xml_version"] = XML_VERSION
+        return compiled
+
+    def reload(self) -> None:
+        """Re-read every template and its compiled output from disk."""
+        templates: dict[str, Template] = {}
+        if self.templates_dir.exists():
+            for path in sorted(self.templates_dir.glob("*.txt")):
+                try:
+                    text = path.read_text(encoding="utf-8")
+                except OSError as exc:
+                    logger.warning("Could not read template %s: %s", path.name, exc)
+                    continue
+                templates[path.stem] = Template(path, text, self._read_compiled(path, text))
+        list_body = json_bytes([t.summary() for t in templates.values()])
+        with self._lock:
+            self.templates = templates
+            self._by_text = {normalize_text(t.text): t for t in templates.values()}
+            self.listing = (list_body, make_etag(list_body))
+            self._loaded = True
+
+    def ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.reload()
+
+    def get(self, template_id: str) -> Template | None:
+        self.ensure_loaded()
+        return self.templates.get(template_id)
+
+    def match(self, text: str) -> Template | None:
+        """The compiled template whose text equals `text` (ignoring whitespace and case)."""
+        self.ensure_loaded()
+        template = self._by_text.get(normalize_text(text))
+        return template if template is not None and template.compiled else None
+
+    # -- Compilation -------------------------------------------------------
+
+    def compile(self, template_id: str, parse: Compiler) -> Template:
+        """Parse one template with `parse`, persist the result and reload it."""
+        with self._compile_lock:
+            template = self.get(template_id)
+            if template is None:
+                raise KeyError(template_id)
+            if template.compiled:
+                return template  # compiled by a concurrent caller
+            process_flow = parse(template.text)
+            write_json_atomic(self.compiled_path(template_id), {
+                "source_sha256": _sha256(template.text),
+                "model": self.model,
+                "prompt_version": PROMPT_VERSION,
+                "xml_version": XML_VERSION,
+                "process_json": process_flow.model_dump(),
+                "bpmn_xml": generate_bpmn_xml(process_flow),
+            })
+            logger.info("Compiled template %s", template_id)
+            self.reload()
+            return self.templates[template_id]
+
+    def compile_missing(self, parse: Compiler) -> list[str]:
+        """Compile every template without fresh compiled output; returns their ids."""
+        self.ensure_loaded()
+        compiled = []
+        for template_id, template in list(self.templates.items()):
+            if template.compiled:
+                continue
+            try:
+                self.compile(template_id, parse)
+            except Exception as exc:
+                logger.warning("Could not compile template %s: %s", template_id, exc)
+                continue
+            compiled.append(template_id)
+        return compiled
+
+
+def start_template_watcher(
+    library: TemplateLibrary,
+    parse: Compiler | None = None,
+    debounce: float = 1.0,
+) -> DirectoryWatcher:
+    """Reload `library` when a template changes; compile new ones if `parse` is given."""
+
+    def _refresh(_paths: set[Path] | None = None) -> None:
+        library.reload()
+        if parse is not None:
+            library.compile_missing(parse)
+
+    # Initial load and compilation off the startup path
+    threading.Thread(target=_refresh, name="template-compile", daemon=True).start()
+    return DirectoryWatcher(
+        [library.templates_dir],
+        _refresh,
+        path_filter=lambda p: p.suffix == ".txt",
+        debounce=debounce,
+    ).start()
+
+
+def main(argv: list[str] | None = None) -> None:
+    from src.bpmn.parser import parse_text
+    from src.bpmn.tiers import model_key
+    from src.config import DATA_DIR
+
+    parser = argparse.ArgumentParser(description="Precompile BPMN process templates.")
+    parser.add_argument("command", choices=["compile"])
+    parser.add_argument("--dir", type=Path, default=DATA_DIR / "templates")
+    parser.add_argument("--force", action="store_true", help="Recompile fresh templates too")
+    args = parser.parse_args(argv)
+
+    library = TemplateLibrary(args.dir, model_key())
+    library.reload()
+    if args.force:
+        for template_id in library.templates:
+            library.compiled_path(template_id).unlink(missing_ok=True)
+        library.reload()
+    names = library.compile_missing(parse_text)
+    missing = [t for t in library.templates.values() if not t.compiled]
+    print(f"Compiled {len(names)} template(s): {', '.join(names) or '-'}")
+    if missing:
+        raise SystemExit(f"Failed to compile: {', '.join(t.id for t in missing)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Tiered model selection for LLM BPMN parsing.
+
+Most process descriptions are a handful of steps, which the small
+ROUTER_MODEL extracts as well as the 70B LLM_MODEL, faster and cheaper.
+`parse_process_text` therefore tries the small model first when
+`is_simple()` says the text is short and has few decision points. If that
+attempt fails (API error, bad JSON, or a graph that would need any repair
+by the local validator), it escalates to LLM_MODEL with its usual
+correction retry.
+
+`tier_stats` records every attempt per tier, so the thresholds
+(BPMN_SMALL_MAX_CHARS, BPMN_SMALL_MAX_BRANCHES) can be tuned from
+GET /api/admin/bpmn-tiers. A cached parse may come from either tier, so
+cached results are keyed on `model_key()`, which names both models and the
+thresholds; changing any of them invalidates the cache.
+"""
+
+import re
+import threading
+from collections import deque
+
+from src.config import (
+    BPMN_SMALL_MAX_BRANCHES,
+    BPMN_SMALL_MAX_CHARS,
+    BPMN_TIERED_PARSE,
+    LLM_MODEL,
+    ROUTER_MODEL,
+)
+
+# Words that introduce a gateway; each one is a branch the model must wire up
+_BRANCH_RE = re.compile(
+    r"\b(?:if|otherwise|else|whether|unless|either|in case|depending on)\b", re.IGNORECASE
+)
+
+
+def is_simple(
+    text: str,
+    max_chars: int = BPMN_SMALL_MAX_CHARS,
+    max_branches: int = BPMN_SMALL_MAX_BRANCHES,
+) -> bool:
+    """Whether `text` is small enough to try the small model first."""
+    if not BPMN_TIERED_PARSE:
+        return False
+    return len(text) <= max_chars and len(_BRANCH_RE.findall(text)) <= max_branches
+
+
+def model_key(
+    tiered: bool = BPMN_TIERED_PARSE,
+    small_model: str = ROUTER_MODEL,
+    large_model: str = LLM_MODEL,
+    max_chars: int = BPMN_SMALL_MAX_CHARS,
+    max_branches: int = BPMN_SMALL_MAX_BRANCHES,
+) -> str:
+    """The models that may produce a parse and the policy choosing between them."""
+    if not tiered:
+        return large_model
+    return f"{small_model}[chars<={max_chars},branches<={max_branches}]>{large_model}"
+
+
+class TierStats:
+    """Thread-safe success and latency counters per model tier."""
+
+    def __init__(self, keep: int = 200) -> None:
+        self._keep = keep
+        self._tiers: dict[str, dict] = {}
+        self._escalations = 0
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, model: str, ok: bool, seconds: float) -> None:
+        with self._lock:
+            stats = self._tiers.setdefault(tier, {
+                "model": model, "attempts": 0, "successes": 0, "total_s": 0.0,
+                "recent_ms": deque(maxlen=self._keep),
+            })
+            stats["model"] = model
+            stats["attempts"] += 1
+            stats["successes"] += ok
+            stats["total_s"] += seconds
+            stats["recent_ms"].append(seconds * 1000)
+
+    def escalated(self) -> None:
+        with self._lock:
+            self._escalations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for tier, s in self._tiers.items():
+                recent = sorted(s["recent_ms"])
+                tiers[tier] = {
+                    "model": s["model"],
+                    "attempts": s["attempts"],
+                    "successes": s["successes"],
+                    "success_rate": round(s["successes"] / s["attempts"], 3),
+                    "mean_ms": round(s["total_s"] * 1000 / s["attempts"], 1),
+                    "p95_ms": round(recent[int(0.95 * (len(recent) - 1))], 1),
+                }
+            return {
+                "enabled": BPMN_TIERED_PARSE,
+                "small_max_chars": BPMN_SMALL_MAX_CHARS,
+                "small_max_branches": BPMN_SMALL_MAX_BRANCHES,
+                "escalations": self._escalations,
+                "tiers": tiers,
+            }
+
+
+tier_stats = TierStats()
@@ -0,0 +1,342 @@
+"""Structural validation and deterministic repair of parsed process flows.
+
+`ProcessFlow.model_validate` only checks field types; it happily accepts a
+graph with flows pointing at missing elements, activities nobody reaches, or
+no end event. Previously any schema failure cost a second full LLM call.
+Most defects are mechanical, so they are fixed here instead:
+
+  - JSON wrapped in markdown fences or prose     -> extract the object
+  - missing, blank or duplicate ids              -> synthesize unique ids
+  - unknown activity/gateway/event types, names  -> sensible defaults
+  - unknown or missing lane_id                   -> a connected element's lane
+  - flows with unknown endpoints, self-loops     -> dropped
+  - no start event / start without outgoing flow -> add / connect one
+  - element without incoming flow                -> spliced in where the
+    preceding step ends, else after the preceding element
+  - element without outgoing flow, no end event  -> connect to an end event
+  - unlabeled branches of a decision gateway     -> Yes/No or the target name
+
+Only what cannot be repaired (no activities, values of the wrong type) is
+raised as `UnrepairableFlow`, and only that escalates to the LLM retry.
+"""
+
+import json
+import re
+
+from pydantic import ValidationError
+
+from src.bpmn.models import BPMNEvent, ProcessFlow, SequenceFlow
+
+_SECTIONS = {
+    "actors": "actor",
+    "events": "evt",
+    "activities": "act",
+    "gateways": "gw",
+    "sequence_flows": "sf",
+}
+_ACTIVITY_TYPES = {t.lower(): t for t in ("userTask", "serviceTask", "manualTask")}
+_GATEWAY_TYPES = {"exclusive", "parallel", "inclusive"}
+_EVENT_TYPES = {"start", "end", "intermediate"}
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.I)
+
+
+class UnrepairableFlow(ValueError):
+    """The parse output has defects that cannot be fixed without the LLM."""
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+
+def validate_flow(flow: ProcessFlow) -> list[str]:
+    """Return the structural defects of `flow` (empty if it is sound)."""
+    defects = []
+    elements = [*flow.events, *flow.activities, *flow.gateways]
+    ids = [e.id for e in elements]
+    element_ids = set(ids)
+    lanes = {a.id for a in flow.actors}
+
+    for duplicate in sorted({i for i in ids if ids.count(i) > 1}):
+        defects.append(f"duplicate id {duplicate!r}")
+    for element in elements:
+        if element.lane_id not in lanes:
+            defects.append(f"{element.id!r} is in unknown lane {element.lane_id!r}")
+
+    incoming: dict[str, int] = {}
+    outgoing: dict[str, list[SequenceFlow]] = {}
+    for sf in flow.sequence_flows:
+        if sf.source_id not in element_ids or sf.target_id not in element_ids:
+            defects.append(f"flow {sf.id!r} references a missing element")
+            continue
+        incoming[sf.target_id] = incoming.get(sf.target_id, 0) + 1
+        outgoing.setdefault(sf.source_id, []).append(sf)
+
+    kinds = {e.id: e.event_type for e in flow.events}
+    if "start" not in kinds.values():
+        defects.append("no start event")
+    if "end" not in kinds.values():
+        defects.append("no end event")
+    for element_id in ids:
+        if kinds.get(element_id) != "start" and not incoming.get(element_id):
+            defects.append(f"{element_id!r} has no incoming flow")
+        if kinds.get(element_id) != "end" and not outgoing.get(element_id):
+            defects.append(f"{element_id!r} has no outgoing flow")
+    for gateway in flow.gateways:
+        branches = outgoing.get(gateway.id, [])
+        if gateway.gateway_type != "parallel" and len(branches) > 1:
+            if any(not sf.condition_label for sf in branches):
+                defects.append(f"gateway {gateway.id!r} has unlabeled branches")
+    return defects
+
+
+# ---------------------------------------------------------------------------
+# Repair
+# ---------------------------------------------------------------------------
+
+def extract_json(raw: str) -> dict:
+    """Parse an LLM response as a JSON object, tolerating fences and surrounding prose."""
+    text = _FENCE_RE.sub("", raw.strip())
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            raise
+        return json.loads(text[start:end + 1])
+
+
+def _unique_id(prefix: str, taken: set[str]) -> str:
+    n = 1
+    while f"{prefix}_{n}" in taken:
+        n += 1
+    taken.add(f"{prefix}_{n}")
+    return f"{prefix}_{n}"
+
+
+def _repair_fields(data: dict, repairs: list[str]) -> dict:
+    """Fix the raw dict so it passes ProcessFlow validation where that is mechanical."""
+    if not isinstance(data, dict):
+        raise UnrepairableFlow("response is not a JSON object")
+    data = dict(data)
+    if not isinstance(data.get("name"), str) or not data["name"].strip():
+        data["name"] = "Process"
+        repairs.append("named the process")
+
+    taken: set[str] = set()
+    for section, prefix in _SECTIONS.items():
+        items = data.get(section) or []
+        if not isinstance(items, list):
+            raise UnrepairableFlow(f"{section} is not a list")
+        kept = []
+        for item in items:
+            if not isinstance(item, dict):
+                repairs.append(f"dropped a malformed {prefix} entry")
+                continue
+            item = dict(item)
+            item_id = item.get("id")
+            if not isinstance(item_id, str) or not item_id.strip() or item_id in taken:
+                item["id"] = _unique_id(prefix, taken)
+                repairs.append(f"assigned id {item['id']!r}")
+            else:
+                taken.add(item_id)
+            kept.append(item)
+        data[section] = kept
+
+    for actor in data["actors"]:
+        if not actor.get("name"):
+            actor["name"] = actor["id"].replace("_", " ").title()
+    for section in ("events", "activities", "gateways"):
+        for element in data[section]:
+            if not isinstance(element.get("name"), str):
+                element["name"] = ""
+            if not isinstance(element.get("lane_id"), str):
+                element["lane_id"] = ""  # reassigned from the graph below
+    for event in data["events"]:
+        if event.get("event_type") not in _EVENT_TYPES:
+            guess = next((t for t in ("start", "end") if t in event["id"].lower()), "intermediate")
+            repairs.append(f"set event {event['id']!r} type to {guess}")
+            event["event_type"] = guess
+    for activity in data["activities"]:
+        kind = str(activity.get("activity_type", "userTask"))
+        activity["activity_type"] = _ACTIVITY_TYPES.get(kind.lower(), "userTask")
+    for gateway in data["gateways"]:
+        kind = str(gateway.get("gateway_type", "exclusive")).lower()
+        gateway["gateway_type"] = kind if kind in _GATEWAY_TYPES else "exclusive"
+
+    flows = []
+    for sf in data["sequence_flows"]:
+        if isinstance(sf.get("source_id"), str) and isinstance(sf.get("target_id"), str):
+            flows.append(sf)
+        else:
+            repairs.append(f"dropped flow {sf['id']!r} without endpoints")
+    data["sequence_flows"] = flows
+
+    if not data["actors"]:
+        lanes = sorted({e["lane_id"] for s in ("events", "activities", "gateways")
+                        for e in data[s] if e["lane_id"]})
+        data["actors"] = [{"id": lane, "name": lane.replace("_", " ").title()} for lane in lanes]
+        if not data["actors"]:
+            data["actors"] = [{"id": _unique_id("actor", taken), "name": data["name"]}]
+        repairs.append("created actors from lane ids")
+    if not data["activities"]:
+        raise UnrepairableFlow("no activities")
+    return data
+
+
+class _Graph:
+    """Mutable view of a ProcessFlow used while repairing it."""
+
+    def __init__(self, flow: ProcessFlow) -> None:
+        self.flow = flow.model_copy(deep=True)
+        self.taken = {x.id for x in (*self.flow.events, *self.flow.activities,
+                                     *self.flow.gateways, *self.flow.sequence_flows)}
+
+    @property
+    def elements(self) -> list:
+        return [*self.flow.events, *self.flow.activities, *self.flow.gateways]
+
+    def incoming(self, element_id: str) -> list[SequenceFlow]:
+        return [sf for sf in self.flow.sequence_flows if sf.target_id == element_id]
+
+    def outgoing(self, element_id: str) -> list[SequenceFlow]:
+        return [sf for sf in self.flow.sequence_flows if sf.source_id == element_id]
+
+    def connect(self, source: str, target: str, label: str | None = None) -> None:
+        self.flow.sequence_flows.append(SequenceFlow(
+            id=_unique_id("sf", self.taken), source_id=source, target_id=target,
+            condition_label=label,
+        ))
+
+    def add_event(self, kind: str, lane: str) -> str:
+        event_id = _unique_id(f"evt_{kind}", self.taken)
+        self.flow.events.append(BPMNEvent(
+            id=event_id, name=kind.title(), event_type=kind, lane_id=lane,
+        ))
+        return event_id
+
+
+def repair_flow(flow: ProcessFlow) -> tuple[ProcessFlow, list[str]]:
+    """Return a structurally sound copy of `flow` and a description of each fix."""
+    g = _Graph(flow)
+    f = g.flow
+    repairs: list[str] = []
+    ids = {e.id for e in g.elements}
+    kinds = {e.id: e.event_type for e in f.events}
+
+    # Flows: drop dangling, self-loop and duplicate flows
+    seen: set[tuple[str, str]] = set()
+    kept = []
+    for sf in f.sequence_flows:
+        key = (sf.source_id, sf.target_id)
+        if sf.source_id not in ids or sf.target_id not in ids or sf.source_id == sf.target_id:
+            repairs.append(f"dropped dangling flow {sf.id!r}")
+        elif key in seen:
+            repairs.append(f"dropped duplicate flow {sf.id!r}")
+        else:
+            seen.add(key)
+            kept.append(sf)
+    f.sequence_flows = kept
+
+    # Lanes: unknown lanes take a neighbour's lane, else the first actor's
+    lanes = {a.id for a in f.actors}
+    for element in g.elements:
+        if element.lane_id in lanes:
+            continue
+        neighbours = [sf.source_id for sf in g.incoming(element.id)]
+        neighbours += [sf.target_id for sf in g.outgoing(element.id)]
+        lane_of = {e.id: e.lane_id for e in g.elements}
+        lane = next((lane_of[n] for n in neighbours if lane_of[n] in lanes), f.actors[0].id)
+        repairs.append(f"moved {element.id!r} from unknown lane {element.lane_id!r} to {lane!r}")
+        element.lane_id = lane
+    for element in g.elements:
+        if not element.name:
+            element.name = element.id
+
+    steps = [*f.activities, *f.gateways]  # declaration order
+
+    # Start event
+    starts = [e.id for e in f.events if e.event_type == "start"]
+    if not starts:
+        first = next((s for s in steps if not g.incoming(s.id)), steps[0])
+        starts = [g.add_event("start", first.lane_id)]
+        kinds[starts[0]] = "start"
+        g.connect(starts[0], first.id)
+        repairs.append(f"added a start event before {first.id!r}")
+    for start in starts:
+        if not g.outgoing(start):
+            first = next((s for s in steps if not g.incoming(s.id)), steps[0])
+            g.connect(start, first.id)
+            repairs.append(f"connected start event {start!r} to {first.id!r}")
+
+    # Unreached steps: splice in where the preceding step ends, else follow it
+    for index, step in enumerate(steps):
+        if g.incoming(step.id):
+            continue
+        previous = steps[:index]
+        ending = next((
+            sf for s in reversed(previous) for sf in g.outgoing(s.id)
+            if kinds.get(sf.target_id) == "end"
+        ), None)
+        if ending is not None:
+            if not g.outgoing(step.id):
+                g.connect(step.id, ending.target_id)
+            ending.target_id = step.id
+            repairs.append(f"routed {ending.source_id!r} through unreached {step.id!r}")
+        else:
+            source = previous[-1].id if previous else starts[0]
+            g.connect(source, step.id)
+            repairs.append(f"connected unreached {step.id!r} after {source!r}")
+
+    # End events nothing reaches are dropped; dead ends flow to an end event
+    for event in list(f.events):
+        if event.event_type == "end" and not g.incoming(event.id):
+            f.events.remove(event)
+            repairs.append(f"dropped unreachable end event {event.id!r}")
+    ends = {e.lane_id: e.id for e in f.events if e.event_type == "end"}
+    dead_ends = [s for s in steps if not g.outgoing(s.id)]
+    if not ends and not dead_ends:
+        dead_ends = [steps[-1]]  # every path loops; give the last step a way out
+    for step in dead_ends:
+        if step.lane_id not in ends:
+            ends[step.lane_id] = g.add_event("end", step.lane_id)
+            repairs.append(f"added an end event in lane {step.lane_id!r}")
+        g.connect(step.id, ends[step.lane_id])
+        repairs.append(f"connected dead end {step.id!r} to an end event")
+
+    # Decision gateways need a label on every branch
+    names = {e.id: e.name for e in g.elements}
+    for gateway in f.gateways:
+        branches = g.outgoing(gateway.id)
+        if gateway.gateway_type == "parallel" or len(branches) < 2:
+            continue
+        unlabeled = [sf for sf in branches if not sf.condition_label]
+        if not unlabeled:
+            continue
+        defaults = ["Yes", "No"] if len(branches) == 2 and len(unlabeled) == 2 else None
+        for i, sf in enumerate(unlabeled):
+            sf.condition_label = defaults[i] if defaults else names[sf.target_id][:30]
+        repairs.append(f"labeled {len(unlabeled)} branch(es) of {gateway.id!r}")
+
+    return f, repairs
+
+
+def repair_process(data: dict, repair_graph: bool = True) -> tuple[ProcessFlow, list[str]]:
+    """Validate raw parser output, repairing what is mechanical.
+
+    Returns (flow, repairs). Raises UnrepairableFlow if the output cannot be
+    turned into a sound ProcessFlow locally — or, with repair_graph=False,
+    if its graph needs any repair (field repairs are still applied).
+    """
+    repairs: list[str] = []
+    data = _repair_fields(data, repairs)
+    try:
+        flow = ProcessFlow.model_validate(data)
+    except ValidationError as exc:
+        raise UnrepairableFlow(str(exc)) from exc
+    if repair_graph:
+        flow, graph_repairs = repair_flow(flow)
+        repairs.extend(graph_repairs)
+    defects = validate_flow(flow)
+    if defects:
+        raise UnrepairableFlow("; ".join(defects))
+    return flow, repairs
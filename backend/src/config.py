@@ -15,6 +15,40 @@ GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
 # ChromaDB
 CHROMA_PERSIST_DIR: str = os.getenv("CHROMA_PERSIST_DIR", str(_backend_dir / "chroma_store"))
 COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "doc-agent-index")
+# Kept outside CHROMA_PERSIST_DIR so it survives full rebuilds of the store
+EMBEDDING_CACHE_PATH: str = os.getenv(
+    "EMBEDDING_CACHE_PATH", str(_backend_dir / "embedding_cache.sqlite3")
+)
+# BPMN parse results keyed by normalised text + model + prompt (see src/bpmn/cache.py)
+BPMN_CACHE_PATH: str = os.getenv("BPMN_CACHE_PATH", str(_backend_dir / "bpmn_cache.sqlite3"))
+BPMN_CACHE_SIZE: int = int(os.getenv("BPMN_CACHE_SIZE", "256"))
+# BPMN element placement: "bfs" (BFS depth) or "layered" (see src/bpmn/layout.py)
+BPMN_LAYOUT: str = os.getenv("BPMN_LAYOUT", "bfs")
+# Long documents (POST /api/bpmn/parse/long) are parsed in sections of at most
+# BPMN_SECTION_CHARS, BPMN_LONG_PARSE_WORKERS at a time (see src/bpmn/longdoc.py)
+BPMN_LONG_PARSE_MAX_CHARS: int = int(os.getenv("BPMN_LONG_PARSE_MAX_CHARS", "60000"))
+BPMN_SECTION_CHARS: int = int(os.getenv("BPMN_SECTION_CHARS", "4000"))
+BPMN_LONG_PARSE_WORKERS: int = int(os.getenv("BPMN_LONG_PARSE_WORKERS", "4"))
+# Batch parse jobs (POST /api/bpmn/batches, see src/bpmn/batch.py); results persist
+# in BPMN_BATCH_DB_PATH so unfinished batches resume after a restart
+BPMN_BATCH_DB_PATH: str = os.getenv(
+    "BPMN_BATCH_DB_PATH", str(_backend_dir / "bpmn_batches.sqlite3")
+)
+BPMN_BATCH_MAX_ITEMS: int = int(os.getenv("BPMN_BATCH_MAX_ITEMS", "1000"))
+BPMN_BATCH_CONCURRENCY: int = int(os.getenv("BPMN_BATCH_CONCURRENCY", "4"))
+BPMN_BATCH_MAX_CONCURRENCY: int = int(os.getenv("BPMN_BATCH_MAX_CONCURRENCY", "16"))
+# LLM requests per minute shared by all batches (Groq free tier: 30)
+BPMN_BATCH_RPM: float = float(os.getenv("BPMN_BATCH_RPM", "30"))
+BPMN_BATCH_MAX_ATTEMPTS: int = int(os.getenv("BPMN_BATCH_MAX_ATTEMPTS", "3"))
+# Try ROUTER_MODEL before LLM_MODEL for texts of at most BPMN_SMALL_MAX_CHARS with at
+# most BPMN_SMALL_MAX_BRANCHES decision words; escalate if its output fails validation
+BPMN_TIERED_PARSE: bool = os.getenv("BPMN_TIERED_PARSE", "true").lower() in ("1", "true", "yes")
+BPMN_SMALL_MAX_CHARS: int = int(os.getenv("BPMN_SMALL_MAX_CHARS", "1500"))
+BPMN_SMALL_MAX_BRANCHES: int = int(os.getenv("BPMN_SMALL_MAX_BRANCHES", "2"))
+# Compile data/templates/*.txt to BPMN at startup (structured ones need no LLM)
+BPMN_PRECOMPILE_TEMPLATES: bool = os.getenv(
+    "BPMN_PRECOMPILE_TEMPLATES", "true"
+).lower() in ("1", "true", "yes")
 
 # LLM (embeddings use local all-MiniLM-L6-v2, no API key needed)
 LLM_MODEL: str = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
@@ -28,8 +62,24 @@ FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
 # Auth
 SESSION_SECRET: str = os.getenv("SESSION_SECRET", "dev-only-change-in-prod")
 
+# Ingest file watcher — re-indexes changed files in data/documents and data/org
+INGEST_WATCH: bool = os.getenv("INGEST_WATCH", "false").lower() in ("1", "true", "yes")
+INGEST_WATCH_DEBOUNCE: float = float(os.getenv("INGEST_WATCH_DEBOUNCE", "3.0"))
+
+# Event loop: threads for off-loop file I/O, and the loop-lag (ms) logged as a stall
+IO_WORKERS: int = int(os.getenv("IO_WORKERS", "8"))
+LOOP_LAG_THRESHOLD_MS: float = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+
 # Paths
 DATA_DIR: Path = _backend_dir / "data"
 DOCUMENTS_DIR: Path = DATA_DIR / "documents"
 ORG_DIR: Path = DATA_DIR / "org"
 URL_MAP_PATH: Path = DATA_DIR / "url_map.json"
+
+# Org diagram storage: "json" (data/org/*.json), "journal" (the same snapshots
+# plus an append-only op log) or "sqlite" (ORG_DB_PATH).
+# Migrate to sqlite with: python -m src.org_sqlite migrate
+ORG_STORAGE: str = os.getenv("ORG_STORAGE", "json").lower()
+ORG_DB_PATH: Path = Path(os.getenv("ORG_DB_PATH", str(DATA_DIR / "org.sqlite3")))
+# Journal records per diagram before it is folded into its snapshot
+ORG_JOURNAL_COMPACT_EVERY: int = int(os.getenv("ORG_JOURNAL_COMPACT_EVERY", "100"))
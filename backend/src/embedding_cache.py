@@ -0,0 +1,120 @@
+"""Persistent embedding cache for the ingestion pipeline.
+
+Chunk embeddings are stored in a small SQLite database keyed by
+sha256(model name + chunk text). A full rebuild of the vector store then only
+runs the ONNX model for chunks whose text actually changed since the last run.
+
+Usage:
+    with EmbeddingCache(EMBEDDING_CACHE_PATH) as cache:
+        vectors, computed = embed_with_cache(texts, DefaultEmbeddingFunction(), cache)
+"""
+
+import hashlib
+import sqlite3
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+import numpy as np
+
+# Model used by chromadb's DefaultEmbeddingFunction (see src/embeddings.py)
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key    TEXT PRIMARY KEY,
+    dim    INTEGER NOT NULL,
+    vector BLOB NOT NULL
+)
+"""
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Return the cache key for a chunk text embedded with `model_name`."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of float32 embedding vectors."""
+
+    def __init__(self, path: Path | str, model_name: str = EMBEDDING_MODEL_NAME) -> None:
+        self.path = Path(path)
+        self.model_name = model_name
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+
+    def get_many(self, texts: Sequence[str]) -> list[np.ndarray | None]:
+        """Look up cached vectors for `texts` (None for cache misses)."""
+        keys = [cache_key(self.model_name, t) for t in texts]
+        found: dict[str, np.ndarray] = {}
+        for start in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[start : start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            )
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return [found.get(k) for k in keys]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store vectors for `texts`, replacing any existing entries."""
+        rows = []
+        for text, vec in zip(texts, vectors):
+            arr = np.asarray(vec, dtype=np.float32)
+            rows.append((cache_key(self.model_name, text), arr.shape[0], arr.tobytes()))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)", rows
+            )
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def embed_with_cache(
+    texts: Sequence[str],
+    embed_fn: Callable[[list[str]], Sequence[Sequence[float]]],
+    cache: EmbeddingCache,
+    batch_size: int = 100,
+    on_batch: Callable[[int, int], None] | None = None,
+) -> tuple[list[np.ndarray], int]:
+    """Embed `texts`, running `embed_fn` only for cache misses.
+
+    Returns (vectors in input order, number of vectors computed). Repeated
+    texts are embedded once, so the count is of unique texts that missed the
+    cache. Newly computed vectors are written back to the cache batch by
+    batch, and `on_batch(done, total)` is called after each batch of misses.
+    """
+    vectors = cache.get_many(texts)
+    # Identical texts within one run are embedded once
+    missing: dict[str, list[int]] = {}
+    for i, vec in enumerate(vectors):
+        if vec is None:
+            missing.setdefault(texts[i], []).append(i)
+
+    pending = list(missing)
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start : start + batch_size]
+        computed = [np.asarray(v, dtype=np.float32) for v in embed_fn(batch)]
+        cache.put_many(batch, computed)
+        for text, vec in zip(batch, computed):
+            for i in missing[text]:
+                vectors[i] = vec
+        if on_batch is not None:
+            on_batch(start + len(batch), len(pending))
+
+    return vectors, len(pending)  # type: ignore[return-value]
@@ -0,0 +1,39 @@
+"""Helpers for serving pre-serialized JSON with strong ETags and 304 responses."""
+
+import hashlib
+import json
+
+from fastapi import Response
+
+
+def json_bytes(content) -> bytes:
+    """Serialize like Starlette's JSONResponse (compact, UTF-8)."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if an If-None-Match header value matches `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in (c.removeprefix("W/") for c in candidates)
+
+
+def etag_response(
+    body: bytes,
+    etag: str,
+    if_none_match: str | None,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """Return `body` as JSON with its ETag, or an empty 304 if the client has it."""
+    all_headers = {"ETag": etag, "Cache-Control": "private, no-cache", **(headers or {})}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=all_headers)
+    return Response(content=body, media_type="application/json", headers=all_headers)
@@ -1,17 +1,21 @@
 """Document ingestion pipeline for the Pulse RAG agent.
 
 Loads PDFs and Excel files from data/documents/, enriches metadata with URLs
-from url_map.json, chunks the text, embeds with OpenAI, and stores in ChromaDB.
+from url_map.json, chunks the text, embeds with the local MiniLM model (reusing cached vectors
+from the embedding cache), and stores in ChromaDB.
 
 Usage:
     cd backend
     python -m src.ingest
+    python -m src.ingest --profile [--profile-json report.json] [--cprofile-dir prof/]
+                                   [--profile-memory]
 """
 
 import src.compat  # noqa: F401 — must be first to patch pydantic v1 for Python 3.14+
 
+import argparse
 import json
-import os
+from collections.abc import Callable
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -25,9 +29,23 @@ from src.config import (
     CHROMA_PERSIST_DIR,
     COLLECTION_NAME,
     DOCUMENTS_DIR,
+    EMBEDDING_CACHE_PATH,
     ORG_DIR,
     URL_MAP_PATH,
 )
+from src.embedding_cache import EmbeddingCache, embed_with_cache
+from src.ingest_profile import profiling, stage
+from src.org_graph import Hierarchy
+from src.org_store import DiagramStore, org_store
+
+
+# progress(stage, **data) — called between units of work. Background jobs use it
+# to publish progress events and may raise from it to cancel the run.
+ProgressCallback = Callable[..., None]
+
+
+def _no_progress(stage: str, **data) -> None:
+    pass
 
 
 def load_url_map(url_map_path: Path) -> dict[str, str]:
@@ -39,48 +57,84 @@ def load_url_map(url_map_path: Path) -> dict[str, str]:
         return json.load(f)
 
 
-def _load_excel(file_path: Path) -> list[Document]:
+# Rows per Excel Document. Each window repeats the sheet/header context so
+# chunks line up with row boundaries instead of arbitrary character offsets.
+EXCEL_ROWS_PER_WINDOW = 50
+
+
+def _excel_window(
+    file_path: Path,
+    sheet_name: str,
+    headers: list[str],
+    lines: list[str],
+    row_start: int,
+    row_end: int,
+) -> Document:
+    header_line = "Columns: " + " | ".join(headers)
+    return Document(
+        page_content="\n".join([f"Sheet: {sheet_name}", header_line, "", *lines]),
+        metadata={
+            "source": str(file_path),
+            "sheet": sheet_name,
+            "page": 0,
+            "row_start": row_start,
+            "row_end": row_end,
+        },
+    )
+
+
+def _load_excel(
+    file_path: Path, rows_per_window: int = EXCEL_ROWS_PER_WINDOW
+) -> list[Document]:
     """Load an Excel file (.xlsx / .xls) into LangChain Documents.
 
-    Each sheet becomes one or more Documents. Row data is converted to readable
-    text so the content is searchable and embeddable.
+    Rows are streamed in read-only mode and grouped into windows of
+    `rows_per_window` non-empty rows. Each window becomes one Document that
+    repeats the sheet name and header row, with `row_start` / `row_end`
+    metadata pointing back at the spreadsheet rows it covers.
     """
     import openpyxl
 
     docs: list[Document] = []
     wb = openpyxl.load_workbook(str(file_path), read_only=True, data_only=True)
 
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        rows = list(ws.iter_rows(values_only=True))
-        if not rows:
-            continue
-
-        # Use first row as headers if it looks like a header row
-        headers = [str(c) if c is not None else f"Col{i+1}" for i, c in enumerate(rows[0])]
-        text_lines: list[str] = [f"Sheet: {sheet_name}", ""]
-
-        for row_idx, row in enumerate(rows[1:], start=2):
-            parts: list[str] = []
-            for h, val in zip(headers, row):
-                if val is not None:
-                    parts.append(f"{h}: {val}")
-            if parts:
-                text_lines.append(f"Row {row_idx}: " + " | ".join(parts))
-
-        if len(text_lines) > 2:  # more than just the header
-            docs.append(
-                Document(
-                    page_content="\n".join(text_lines),
-                    metadata={
-                        "source": str(file_path),
-                        "sheet": sheet_name,
-                        "page": 0,
-                    },
-                )
-            )
+    try:
+        for sheet_name in wb.sheetnames:
+            ws = wb[sheet_name]
+            rows = ws.iter_rows(values_only=True)
+            first = next(rows, None)
+            if first is None:
+                continue
+
+            # Use first row as headers if it looks like a header row
+            headers = [str(c) if c is not None else f"Col{i+1}" for i, c in enumerate(first)]
+            window: list[str] = []
+            window_start = window_end = 0
+
+            for row_idx, row in enumerate(rows, start=2):
+                parts: list[str] = []
+                for h, val in zip(headers, row):
+                    if val is not None:
+                        parts.append(f"{h}: {val}")
+                if not parts:
+                    continue
+                if not window:
+                    window_start = row_idx
+                window_end = row_idx
+                window.append(f"Row {row_idx}: " + " | ".join(parts))
+                if len(window) >= rows_per_window:
+                    docs.append(_excel_window(
+                        file_path, sheet_name, headers, window, window_start, window_end
+                    ))
+                    window = []
+
+            if window:
+                docs.append(_excel_window(
+                    file_path, sheet_name, headers, window, window_start, window_end
+                ))
+    finally:
+        wb.close()
 
-    wb.close()
     return docs
 
 
@@ -112,15 +166,22 @@ def _load_markdown(file_path: Path) -> list[Document]:
     return docs if docs else [Document(page_content=text, metadata={"source": str(file_path), "page": 0})]
 
 
-def _load_org_json(file_path: Path) -> list[Document]:
-    """Convert an org/process/workflow JSON file into LangChain Documents.
+def _org_source(diagram_type: str) -> Path:
+    """The source path org chunks are filed under, whatever ORG_STORAGE is."""
+    return ORG_DIR / f"{diagram_type}.json"
+
 
-    Each JSON becomes two Documents:
+def _load_org_diagram(store: DiagramStore, diagram_type: str) -> list[Document]:
+    """Convert an org/process/workflow diagram into LangChain Documents.
+
+    The diagram is read through the org store, so edits held only in a
+    journal or in SQLite (ORG_STORAGE) are indexed too. Each diagram becomes
+    two Documents:
       1. A summary of all nodes (label + description) — great for keyword search.
       2. A step-by-step sequence following the edge flow — great for process questions.
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = store.get(diagram_type).to_json()
+    file_path = _org_source(diagram_type)
 
     diagram_type = data.get("diagram_type", file_path.stem)
     nodes: list[dict] = data.get("nodes", [])
@@ -128,6 +189,8 @@ def _load_org_json(file_path: Path) -> list[Document]:
 
     # Build id → node lookup
     node_map = {n["id"]: n for n in nodes}
+    # Reporting lines let the retriever answer "who does X report to"
+    hierarchy = Hierarchy(node_map) if diagram_type == "org_chart" else None
 
     # --- Document 1: Node descriptions ---
     type_label = diagram_type.replace("_", " ").title()
@@ -141,6 +204,9 @@ def _load_org_json(file_path: Path) -> list[Document]:
         if desc:
             lines.append(desc)
         lines.append(f"Type: {node_type} | Access: {permission}")
+        if hierarchy is not None and hierarchy.path.get(node["id"]):
+            managers = reversed(hierarchy.path[node["id"]])
+            lines.append("Reports to: " + " › ".join(node_map[a].get("label", a) for a in managers))
         lines.append("")
 
     doc_nodes = Document(
@@ -191,71 +257,94 @@ def _load_org_json(file_path: Path) -> list[Document]:
     return [doc_nodes, doc_flow]
 
 
-def load_org_diagrams(org_dir: Path) -> list[Document]:
-    """Load all org/process/workflow JSON files from data/org/ as Documents."""
-    if not org_dir.exists():
-        print(f"  Org directory not found: {org_dir}")
-        return []
-
+def load_org_diagrams(
+    store: DiagramStore, progress: ProgressCallback = _no_progress
+) -> list[Document]:
+    """Load every org/process/workflow diagram in `store` as Documents."""
     all_docs: list[Document] = []
-    json_files = sorted(org_dir.glob("*.json"))
+    diagram_types = store.diagram_types()
 
-    if not json_files:
-        print(f"  No JSON files found in {org_dir}")
+    if not diagram_types:
+        print("  No org diagrams found")
         return all_docs
 
-    for file_path in json_files:
-        print(f"Loading: {file_path.name}")
-        docs = _load_org_json(file_path)
+    for diagram_type in diagram_types:
+        name = _org_source(diagram_type).name
+        print(f"Loading: {name}")
+        with stage("load:org_json") as st:
+            docs = _load_org_diagram(store, diagram_type)
+            st.items = len(docs)
         all_docs.extend(docs)
-        print(f"  Loaded {len(docs)} section(s) from {file_path.name}")
+        print(f"  Loaded {len(docs)} section(s) from {name}")
+        progress("load", file=name, sections=len(docs))
 
     return all_docs
 
 
-def load_documents(documents_dir: Path, url_map: dict[str, str]) -> list:
+SUPPORTED_EXTENSIONS = (".pdf", ".xlsx", ".xls", ".md")
+
+# Profiling stage name per loader
+_LOADER_STAGES = {
+    ".pdf": "load:pdf",
+    ".xlsx": "load:excel",
+    ".xls": "load:excel",
+    ".md": "load:markdown",
+}
+
+
+def load_document_file(file_path: Path, url_map: dict[str, str]) -> list[Document]:
+    """Load one PDF, Excel, or Markdown file with enriched metadata."""
+    ext = file_path.suffix.lower()
+    if ext not in _LOADER_STAGES:
+        return []
+
+    with stage(_LOADER_STAGES[ext]) as st:
+        if ext == ".pdf":
+            loader = PyPDFLoader(str(file_path))
+            docs = loader.load()
+        elif ext in (".xlsx", ".xls"):
+            docs = _load_excel(file_path)
+        else:
+            docs = _load_markdown(file_path)
+        st.items = len(docs)
+
+    # Enrich metadata
+    filename = file_path.name
+    public_url = url_map.get(filename, "")
+
+    for doc in docs:
+        doc.metadata["url"] = public_url
+        doc.metadata["filename"] = filename
+        doc.metadata["last_updated"] = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        if "page" not in doc.metadata:
+            doc.metadata["page"] = 0
+
+    return docs
+
+
+def load_documents(
+    documents_dir: Path, url_map: dict[str, str], progress: ProgressCallback = _no_progress
+) -> list:
     """Load all PDFs, Excel, and Markdown files from the documents directory with enriched metadata."""
     all_docs = []
 
     # Collect supported files
-    supported_extensions = (".pdf", ".xlsx", ".xls", ".md")
     files = [
         f for f in documents_dir.iterdir()
-        if f.is_file() and f.suffix.lower() in supported_extensions
+        if f.is_file() and f.suffix.lower() in SUPPORTED_EXTENSIONS
     ]
 
     if not files:
         print(f"No supported files found in {documents_dir}")
-        print(f"  Supported formats: {', '.join(supported_extensions)}")
+        print(f"  Supported formats: {', '.join(SUPPORTED_EXTENSIONS)}")
         return all_docs
 
     for file_path in sorted(files):
         print(f"Loading: {file_path.name}")
-        ext = file_path.suffix.lower()
-
-        if ext == ".pdf":
-            loader = PyPDFLoader(str(file_path))
-            docs = loader.load()
-        elif ext in (".xlsx", ".xls"):
-            docs = _load_excel(file_path)
-        elif ext == ".md":
-            docs = _load_markdown(file_path)
-        else:
-            continue
-
-        # Enrich metadata
-        filename = file_path.name
-        public_url = url_map.get(filename, "")
-
-        for doc in docs:
-            doc.metadata["url"] = public_url
-            doc.metadata["filename"] = filename
-            doc.metadata["last_updated"] = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-            if "page" not in doc.metadata:
-                doc.metadata["page"] = 0
-
+        docs = load_document_file(file_path, url_map)
         all_docs.extend(docs)
-        print(f"  Loaded {len(docs)} section(s) from {filename}")
+        print(f"  Loaded {len(docs)} section(s) from {file_path.name}")
+        progress("load", file=file_path.name, sections=len(docs))
 
     return all_docs
 
@@ -266,74 +355,254 @@ def chunk_documents(documents: list) -> list:
         chunk_size=4000,
         chunk_overlap=400,
     )
-    chunks = splitter.split_documents(documents)
+    with stage("chunking") as st:
+        chunks = splitter.split_documents(documents)
+        st.items = len(chunks)
     print(f"Split {len(documents)} pages into {len(chunks)} chunks")
     return chunks
 
 
-def create_vector_store(chunks: list) -> None:
-    """Create and persist a ChromaDB vector store from document chunks."""
-    persist_dir = CHROMA_PERSIST_DIR
-
-    # Remove old store if it exists
-    if os.path.exists(persist_dir):
-        import shutil
-        shutil.rmtree(persist_dir)
-        print(f"Removed existing vector store at {persist_dir}")
+def _chunk_ids(chunks: list) -> list[str]:
+    """Stable chunk IDs of the form "<source>#<n>", numbered per source file.
 
-    client = chromadb.PersistentClient(path=persist_dir)
-    collection = client.get_or_create_collection(
-        name=COLLECTION_NAME,
-        embedding_function=DefaultEmbeddingFunction(),
-    )
-
-    ids = [str(i) for i in range(len(chunks))]
+    Keying IDs by source lets incremental re-indexing replace one file's
+    chunks without touching the rest of the collection.
+    """
+    counters: dict[str, int] = {}
+    ids: list[str] = []
+    for chunk in chunks:
+        source = chunk.metadata.get("source", "")
+        n = counters.get(source, 0)
+        counters[source] = n + 1
+        ids.append(f"{source}#{n}")
+    return ids
+
+
+def _add_chunks(
+    collection, chunks: list, embedding_function, progress: ProgressCallback
+) -> None:
+    """Embed `chunks` (through the embedding cache) and add them to `collection`."""
+    ids = _chunk_ids(chunks)
     documents = [c.page_content for c in chunks]
     metadatas = [c.metadata for c in chunks]
 
-    # Add in batches of 100 to avoid memory issues
+    with stage("embedding") as st, EmbeddingCache(EMBEDDING_CACHE_PATH) as cache:
+        embeddings, computed = embed_with_cache(
+            documents,
+            embedding_function,
+            cache,
+            on_batch=lambda done, total: progress("embed", done=done, total=total),
+        )
+        # Repeated texts are embedded (or looked up) once, so count unique texts
+        unique = len(set(documents))
+        st.items = computed
+        st.extra["cache_hits"] = unique - computed
+    print(f"Embedded {len(chunks)} chunks ({unique} unique texts: {computed} computed, "
+          f"{unique - computed} from cache)")
+
+    # Add in batches of 100 to avoid memory issues. Upsert so re-indexing a
+    # file overwrites its "<source>#<n>" ids in place.
     batch = 100
     for start in range(0, len(chunks), batch):
-        collection.add(
-            ids=ids[start : start + batch],
-            documents=documents[start : start + batch],
-            metadatas=metadatas[start : start + batch],
-        )
+        with stage("chroma_write") as st:
+            collection.upsert(
+                ids=ids[start : start + batch],
+                documents=documents[start : start + batch],
+                metadatas=metadatas[start : start + batch],
+                embeddings=embeddings[start : start + batch],
+            )
+            st.items = len(ids[start : start + batch])
+        progress("store", done=min(start + batch, len(chunks)), total=len(chunks))
+
+
+def create_vector_store(chunks: list, progress: ProgressCallback = _no_progress) -> None:
+    """Create and persist a ChromaDB vector store from document chunks.
+
+    Embeddings are looked up in the on-disk embedding cache first; the ONNX
+    model only runs for chunk texts it has not seen before.
+
+    The new index is written to a staging collection and swapped in at the
+    end, so queries keep hitting the previous index during a rebuild and a
+    cancelled or failed run leaves it untouched.
+    """
+    persist_dir = CHROMA_PERSIST_DIR
+    staging_name = f"{COLLECTION_NAME}.building"
+
+    embedding_function = DefaultEmbeddingFunction()
+    client = chromadb.PersistentClient(path=persist_dir)
+    _drop_collection(client, staging_name)
+    collection = client.create_collection(
+        name=staging_name,
+        embedding_function=embedding_function,
+    )
+
+    try:
+        _add_chunks(collection, chunks, embedding_function, progress)
+    except BaseException:
+        _drop_collection(client, staging_name)
+        raise
+
+    if _drop_collection(client, COLLECTION_NAME):
+        print(f"Replaced existing collection '{COLLECTION_NAME}'")
+    collection.modify(name=COLLECTION_NAME)
 
     print(f"Created vector store with {len(chunks)} chunks in '{COLLECTION_NAME}'")
     print(f"Persisted to: {persist_dir}")
 
 
-def main():
-    """Run the full ingestion pipeline."""
-    print("=" * 60)
-    print("Pulse - Document Ingestion Pipeline")
-    print("=" * 60)
+def _drop_collection(client, name: str) -> bool:
+    """Delete collection `name` if it exists. Returns True if one was deleted."""
+    try:
+        client.delete_collection(name)
+    except Exception:  # chromadb raises NotFoundError/ValueError depending on version
+        return False
+    return True
+
 
+def run_pipeline(progress: ProgressCallback = _no_progress) -> dict:
+    """Run the full ingestion pipeline and return a summary.
+
+    Rebuilds the vector store from every file in data/documents/ plus the
+    org/process/workflow diagrams in the org store (ORG_STORAGE).
+    """
     # Step 1: Load URL map
     print("\n[1/4] Loading URL map...")
-    url_map = load_url_map(URL_MAP_PATH)
+    progress("url_map")
+    with stage("url_map") as st:
+        url_map = load_url_map(URL_MAP_PATH)
+        st.items = len(url_map)
     print(f"  Found {len(url_map)} URL mappings")
 
     # Step 2: Load documents
     print("\n[2/4] Loading documents...")
-    documents = load_documents(DOCUMENTS_DIR, url_map)
+    documents = load_documents(DOCUMENTS_DIR, url_map, progress)
 
     print("\n      Loading org/process/workflow diagrams...")
-    org_docs = load_org_diagrams(ORG_DIR)
+    org_docs = load_org_diagrams(org_store, progress)
     documents.extend(org_docs)
 
     if not documents:
         print("No documents to ingest. Exiting.")
-        return
+        return {"documents": 0, "chunks": 0, "message": "No documents found to ingest."}
 
     # Step 3: Chunk documents
     print("\n[3/4] Chunking documents...")
+    progress("chunk", documents=len(documents))
     chunks = chunk_documents(documents)
 
     # Step 4: Create vector store
     print("\n[4/4] Creating vector store...")
-    create_vector_store(chunks)
+    create_vector_store(chunks, progress)
+
+    return {
+        "documents": len(documents),
+        "chunks": len(chunks),
+        "message": f"Ingested {len(documents)} document(s) into {len(chunks)} chunks.",
+    }
+
+
+def reindex_files(paths: list[Path], progress: ProgressCallback = _no_progress) -> dict:
+    """Incrementally re-index only `paths` in the existing vector store.
+
+    Each path's chunks are re-embedded from the current file contents and
+    upserted under their stable ids; only then are the file's leftover ids
+    (from a previously longer version) deleted, so a cancel or embedding
+    error leaves the old chunks searchable. Deleted files are just removed.
+    Paths under data/org/ name diagrams, which are read through the org store
+    (so they need not exist as files); everything else is loaded as documents.
+    Falls back to a full rebuild if the collection does not exist yet.
+    """
+    embedding_function = DefaultEmbeddingFunction()
+    client = chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+    try:
+        collection = client.get_collection(
+            name=COLLECTION_NAME,
+            embedding_function=embedding_function,
+        )
+    except Exception:
+        print(f"Collection '{COLLECTION_NAME}' not found — running a full rebuild")
+        return run_pipeline(progress)
+
+    url_map = load_url_map(URL_MAP_PATH)
+    documents: list[Document] = []
+    removed = 0
+    org_types = set(org_store.diagram_types())
+    present: list[Path] = []
+    for path in sorted(paths):
+        is_org = path.parent.resolve() == ORG_DIR.resolve()
+        if not (path.stem in org_types if is_org else path.exists()):
+            collection.delete(where={"source": str(path)})
+            removed += 1
+            progress("remove", file=path.name)
+            continue
+        if is_org:
+            docs = _load_org_diagram(org_store, path.stem)
+        else:
+            docs = load_document_file(path, url_map)
+        documents.extend(docs)
+        present.append(path)
+        progress("load", file=path.name, sections=len(docs))
+
+    chunks = chunk_documents(documents) if documents else []
+    if chunks:
+        _add_chunks(collection, chunks, embedding_function, progress)
+
+    current = set(_chunk_ids(chunks))
+    for path in present:
+        existing = collection.get(where={"source": str(path)}, include=[])["ids"]
+        stale = [i for i in existing if i not in current]
+        if stale:
+            collection.delete(ids=stale)
+
+    return {
+        "files": len(paths),
+        "removed": removed,
+        "documents": len(documents),
+        "chunks": len(chunks),
+        "message": f"Re-indexed {len(paths)} file(s) into {len(chunks)} chunks.",
+    }
+
+
+def main(argv: list[str] | None = None):
+    """Run the full ingestion pipeline."""
+    parser = argparse.ArgumentParser(description="Rebuild the Pulse vector store.")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="record wall/CPU time and throughput per stage",
+    )
+    parser.add_argument(
+        "--profile-json", type=Path, metavar="PATH",
+        help="write the profile report as JSON (implies --profile)",
+    )
+    parser.add_argument(
+        "--cprofile-dir", type=Path, metavar="DIR",
+        help="dump a cProfile .prof file per stage into DIR (implies --profile)",
+    )
+    parser.add_argument(
+        "--profile-memory", action="store_true",
+        help="also trace peak memory per stage with tracemalloc; slows every stage, "
+             "so compare its timings only with other memory-traced runs (implies --profile)",
+    )
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("Pulse - Document Ingestion Pipeline")
+    print("=" * 60)
+
+    if not (args.profile or args.profile_json or args.cprofile_dir or args.profile_memory):
+        summary = run_pipeline()
+    else:
+        with profiling(args.cprofile_dir, trace_memory=args.profile_memory) as profiler:
+            summary = run_pipeline()
+        profiler.print_report()
+        if args.profile_json:
+            profiler.write_json(args.profile_json)
+            print(f"Profile report written to {args.profile_json}")
+        if args.cprofile_dir:
+            print(f"cProfile stats written to {args.cprofile_dir}/")
+
+    if not summary["chunks"]:
+        return
 
     print("\n" + "=" * 60)
     print("Ingestion complete!")
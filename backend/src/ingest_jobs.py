@@ -0,0 +1,124 @@
+"""Background ingestion jobs with a single-runner lock.
+
+Ingestion runs on a worker thread instead of inside the HTTP request. Only one
+job may run at a time, since every run rebuilds the same Chroma collection.
+Finished jobs are kept in a bounded history with their durations and counts.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+from src.jobs import Job
+
+HISTORY_SIZE = 50
+
+
+class IngestBusyError(Exception):
+    """Raised when an ingest job is requested while another one is running."""
+
+    def __init__(self, running: Job) -> None:
+        super().__init__(f"Ingest job {running.id} is already running")
+        self.running = running
+
+
+class IngestJobManager:
+    """Owns the ingest job history and the single-runner lock."""
+
+    def __init__(self, history_size: int = HISTORY_SIZE) -> None:
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._history_size = history_size
+        self._lock = threading.Lock()
+        self._running: Job | None = None
+
+    @property
+    def running(self) -> Job | None:
+        return self._running
+
+    def submit(
+        self,
+        kind: str = "full",
+        params: dict | None = None,
+        target: Callable[[Job], dict] | None = None,
+    ) -> Job:
+        """Start a new ingest job on a worker thread.
+
+        `target(job)` does the work; it defaults to the full pipeline. Raises
+        IngestBusyError if another job is still running.
+        """
+        # The slot is taken and released under the same lock, and released only
+        # once the job has finished, so two jobs never overlap
+        with self._lock:
+            if self._running is not None:
+                raise IngestBusyError(self._running)
+            job = Job(kind, params)
+            self._running = job
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history_size:
+                self._jobs.popitem(last=False)
+
+        try:
+            threading.Thread(
+                target=self._run,
+                args=(job, target or _run_full_ingest),
+                name=f"ingest-{job.id}",
+                daemon=True,
+            ).start()
+        except Exception:
+            self._release(job)
+            raise
+        return job
+
+    def submit_reindex(self, paths: list[Path]) -> Job:
+        """Start an incremental re-index of `paths` (see ingest.reindex_files)."""
+        paths = sorted(paths)
+        return self.submit(
+            "incremental",
+            {"files": [p.name for p in paths]},
+            target=lambda job: _run_reindex(job, paths),
+        )
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def history(self) -> list[Job]:
+        """Jobs newest first."""
+        return list(reversed(self._jobs.values()))
+
+    def _run(self, job: Job, target: Callable[[Job], dict]) -> None:
+        try:
+            job.run(target)
+        finally:
+            self._release(job)
+
+    def _release(self, job: Job) -> None:
+        with self._lock:
+            if self._running is job:
+                self._running = None
+
+
+def _job_progress(job: Job):
+    """Adapt a Job to the ingest pipeline's progress callback."""
+    def progress(stage: str, **data) -> None:
+        job.emit("progress", stage=stage, **data)
+        job.check_cancelled()
+
+    return progress
+
+
+def _run_full_ingest(job: Job) -> dict:
+    # Imported lazily: chromadb and the loaders are heavy and only needed here
+    from src.ingest import run_pipeline
+
+    return run_pipeline(_job_progress(job))
+
+
+def _run_reindex(job: Job, paths: list[Path]) -> dict:
+    from src.ingest import reindex_files
+
+    return reindex_files(paths, _job_progress(job))
+
+
+# Process-wide manager used by the admin router
+ingest_jobs = IngestJobManager()
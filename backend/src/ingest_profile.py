@@ -0,0 +1,195 @@
+"""Per-stage profiling for the ingestion pipeline.
+
+`python -m src.ingest --profile` activates an IngestProfiler. Pipeline code wraps
+its work in `stage(name)` blocks, which record wall time and CPU time per stage
+(accumulated across calls) and are no-ops when profiling is off. The report
+adds pages/sec, chunks/sec and embeddings/sec and can be written as JSON for
+regression tracking; `--cprofile-dir` additionally dumps a cProfile file per
+stage.
+
+`--profile-memory` also records each stage's peak Python allocation with
+tracemalloc. Tracing every allocation slows the pipeline down considerably, so
+it is off by default and timings from a memory-traced run should not be
+compared with untraced ones (the report's `trace_memory` flag says which it
+was).
+
+Stages are flat — they must not be nested.
+"""
+
+import cProfile
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+class StageRecord:
+    """Accumulated measurements for one pipeline stage."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_mem_mb: float | None = None
+        self.items = 0
+        self.extra: dict[str, int] = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "peak_mem_mb": round(self.peak_mem_mb, 2) if self.peak_mem_mb is not None else None,
+            "items": self.items,
+            "items_per_s": round(self.items / self.wall_s, 2) if self.wall_s else None,
+            **self.extra,
+        }
+
+
+class _StageHandle:
+    """Yielded by `stage()`; lets the caller report how many items were processed."""
+
+    def __init__(self) -> None:
+        self.items = 0
+        self.extra: dict[str, int] = {}
+
+
+class IngestProfiler:
+    """Collects StageRecords for one pipeline run."""
+
+    def __init__(self, cprofile_dir: Path | None = None, trace_memory: bool = False) -> None:
+        self.stages: dict[str, StageRecord] = {}
+        self.cprofile_dir = cprofile_dir
+        self.trace_memory = trace_memory
+        self._cprofiles: dict[str, cProfile.Profile] = {}
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._finished: float | None = None
+        self._cpu_finished: float | None = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[_StageHandle]:
+        record = self.stages.setdefault(name, StageRecord(name))
+        handle = _StageHandle()
+        prof = None
+        if self.cprofile_dir is not None:
+            prof = self._cprofiles.setdefault(name, cProfile.Profile())
+            prof.enable()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield handle
+        finally:
+            record.wall_s += time.perf_counter() - wall
+            record.cpu_s += time.process_time() - cpu
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                record.peak_mem_mb = max(record.peak_mem_mb or 0.0, peak)
+            if prof is not None:
+                prof.disable()
+            record.calls += 1
+            record.items += handle.items
+            for key, value in handle.extra.items():
+                record.extra[key] = record.extra.get(key, 0) + value
+
+    def finish(self) -> None:
+        self._finished = time.perf_counter()
+        self._cpu_finished = time.process_time()
+        if self.cprofile_dir is not None:
+            self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+            for name, prof in self._cprofiles.items():
+                prof.dump_stats(str(self.cprofile_dir / f"{name.replace(':', '_')}.prof"))
+
+    def _sum(self, prefix: str) -> tuple[int, float]:
+        items = sum(r.items for n, r in self.stages.items() if n.startswith(prefix))
+        wall = sum(r.wall_s for n, r in self.stages.items() if n.startswith(prefix))
+        return items, wall
+
+    def report(self) -> dict:
+        end = self._finished or time.perf_counter()
+        cpu_end = self._cpu_finished or time.process_time()
+        pages, load_s = self._sum("load:")
+        chunks, chunk_s = self._sum("chunking")
+        embeddings, embed_s = self._sum("embedding")
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "trace_memory": self.trace_memory,
+            "total": {
+                "wall_s": round(end - self._started, 4),
+                "cpu_s": round(cpu_end - self._cpu_started, 4),
+                "max_rss_mb": round(rss_mb, 1),
+            },
+            "throughput": {
+                "pages_per_s": round(pages / load_s, 2) if load_s else None,
+                "chunks_per_s": round(chunks / chunk_s, 2) if chunk_s else None,
+                "embeddings_per_s": round(embeddings / embed_s, 2) if embed_s else None,
+            },
+            "stages": {name: r.to_dict() for name, r in self.stages.items()},
+        }
+
+    def print_report(self) -> None:
+        report = self.report()
+        print("\n" + "=" * 60)
+        print("Ingest profile")
+        print("=" * 60)
+        print(f"{'stage':<16}{'calls':>6}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}"
+              f"{'items':>8}{'items/s':>10}")
+        for name, r in report["stages"].items():
+            rate = f"{r['items_per_s']:.1f}" if r["items_per_s"] is not None else "-"
+            peak = f"{r['peak_mem_mb']:.1f}" if r["peak_mem_mb"] is not None else "-"
+            print(f"{name:<16}{r['calls']:>6}{r['wall_s']:>10.3f}{r['cpu_s']:>10.3f}"
+                  f"{peak:>10}{r['items']:>8}{rate:>10}")
+        total = report["total"]
+        print(f"\nTotal: {total['wall_s']:.3f}s wall, {total['cpu_s']:.3f}s CPU, "
+              f"max RSS {total['max_rss_mb']:.0f} MB")
+        for key, value in report["throughput"].items():
+            print(f"  {key}: {value if value is not None else '-'}")
+
+    def write_json(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Active profiler
+# ---------------------------------------------------------------------------
+
+_active: IngestProfiler | None = None
+
+
+@contextmanager
+def profiling(
+    cprofile_dir: Path | None = None, trace_memory: bool = False
+) -> Iterator[IngestProfiler]:
+    """Activate a profiler for the duration of the block."""
+    global _active
+    if trace_memory:
+        tracemalloc.start()
+    _active = IngestProfiler(cprofile_dir, trace_memory)
+    try:
+        yield _active
+    finally:
+        _active.finish()
+        _active = None
+        if trace_memory:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[_StageHandle]:
+    """Measure a pipeline stage if profiling is active; otherwise do nothing."""
+    if _active is None:
+        yield _StageHandle()
+        return
+    with _active.stage(name) as handle:
+        yield handle
@@ -0,0 +1,131 @@
+"""Background job primitives shared by long-running admin operations.
+
+A Job runs in a worker thread and records an append-only list of progress
+events. API handlers poll `events_since()` or stream `stream_events()` over SSE;
+the worker calls `emit()` and `check_cancelled()` between units of work.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+# Terminal job states — no further events are emitted once one is reached
+FINISHED_STATES = {"succeeded", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker when cancellation was requested."""
+
+
+class Job:
+    """A unit of background work with progress events and cooperative cancellation."""
+
+    def __init__(self, kind: str, params: dict | None = None) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params or {}
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.result: dict = {}
+        self.error: str | None = None
+        self.events: list[dict] = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    # -- worker side ---------------------------------------------------------
+
+    def emit(self, event: str, **data: Any) -> None:
+        """Append a progress event (thread-safe)."""
+        with self._lock:
+            self.events.append({
+                "seq": len(self.events) + 1,
+                "event": event,
+                "time": round(time.time(), 3),
+                **data,
+            })
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def run(self, fn: Callable[["Job"], dict]) -> None:
+        """Execute `fn(job)` in the current thread, recording status and result."""
+        if self._cancel.is_set():
+            return  # cancelled while queued
+        self.status = "running"
+        self.started_at = time.time()
+        self.emit("started")
+        try:
+            self.result = fn(self) or {}
+            self.status = "succeeded"
+        except JobCancelled:
+            self.status = "cancelled"
+        except Exception as exc:  # surfaced to the client via status/error
+            self.status = "failed"
+            self.error = str(exc)
+        finally:
+            self.finished_at = time.time()
+            if self.error:
+                self.emit(self.status, error=self.error)
+            else:
+                self.emit(self.status)
+
+    # -- client side ---------------------------------------------------------
+
+    def cancel(self) -> None:
+        """Request cancellation; the worker stops at its next checkpoint."""
+        self._cancel.set()
+        if self.status == "queued":
+            self.status = "cancelled"
+            self.finished_at = time.time()
+            self.emit("cancelled")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def duration_s(self) -> float | None:
+        if self.started_at is None:
+            return None
+        end = self.finished_at or time.time()
+        return round(end - self.started_at, 3)
+
+    def events_since(self, seq: int = 0) -> list[dict]:
+        with self._lock:
+            return self.events[seq:]
+
+    def to_dict(self, include_events: bool = False) -> dict:
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_s": self.duration_s,
+            "result": self.result,
+            "error": self.error,
+        }
+        if include_events:
+            data["events"] = self.events_since(0)
+        return data
+
+    async def stream_events(
+        self, since: int = 0, poll_interval: float = 0.5
+    ) -> AsyncIterator[dict]:
+        """Yield events as they are emitted until the job finishes."""
+        seq = since
+        while True:
+            for evt in self.events_since(seq):
+                seq = evt["seq"]
+                yield evt
+            if self.finished and seq >= len(self.events):
+                return
+            await asyncio.sleep(poll_interval)
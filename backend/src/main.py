@@ -11,6 +11,7 @@ Usage:
 import src.compat  # noqa: F401 — must be first to patch pydantic v1 for Python 3.14+
 
 import json
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -18,8 +19,11 @@ from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
 from src.agent import agent
+from src.aio import lag_monitor
 from src.auth import USERS, create_session
-from src.config import FRONTEND_URL
+from src.bpmn.parser import parse_text
+from src.bpmn.templates import start_template_watcher
+from src.config import BPMN_PRECOMPILE_TEMPLATES, FRONTEND_URL, INGEST_WATCH
 from src.routers import admin as admin_router
 from src.routers import bpmn as bpmn_router
 from src.routers import org as org_router
@@ -28,10 +32,30 @@ from src.routers import org as org_router
 # App setup
 # ---------------------------------------------------------------------------
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Start optional background services for the lifetime of the app."""
+    lag_monitor.start()
+    template_watcher = start_template_watcher(
+        bpmn_router.template_library, parse_text if BPMN_PRECOMPILE_TEMPLATES else None
+    )
+    bpmn_router.batch_jobs.resume()
+    watcher = None
+    if INGEST_WATCH:
+        from src.watcher import start_ingest_watcher
+        watcher = start_ingest_watcher()
+    yield
+    if watcher is not None:
+        watcher.stop()
+    template_watcher.stop()
+    await lag_monitor.stop()
+
+
 app = FastAPI(
     title="Pulse API",
     description="Enterprise Documentation & Visualization Agent",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -44,6 +68,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Diagram-Version"],
 )
 
 # Mount routers
@@ -0,0 +1,302 @@
+"""Graph indexes and traversals over org diagrams.
+
+`Adjacency` links every node to its children and parents, combining
+`parent_id` with the diagram's edges (process diagrams add flow edges beyond
+the tree). It is built once per diagram version — `Diagram.adjacency` caches
+it, and a mutation produces a new Diagram — so subgraph queries cost time
+proportional to the nodes they return, not to the diagram.
+
+Traversals return node ids; role filtering and serialisation stay in the
+router.
+"""
+
+from collections import deque
+
+
+class Adjacency:
+    """Child/parent lists and outgoing edge ids for each node."""
+
+    def __init__(self, nodes: dict[str, dict], edges: dict[str, dict]) -> None:
+        self.children: dict[str, list[str]] = {}
+        self.parents: dict[str, list[str]] = {}
+        self.out_edges: dict[str, list[str]] = {}
+        linked: set[tuple[str, str]] = set()
+
+        def link(parent: str, child: str) -> None:
+            if (parent, child) not in linked:
+                linked.add((parent, child))
+                self.children.setdefault(parent, []).append(child)
+                self.parents.setdefault(child, []).append(parent)
+
+        for node_id, node in nodes.items():
+            parent_id = node.get("parent_id")
+            if parent_id in nodes and parent_id != node_id:
+                link(parent_id, node_id)
+        for edge_id, edge in edges.items():
+            source, target = edge["source_id"], edge["target_id"]
+            if source in nodes and target in nodes:
+                self.out_edges.setdefault(source, []).append(edge_id)
+                if source != target:
+                    link(source, target)
+
+        self.roots: list[str] = [n for n in nodes if n not in self.parents]
+        self._positions: dict[str | None, dict[str, int]] = {}
+
+    def child_ids(self, parent_id: str | None) -> list[str]:
+        """Children of `parent_id`, or the root nodes when it is None."""
+        if parent_id is None:
+            return self.roots
+        return self.children.get(parent_id, [])
+
+    def position(self, parent_id: str | None, child_id: str) -> int | None:
+        """Index of `child_id` among the children of `parent_id` (for cursors)."""
+        positions = self._positions.get(parent_id)
+        if positions is None:
+            positions = {c: i for i, c in enumerate(self.child_ids(parent_id))}
+            self._positions[parent_id] = positions
+        return positions.get(child_id)
+
+
+def descendants(adj: Adjacency, node_id: str, depth: int, limit: int) -> tuple[list[str], bool]:
+    """`node_id` plus everything reachable within `depth` levels, breadth first.
+
+    Returns (ids, truncated); truncated is True if `limit` cut the walk short.
+    Cycles in flow diagrams are visited once.
+    """
+    seen = {node_id}
+    order = [node_id]
+    frontier = deque([(node_id, 0)])
+    while frontier:
+        current, level = frontier.popleft()
+        if level == depth:
+            continue
+        for child in adj.children.get(current, []):
+            if child in seen:
+                continue
+            if len(order) >= limit:
+                return order, True
+            seen.add(child)
+            order.append(child)
+            frontier.append((child, level + 1))
+    return order, False
+
+
+def ancestors(adj: Adjacency, node_id: str) -> list[str]:
+    """`node_id` plus every node above it up to the root(s), nearest first."""
+    seen = {node_id}
+    order = [node_id]
+    frontier = deque([node_id])
+    while frontier:
+        for parent in adj.parents.get(frontier.popleft(), []):
+            if parent not in seen:
+                seen.add(parent)
+                order.append(parent)
+                frontier.append(parent)
+    return order
+
+
+def children_page(
+    adj: Adjacency,
+    parent_id: str | None,
+    start: int,
+    limit: int,
+) -> tuple[list[str], int | None]:
+    """One page of children starting at index `start`; returns (ids, next_start)."""
+    children = adj.child_ids(parent_id)
+    page = children[start:start + limit]
+    next_start = start + limit if start + limit < len(children) else None
+    return page, next_start
+
+
+def edges_within(adj: Adjacency, edges: dict[str, dict], ids: list[str]) -> list[dict]:
+    """Edges whose endpoints are both in `ids`, in node order."""
+    included = set(ids)
+    return [
+        edges[edge_id]
+        for node_id in ids
+        for edge_id in adj.out_edges.get(node_id, [])
+        if edges[edge_id]["target_id"] in included
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Hierarchy closure index
+# ---------------------------------------------------------------------------
+
+class Hierarchy:
+    """Closure index over the `parent_id` tree.
+
+    For every node it keeps the root-first ancestor path, the ancestor set
+    (for O(1) "is A under B" checks), its depth and its subtree size. A node
+    whose parent_id points at a missing node is a root until that node is
+    (re-)added.
+
+    Updated incrementally on node add/update/delete. Entries are replaced,
+    never mutated, so `copy()` is a shallow copy and readers of an older
+    diagram version keep a consistent index.
+    """
+
+    def __init__(self, nodes: dict[str, dict] | None = None) -> None:
+        self.parent: dict[str, str | None] = {}
+        self.children: dict[str, tuple[str, ...]] = {}
+        self.path: dict[str, tuple[str, ...]] = {}
+        self.ancestor_set: dict[str, frozenset[str]] = {}
+        self.size: dict[str, int] = {}
+        # missing parent id -> children waiting for it
+        self.dangling: dict[str, tuple[str, ...]] = {}
+        if nodes:
+            self._build(nodes)
+
+    def copy(self) -> "Hierarchy":
+        clone = Hierarchy()
+        clone.parent = dict(self.parent)
+        clone.children = dict(self.children)
+        clone.path = dict(self.path)
+        clone.ancestor_set = dict(self.ancestor_set)
+        clone.size = dict(self.size)
+        clone.dangling = dict(self.dangling)
+        return clone
+
+    def _build(self, nodes: dict[str, dict]) -> None:
+        raw = {node_id: node.get("parent_id") for node_id, node in nodes.items()}
+        children: dict[str, list[str]] = {node_id: [] for node_id in nodes}
+        dangling: dict[str, list[str]] = {}
+        for node_id, parent_id in raw.items():
+            if parent_id in nodes and parent_id != node_id:
+                children[parent_id].append(node_id)
+            elif parent_id and parent_id not in nodes:
+                dangling.setdefault(parent_id, []).append(node_id)
+
+        # Walk down from the roots; nodes never reached sit on a parent_id
+        # cycle, which is broken by treating the first one seen as a root.
+        order: list[str] = []
+        for start in [n for n, p in raw.items() if p not in nodes or p == n] + list(nodes):
+            if start in self.parent:
+                continue
+            self.parent[start] = None
+            self.path[start] = ()
+            stack = [start]
+            while stack:
+                current = stack.pop()
+                order.append(current)
+                below = self.path[current] + (current,)
+                for child in children[current]:
+                    if child not in self.parent:
+                        self.parent[child] = current
+                        self.path[child] = below
+                        stack.append(child)
+
+        for node_id in nodes:
+            kept = (c for c in children[node_id] if self.parent[c] == node_id)
+            self.children[node_id] = tuple(kept)
+            self.ancestor_set[node_id] = frozenset(self.path[node_id])
+            self.size[node_id] = 1
+        for node_id in reversed(order):
+            parent_id = self.parent[node_id]
+            if parent_id is not None:
+                self.size[parent_id] += self.size[node_id]
+        self.dangling = {p: tuple(c) for p, c in dangling.items()}
+
+    # -- Queries -----------------------------------------------------------
+
+    def depth(self, node_id: str) -> int:
+        return len(self.path[node_id])
+
+    def is_ancestor(self, ancestor_id: str, node_id: str) -> bool:
+        """True if `ancestor_id` is strictly above `node_id`."""
+        return ancestor_id in self.ancestor_set.get(node_id, ())
+
+    def descendants(self, node_id: str) -> list[str]:
+        """Every node below `node_id`, parents before children."""
+        order: list[str] = []
+        stack = list(reversed(self.children[node_id]))
+        while stack:
+            current = stack.pop()
+            order.append(current)
+            stack.extend(reversed(self.children[current]))
+        return order
+
+    def would_cycle(self, node_id: str, parent_id: str | None) -> bool:
+        """True if re-parenting `node_id` under `parent_id` creates a cycle."""
+        return parent_id is not None and (
+            parent_id == node_id or self.is_ancestor(node_id, parent_id)
+        )
+
+    # -- Incremental maintenance -------------------------------------------
+
+    def add(self, node: dict) -> None:
+        node_id = node["id"]
+        if node_id in self.parent:
+            self.update(node_id, node.get("parent_id"))
+            return
+        self.parent[node_id] = None
+        self.children[node_id] = ()
+        self.path[node_id] = ()
+        self.ancestor_set[node_id] = frozenset()
+        self.size[node_id] = 1
+        self._attach(node_id, node.get("parent_id"))
+        # Children that were waiting for this id move under it
+        for child in self.dangling.pop(node_id, ()):
+            if child in self.parent and not self.would_cycle(child, node_id):
+                self._detach(child)
+                self._attach(child, node_id)
+
+    def update(self, node_id: str, parent_id: str | None) -> None:
+        """Re-parent `node_id` (with its subtree)."""
+        self._forget_dangling(node_id)
+        self._detach(node_id)
+        self._attach(node_id, parent_id)
+
+    def remove(self, node_id: str) -> None:
+        """Remove one node; its children become roots waiting for it to return."""
+        children = self.children[node_id]
+        for child in children:
+            self._detach(child)
+            self._set_path(child, ())
+        if children:
+            self.dangling[node_id] = self.dangling.get(node_id, ()) + children
+        self._forget_dangling(node_id)
+        self._detach(node_id)
+        for table in (self.parent, self.children, self.path, self.ancestor_set, self.size):
+            del table[node_id]
+
+    def _attach(self, node_id: str, parent_id: str | None) -> None:
+        if parent_id is not None and parent_id not in self.parent:
+            self.dangling[parent_id] = self.dangling.get(parent_id, ()) + (node_id,)
+            parent_id = None
+        self.parent[node_id] = parent_id
+        if parent_id is None:
+            self._set_path(node_id, ())
+            return
+        self.children[parent_id] = self.children[parent_id] + (node_id,)
+        self._set_path(node_id, self.path[parent_id] + (parent_id,))
+        moved = self.size[node_id]
+        for ancestor in self.path[node_id]:
+            self.size[ancestor] += moved
+
+    def _detach(self, node_id: str) -> None:
+        parent_id = self.parent[node_id]
+        if parent_id is None:
+            return
+        self.children[parent_id] = tuple(c for c in self.children[parent_id] if c != node_id)
+        moved = self.size[node_id]
+        for ancestor in self.path[node_id]:
+            self.size[ancestor] -= moved
+        self.parent[node_id] = None
+
+    def _set_path(self, node_id: str, path: tuple[str, ...]) -> None:
+        """Give `node_id` a new ancestor path and rebase its whole subtree."""
+        old_len = len(self.path[node_id])
+        for member in [node_id, *self.descendants(node_id)]:
+            new_path = path + self.path[member][old_len:]
+            self.path[member] = new_path
+            self.ancestor_set[member] = frozenset(new_path)
+
+    def _forget_dangling(self, node_id: str) -> None:
+        for missing, waiting in list(self.dangling.items()):
+            if node_id in waiting:
+                rest = tuple(c for c in waiting if c != node_id)
+                if rest:
+                    self.dangling[missing] = rest
+                else:
+                    del self.dangling[missing]
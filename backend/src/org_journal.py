@@ -0,0 +1,227 @@
+"""Journaled JSON storage backend for org diagrams.
+
+Each `DiagramStore.apply` batch is appended as one JSON line to
+data/org/<diagram_type>.journal.jsonl and fsync'd, so write cost is
+proportional to the change rather than the diagram. Once a diagram has
+`compact_every` journal records, a background thread folds them into the
+snapshot (data/org/<diagram_type>.json, the same format JsonFileBackend
+uses), which is replaced atomically. Ingestion reads through the store, so
+records not yet compacted are indexed too.
+
+Readers see snapshot + journal replay. Compaction first renames the journal to
+<diagram_type>.journal.compacting.jsonl so new writes go to a fresh log; if the
+process dies mid-compaction, the leftover file is replayed on the next load and
+folded by the next compaction. Replay is idempotent (ops that no longer apply,
+such as updating a node a later record deletes, are skipped), so replaying a
+record that already reached the snapshot is harmless. A torn final line from a
+crash during append is dropped on the next load.
+
+The fingerprint tracks the logical content, not the files: our own compaction
+rewrites the snapshot and removes the folded log without changing what a
+reader sees, so it must not make DiagramStore reload (which would reset every
+delta-sync client). A snapshot written by anything else, or journal growth,
+still changes it.
+
+Enable with ORG_STORAGE=journal.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from src.org_store import Diagram, apply_op, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+COMPACT_EVERY = 100  # journal records per diagram before compaction
+
+
+class JournalBackend:
+    """JSON snapshots plus an append-only op log per diagram."""
+
+    def __init__(
+        self,
+        org_dir: Path,
+        compact_every: int = COMPACT_EVERY,
+        background: bool = True,
+    ) -> None:
+        self.org_dir = org_dir
+        self.compact_every = compact_every
+        self.background = background
+        self._pending: dict[str, int] = {}  # journal records not yet compacted
+        self._compacting: set[str] = set()
+        # Fingerprint bookkeeping so self-compactions keep the fingerprint stable
+        self._own_snapshot: dict[str, tuple] = {}  # stat key of the snapshot we wrote
+        self._snapshot_token: dict[str, tuple] = {}  # token that snapshot stands in for
+        self._folded_bytes: dict[str, int] = {}  # journal bytes folded into it
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def snapshot_path(self, diagram_type: str) -> Path:
+        return self.org_dir / f"{diagram_type}.json"
+
+    def journal_path(self, diagram_type: str) -> Path:
+        return self.org_dir / f"{diagram_type}.journal.jsonl"
+
+    def _compacting_path(self, diagram_type: str) -> Path:
+        return self.org_dir / f"{diagram_type}.journal.compacting.jsonl"
+
+    def _lock(self, diagram_type: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(diagram_type, threading.Lock())
+
+    # -- DiagramStore backend interface ------------------------------------
+
+    def _token(self, diagram_type: str, key: tuple) -> tuple:
+        """Snapshot identity for the fingerprint; our own compactions keep the old one."""
+        if self._own_snapshot.get(diagram_type) == key:
+            return self._snapshot_token[diagram_type]
+        self._own_snapshot.pop(diagram_type, None)
+        self._folded_bytes[diagram_type] = 0
+        return key
+
+    def fingerprint(self, diagram_type: str) -> tuple | None:
+        with self._lock(diagram_type):
+            key = _stat_key(self.snapshot_path(diagram_type))
+            if key is None:
+                return None
+            token = self._token(diagram_type, key)
+            return (
+                token,
+                self._folded_bytes.get(diagram_type, 0)
+                + _size(self._compacting_path(diagram_type))
+                + _size(self.journal_path(diagram_type)),
+            )
+
+    def load(self, diagram_type: str) -> dict:
+        with self._lock(diagram_type):
+            with open(self.snapshot_path(diagram_type), "r", encoding="utf-8") as f:
+                diagram = Diagram(diagram_type, json.load(f))
+            replayed = 0
+            for path in (self._compacting_path(diagram_type), self.journal_path(diagram_type)):
+                replayed += _replay(diagram, path)
+            self._pending[diagram_type] = replayed
+        self._maybe_compact(diagram_type)
+        return diagram.to_json()
+
+    def save(self, diagram: Diagram, ops: list[dict], results: list[dict | None]) -> None:
+        """Append the batch to the journal and fsync it."""
+        t = diagram.diagram_type
+        line = json.dumps({"ops": ops}, ensure_ascii=False) + "\n"
+        with self._lock(t):
+            with open(self.journal_path(t), "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending[t] = self._pending.get(t, 0) + 1
+        self._maybe_compact(t)
+
+    def diagram_types(self) -> list[str]:
+        """Diagrams with a snapshot (a journal alone is not loadable)."""
+        return sorted(p.stem for p in self.org_dir.glob("*.json"))
+
+    # -- Compaction --------------------------------------------------------
+
+    def _maybe_compact(self, diagram_type: str) -> None:
+        if self._pending.get(diagram_type, 0) < self.compact_every:
+            return
+        with self._guard:
+            if diagram_type in self._compacting:
+                return
+            self._compacting.add(diagram_type)
+
+        if self.background:
+            threading.Thread(
+                target=self._compact_and_release,
+                args=(diagram_type,),
+                name=f"org-compact-{diagram_type}",
+                daemon=True,
+            ).start()
+        else:
+            self._compact_and_release(diagram_type)
+
+    def _compact_and_release(self, diagram_type: str) -> None:
+        try:
+            self.compact(diagram_type)
+        except Exception:
+            logger.exception("Compaction of %s failed", diagram_type)
+        finally:
+            with self._guard:
+                self._compacting.discard(diagram_type)
+
+    def compact(self, diagram_type: str) -> int:
+        """Fold the journal into the snapshot. Returns the number of records folded."""
+        journal = self.journal_path(diagram_type)
+        compacting = self._compacting_path(diagram_type)
+        snapshot = self.snapshot_path(diagram_type)
+
+        with self._lock(diagram_type):
+            # A leftover from an interrupted compaction is folded on its own first
+            if not compacting.exists():
+                if _size(journal) == 0:
+                    return 0
+                os.replace(journal, compacting)
+
+        # Appends go to the fresh journal while the snapshot is rebuilt
+        with open(snapshot, "r", encoding="utf-8") as f:
+            diagram = Diagram(diagram_type, json.load(f))
+        folded = _replay(diagram, compacting)
+
+        with self._lock(diagram_type):
+            token = self._token(diagram_type, _stat_key(snapshot))
+            folded_bytes = self._folded_bytes.get(diagram_type, 0) + _size(compacting)
+            write_json_atomic(snapshot, diagram.to_json())
+            compacting.unlink()
+            self._own_snapshot[diagram_type] = _stat_key(snapshot)
+            self._snapshot_token[diagram_type] = token
+            self._folded_bytes[diagram_type] = folded_bytes
+            self._pending[diagram_type] = max(0, self._pending.get(diagram_type, 0) - folded)
+        logger.info("Compacted %d journal record(s) into %s", folded, snapshot.name)
+        return folded
+
+
+def _stat_key(path: Path) -> tuple | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _replay(diagram: Diagram, path: Path) -> int:
+    """Apply every complete record in `path` to `diagram`; return the record count.
+
+    A torn final line is truncated away so later appends start on a clean line.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+    count = 0
+    good_bytes = 0
+    with f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                logger.warning("Dropping torn record at the end of %s", path.name)
+                with open(path, "r+b") as out:
+                    out.truncate(good_bytes)
+                break
+            for op in json.loads(line)["ops"]:
+                try:
+                    apply_op(diagram, op)
+                except HTTPException:
+                    pass  # superseded by a later record
+            good_bytes += len(line)
+            count += 1
+    return count
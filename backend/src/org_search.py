@@ -0,0 +1,277 @@
+"""Fuzzy node search across all org/process diagrams.
+
+In-memory indexes over every node of every diagram:
+  - a prefix trie over label words         ("eng" finds "Engineering")
+  - trigram postings over the label vocabulary ("enginering" -> "engineering")
+  - word postings for descriptions
+  - per-permission-level and per-diagram sets for filtering
+
+Postings hold sortable entry tuples (label length, label, diagram, id), so
+matching is set algebra and picking the top results is a heap selection —
+both run in C rather than scoring candidates one by one in Python. Results
+come in tiers, and a tier is only computed if the earlier ones did not fill
+the page:
+
+  1. every query word is a label word          (score 4)
+  2. every query word prefixes a label word    (score 3)
+  3. as 2, allowing typos via trigrams         (score 2)
+  4. every query word is in the description    (score 1)
+  5. some query words match the label          (score 0.5)
+
+Within a tier, shorter labels rank first.
+
+The index follows the diagram store's change log: before each search it asks
+`DiagramStore.changes_since()` what changed since the version it indexed and
+re-indexes only those nodes, falling back to rebuilding one diagram when the
+log cannot answer. CRUD never has to call into search.
+
+Role filtering happens before ranking: nodes the caller may not see are never
+matched, so a query cannot reveal what a restricted label contains.
+"""
+
+import heapq
+import re
+import threading
+from collections import Counter
+from collections.abc import Callable
+
+from fastapi import HTTPException
+
+from src.org_store import DiagramStore
+
+_WORD_RE = re.compile(r"\w+")
+
+MIN_FUZZY_SIMILARITY = 0.4
+MAX_FUZZY_WORDS = 8  # vocabulary words a misspelt query word may expand to
+
+# (len(label), label.lower(), diagram_type, node_id)
+Entry = tuple[int, str, str, str]
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries", "subtree")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.entries: set[Entry] = set()
+        self.subtree: frozenset[Entry] | None = None  # cached union below this node
+
+
+class PrefixTrie:
+    """Maps words to entries, with cached prefix lookups."""
+
+    def __init__(self) -> None:
+        self.root = _TrieNode()
+
+    def _path(self, word: str, create: bool = False) -> list[_TrieNode] | None:
+        path = [self.root]
+        for ch in word:
+            child = path[-1].children.get(ch)
+            if child is None:
+                if not create:
+                    return None
+                child = path[-1].children[ch] = _TrieNode()
+            path.append(child)
+        return path
+
+    def add(self, word: str, entry: Entry) -> None:
+        path = self._path(word, create=True)
+        path[-1].entries.add(entry)
+        for node in path:
+            node.subtree = None
+
+    def remove(self, word: str, entry: Entry) -> None:
+        path = self._path(word)
+        if path is None:
+            return
+        path[-1].entries.discard(entry)
+        for node in path:
+            node.subtree = None
+        # Prune branches that no longer lead to any entry
+        for parent, ch in zip(reversed(path[:-1]), reversed(word)):
+            child = parent.children[ch]
+            if child.entries or child.children:
+                break
+            del parent.children[ch]
+
+    def exact(self, word: str) -> set[Entry]:
+        path = self._path(word)
+        return path[-1].entries if path else set()
+
+    def prefixed(self, prefix: str) -> frozenset[Entry]:
+        """Entries with a word starting with `prefix` (cached until that branch changes)."""
+        path = self._path(prefix)
+        return self._subtree(path[-1]) if path else frozenset()
+
+    def _subtree(self, node: _TrieNode) -> frozenset[Entry]:
+        if node.subtree is None:
+            node.subtree = frozenset(node.entries).union(
+                *(self._subtree(child) for child in node.children.values())
+            )
+        return node.subtree
+
+
+class SearchIndex:
+    """Ranked label/description search over every diagram in a store."""
+
+    def __init__(self, store: DiagramStore, diagram_types: set[str]) -> None:
+        self.store = store
+        self.diagram_types = diagram_types
+        self._entries: dict[tuple[str, str], tuple[Entry, dict]] = {}
+        self._trie = PrefixTrie()
+        self._vocabulary: Counter[str] = Counter()  # label word -> entries using it
+        self._vocab_trigrams: dict[str, set[str]] = {}
+        self._description: dict[str, set[Entry]] = {}
+        self._by_level: dict[str, set[Entry]] = {}
+        self._by_type: dict[str, set[Entry]] = {}
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # -- Maintenance -------------------------------------------------------
+
+    def _add(self, diagram_type: str, node: dict) -> None:
+        label = node.get("label", "")
+        entry: Entry = (len(label), label.lower(), diagram_type, node["id"])
+        self._entries[(diagram_type, node["id"])] = (entry, node)
+        for word in set(_words(label)):
+            self._trie.add(word, entry)
+            self._vocabulary[word] += 1
+            if self._vocabulary[word] == 1:
+                for gram in _trigrams(word):
+                    self._vocab_trigrams.setdefault(gram, set()).add(word)
+        for word in set(_words(node.get("description") or "")):
+            self._description.setdefault(word, set()).add(entry)
+        self._by_level.setdefault(node.get("permission_level", "public"), set()).add(entry)
+        self._by_type.setdefault(diagram_type, set()).add(entry)
+
+    def _remove(self, diagram_type: str, node_id: str) -> None:
+        found = self._entries.pop((diagram_type, node_id), None)
+        if found is None:
+            return
+        entry, node = found
+        for word in set(_words(node.get("label", ""))):
+            self._trie.remove(word, entry)
+            self._vocabulary[word] -= 1
+            if self._vocabulary[word] == 0:
+                del self._vocabulary[word]
+                for gram in _trigrams(word):
+                    self._vocab_trigrams[gram].discard(word)
+        for word in set(_words(node.get("description") or "")):
+            self._description[word].discard(entry)
+        self._by_level[node.get("permission_level", "public")].discard(entry)
+        self._by_type[diagram_type].discard(entry)
+
+    def sync(self) -> None:
+        """Bring the index up to date with the store's current versions."""
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        for diagram_type in self.diagram_types:
+            indexed = self._versions.get(diagram_type)
+            try:
+                if indexed is None:
+                    diagram, node_ids = self.store.get(diagram_type), None
+                else:
+                    diagram, node_ids, _ = self.store.changes_since(diagram_type, indexed)
+            except HTTPException:
+                continue  # diagram file missing
+            if diagram.version == indexed:
+                continue
+            if node_ids is None:
+                for key in [k for k in self._entries if k[0] == diagram_type]:
+                    self._remove(*key)
+                node_ids = diagram.nodes.keys()
+            for node_id in list(node_ids):
+                self._remove(diagram_type, node_id)
+                if node_id in diagram.nodes:
+                    self._add(diagram_type, diagram.nodes[node_id])
+            self._versions[diagram_type] = diagram.version
+
+    # -- Queries -----------------------------------------------------------
+
+    def _similar_words(self, word: str) -> list[str]:
+        """Vocabulary words within trigram similarity of a (misspelt) `word`."""
+        grams = _trigrams(word)
+        shared: Counter[str] = Counter()
+        for gram in grams:
+            shared.update(self._vocab_trigrams.get(gram, ()))
+        scored = []
+        for candidate, hits in shared.items():
+            similarity = hits / (len(grams) + len(candidate) + 2 - hits)
+            if similarity >= MIN_FUZZY_SIMILARITY:
+                scored.append((similarity, candidate))
+        return [w for _, w in heapq.nlargest(MAX_FUZZY_WORDS, scored)]
+
+    def search(
+        self,
+        query: str,
+        allowed: list[str],
+        diagram_types: set[str] | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """Return up to `limit` nodes visible at `allowed` levels, best first."""
+        words = list(dict.fromkeys(_words(query)))
+        if not words:
+            return []
+        # One lock for sync and query: a concurrent sync() must not mutate the
+        # sets while they are being intersected
+        with self._lock:
+            self._sync()
+            return self._query(words, allowed, diagram_types, limit)
+
+    def _query(
+        self, words: list[str], allowed: list[str], diagram_types: set[str] | None, limit: int
+    ) -> list[dict]:
+        level_sets = [self._by_level.get(level, set()) for level in allowed]
+        type_sets = None
+        if diagram_types is not None:
+            type_sets = [self._by_type.get(t, set()) for t in diagram_types]
+
+        def visible(candidates) -> set[Entry]:
+            kept = set().union(*(candidates & s for s in level_sets))
+            if type_sets is not None:
+                kept = set().union(*(kept & s for s in type_sets))
+            return kept
+
+        def all_of(sets: list) -> set[Entry]:
+            smallest = min(sets, key=len)
+            return visible(smallest.intersection(*sets))
+
+        prefixed = [self._trie.prefixed(w) for w in words]
+        tiers: list[tuple[float, Callable[[], set[Entry]]]] = [
+            (4, lambda: all_of([self._trie.exact(w) for w in words])),
+            (3, lambda: all_of(prefixed)),
+            (2, lambda: all_of([
+                p.union(*(self._trie.exact(s) for s in self._similar_words(w)))
+                if len(w) >= 3 else p
+                for w, p in zip(words, prefixed)
+            ])),
+            (1, lambda: all_of([self._description.get(w, set()) for w in words])),
+            (0.5, lambda: visible(frozenset().union(*prefixed))),
+        ]
+
+        results: list[dict] = []
+        seen: set[Entry] = set()
+        for score, candidates in tiers:
+            fresh = candidates() - seen
+            for entry in heapq.nsmallest(limit - len(results), fresh):
+                results.append({
+                    "diagram_type": entry[2],
+                    "id": entry[3],
+                    "label": self._entries[(entry[2], entry[3])][1].get("label", ""),
+                    "score": score,
+                })
+            if len(results) >= limit:
+                break
+            seen |= fresh
+        return results
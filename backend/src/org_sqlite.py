@@ -0,0 +1,249 @@
+"""SQLite storage backend for org diagrams.
+
+Nodes and edges live in their own tables, indexed on id, parent_id, source_id
+and target_id, so a mutation touches only the affected rows instead of
+rewriting the whole diagram. Each `DiagramStore.apply` batch runs in a single
+transaction, and the database is opened in WAL mode so readers never block
+the writer. The full node/edge dict is kept as JSON in `data`; the indexed
+columns mirror the fields queries filter on. Row order (rowid) preserves the
+original list order.
+
+Enable with ORG_STORAGE=sqlite. Usage:
+    cd backend
+    python -m src.org_sqlite migrate            # data/org/*.json -> ORG_DB_PATH
+    python -m src.org_sqlite export [--out DIR] # ORG_DB_PATH -> *.json
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+from src.config import ORG_DB_PATH, ORG_DIR
+from src.org_store import Diagram
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS diagrams (
+    diagram_type TEXT PRIMARY KEY,
+    meta         TEXT NOT NULL,
+    version      INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    diagram_type TEXT NOT NULL,
+    id           TEXT NOT NULL,
+    parent_id    TEXT,
+    data         TEXT NOT NULL,
+    PRIMARY KEY (diagram_type, id)
+);
+CREATE INDEX IF NOT EXISTS idx_nodes_parent ON nodes (diagram_type, parent_id);
+CREATE TABLE IF NOT EXISTS edges (
+    diagram_type TEXT NOT NULL,
+    id           TEXT NOT NULL,
+    source_id    TEXT NOT NULL,
+    target_id    TEXT NOT NULL,
+    data         TEXT NOT NULL,
+    PRIMARY KEY (diagram_type, id)
+);
+CREATE INDEX IF NOT EXISTS idx_edges_source ON edges (diagram_type, source_id);
+CREATE INDEX IF NOT EXISTS idx_edges_target ON edges (diagram_type, target_id);
+"""
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False)
+
+
+class SqliteBackend:
+    """Stores diagrams in indexed node/edge tables of one SQLite database."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared across threads; the lock serialises access
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- DiagramStore backend interface ------------------------------------
+
+    def fingerprint(self, diagram_type: str) -> tuple | None:
+        """The diagram's row version, bumped by every write from any process."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM diagrams WHERE diagram_type = ?", (diagram_type,)
+            ).fetchone()
+        return None if row is None else (row[0],)
+
+    def load(self, diagram_type: str) -> dict:
+        with self._lock:
+            (meta,) = self._conn.execute(
+                "SELECT meta FROM diagrams WHERE diagram_type = ?", (diagram_type,)
+            ).fetchone()
+            nodes = self._conn.execute(
+                "SELECT data FROM nodes WHERE diagram_type = ? ORDER BY rowid", (diagram_type,)
+            ).fetchall()
+            edges = self._conn.execute(
+                "SELECT data FROM edges WHERE diagram_type = ? ORDER BY rowid", (diagram_type,)
+            ).fetchall()
+        return {
+            **json.loads(meta),
+            "nodes": [json.loads(d) for (d,) in nodes],
+            "edges": [json.loads(d) for (d,) in edges],
+        }
+
+    def save(self, diagram: Diagram, ops: list[dict], results: list[dict | None]) -> None:
+        """Replay `ops` as row-level writes in one transaction.
+
+        `results` are the records `apply_op` returned, i.e. each node as it
+        stood right after its op, so updates write the merged dict.
+        """
+        t = diagram.diagram_type
+        with self._lock, self._transaction():
+            for op, result in zip(ops, results):
+                kind = op["op"]
+                if kind == "add_node":
+                    self._insert_node(t, op["node"])
+                elif kind == "update_node":
+                    self._conn.execute(
+                        "UPDATE nodes SET parent_id = ?, data = ? "
+                        "WHERE diagram_type = ? AND id = ?",
+                        (result.get("parent_id"), _dumps(result), t, op["id"]),
+                    )
+                elif kind == "delete_node":
+                    self._conn.execute(
+                        "DELETE FROM nodes WHERE diagram_type = ? AND id = ?", (t, op["id"])
+                    )
+                    self._conn.execute(
+                        "DELETE FROM edges WHERE diagram_type = ? AND source_id = ?", (t, op["id"])
+                    )
+                    self._conn.execute(
+                        "DELETE FROM edges WHERE diagram_type = ? AND target_id = ?", (t, op["id"])
+                    )
+                elif kind == "add_edge":
+                    self._insert_edge(t, op["edge"])
+                elif kind == "update_edge":
+                    self._conn.execute(
+                        "UPDATE edges SET source_id = ?, target_id = ?, data = ? "
+                        "WHERE diagram_type = ? AND id = ?",
+                        (result["source_id"], result["target_id"], _dumps(result), t, op["id"]),
+                    )
+                elif kind == "delete_edge":
+                    self._conn.execute(
+                        "DELETE FROM edges WHERE diagram_type = ? AND id = ?", (t, op["id"])
+                    )
+            self._conn.execute(
+                "UPDATE diagrams SET version = version + 1 WHERE diagram_type = ?", (t,)
+            )
+
+    # -- Bulk import/export ------------------------------------------------
+
+    def import_diagram(self, diagram_type: str, data: dict) -> None:
+        """Replace a whole diagram with `data` (the JSON file format)."""
+        diagram = Diagram(diagram_type, data)
+        with self._lock, self._transaction():
+            for table in ("nodes", "edges"):
+                self._conn.execute(f"DELETE FROM {table} WHERE diagram_type = ?", (diagram_type,))
+            self._conn.execute(
+                "INSERT INTO diagrams (diagram_type, meta, version) VALUES (?, ?, 1) "
+                "ON CONFLICT (diagram_type) DO UPDATE SET meta = excluded.meta, "
+                "version = version + 1",
+                (diagram_type, _dumps(diagram.meta)),
+            )
+            for node in diagram.nodes.values():
+                self._insert_node(diagram_type, node)
+            for edge in diagram.edges.values():
+                self._insert_edge(diagram_type, edge)
+
+    def diagram_types(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT diagram_type FROM diagrams ORDER BY diagram_type")
+            return [t for (t,) in rows.fetchall()]
+
+    # -- Internals ---------------------------------------------------------
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    def _insert_node(self, diagram_type: str, node: dict) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO nodes (diagram_type, id, parent_id, data) VALUES (?, ?, ?, ?)",
+            (diagram_type, node["id"], node.get("parent_id"), _dumps(node)),
+        )
+
+    def _insert_edge(self, diagram_type: str, edge: dict) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO edges (diagram_type, id, source_id, target_id, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (diagram_type, edge["id"], edge["source_id"], edge["target_id"], _dumps(edge)),
+        )
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE … COMMIT, rolling back if the block raises."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> None:
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+# ---------------------------------------------------------------------------
+# Migration
+# ---------------------------------------------------------------------------
+
+def migrate_from_json(backend: SqliteBackend, org_dir: Path) -> list[str]:
+    """Import every data/org/*.json diagram into the database."""
+    migrated = []
+    for path in sorted(org_dir.glob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            backend.import_diagram(path.stem, json.load(f))
+        migrated.append(path.stem)
+    return migrated
+
+
+def export_to_json(backend: SqliteBackend, out_dir: Path) -> list[str]:
+    """Write every stored diagram back out in the data/org/*.json format."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    exported = []
+    for diagram_type in backend.diagram_types():
+        data = backend.load(diagram_type)
+        with open(out_dir / f"{diagram_type}.json", "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        exported.append(diagram_type)
+    return exported
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Migrate org diagrams to/from SQLite.")
+    parser.add_argument("command", choices=["migrate", "export"])
+    parser.add_argument("--db", type=Path, default=ORG_DB_PATH, help="SQLite database path")
+    parser.add_argument("--org-dir", type=Path, default=ORG_DIR, help="Source dir for migrate")
+    parser.add_argument("--out", type=Path, default=ORG_DIR, help="Target dir for export")
+    args = parser.parse_args(argv)
+
+    backend = SqliteBackend(args.db)
+    try:
+        if args.command == "migrate":
+            names = migrate_from_json(backend, args.org_dir)
+            print(f"Migrated {len(names)} diagram(s) into {args.db}: {', '.join(names)}")
+        else:
+            names = export_to_json(backend, args.out)
+            print(f"Exported {len(names)} diagram(s) to {args.out}: {', '.join(names)}")
+    finally:
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""Process-level store for org/process/workflow diagrams.
+
+Diagrams are parsed once and kept in memory with id-indexed node and edge
+maps. The backing storage is re-read only when its fingerprint changes
+(checked at most once every `stat_interval` seconds), and every mutation is
+written through, so read-heavy canvas traffic never re-parses anything.
+
+Storage backends:
+  - JsonFileBackend (default) — one JSON file per diagram in data/org/;
+    fingerprint is the file's (mtime, size).
+  - JournalBackend (ORG_STORAGE=journal, see src/org_journal.py) — the same
+    JSON snapshot plus an fsync'd append-only op log, compacted in the
+    background.
+  - SqliteBackend (ORG_STORAGE=sqlite, see src/org_sqlite.py) — indexed
+    node/edge tables with transactional, row-level writes.
+
+Mutations are expressed as small op records and applied with `apply_op`:
+
+    {"op": "add_node",    "node": {...}}
+    {"op": "update_node", "id": "...", "fields": {...}}
+    {"op": "delete_node", "id": "..."}
+    {"op": "add_edge",    "edge": {...}}
+    {"op": "update_edge", "id": "...", "fields": {...}}
+    {"op": "delete_edge", "id": "..."}
+
+`DiagramStore.apply` runs a batch of ops on a copy of the diagram and swaps
+it in only once the backend write succeeds, so a batch is all-or-nothing and
+readers never observe a half-applied one. Node and edge dicts are never
+modified in place — updates replace the dict — so copies share them safely.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from src.config import ORG_DB_PATH, ORG_DIR, ORG_JOURNAL_COMPACT_EVERY, ORG_STORAGE
+from src.org_graph import Adjacency, Hierarchy
+
+STAT_INTERVAL = 1.0  # seconds between mtime/size checks of a cached file
+CHANGE_LOG_SIZE = 1000  # change sets kept per diagram for delta sync
+
+
+class Diagram:
+    """A parsed diagram with id-indexed node and edge maps."""
+
+    def __init__(self, diagram_type: str, data: dict, version: int = 1) -> None:
+        self.diagram_type = diagram_type
+        self.meta = {k: v for k, v in data.items() if k not in ("nodes", "edges")}
+        self.meta.setdefault("diagram_type", diagram_type)
+        self.nodes: dict[str, dict] = {n["id"]: n for n in data.get("nodes", [])}
+        self.edges: dict[str, dict] = {e["id"]: e for e in data.get("edges", [])}
+        self.version = version
+        self._adjacency: Adjacency | None = None
+        self._hierarchy: Hierarchy | None = None
+        # Ids changed by apply_op since this copy was made (for the change log)
+        self.touched_nodes: set[str] = set()
+        self.touched_edges: set[str] = set()
+
+    @property
+    def adjacency(self) -> Adjacency:
+        """Child/parent index, built on first use for this diagram version."""
+        if self._adjacency is None:
+            self._adjacency = Adjacency(self.nodes, self.edges)
+        return self._adjacency
+
+    @property
+    def hierarchy(self) -> Hierarchy:
+        """Closure index over parent_id; built once, then maintained by apply_op."""
+        if self._hierarchy is None:
+            self._hierarchy = Hierarchy(self.nodes)
+        return self._hierarchy
+
+    def copy(self) -> "Diagram":
+        """Return a copy with its own node/edge maps (the records are shared)."""
+        clone = Diagram(self.diagram_type, self.meta, self.version)
+        clone.nodes = dict(self.nodes)
+        clone.edges = dict(self.edges)
+        if self._hierarchy is not None:
+            clone._hierarchy = self._hierarchy.copy()
+        return clone
+
+    def to_json(self) -> dict:
+        """Return the on-disk JSON representation."""
+        return {
+            **self.meta,
+            "nodes": list(self.nodes.values()),
+            "edges": list(self.edges.values()),
+        }
+
+
+def apply_op(diagram: Diagram, op: dict) -> dict | None:
+    """Apply one mutation op to `diagram` in memory and return the affected record."""
+    kind = op["op"]
+    hierarchy = diagram._hierarchy
+    if kind.endswith("_node"):
+        diagram.touched_nodes.add(op["node"]["id"] if kind == "add_node" else op["id"])
+    else:
+        diagram.touched_edges.add(op["edge"]["id"] if kind == "add_edge" else op["id"])
+    if kind == "add_node":
+        node = op["node"]
+        diagram.nodes[node["id"]] = node
+        if hierarchy is not None:
+            hierarchy.add(node)
+        return node
+    if kind == "update_node":
+        node = diagram.nodes.get(op["id"])
+        if node is None:
+            raise HTTPException(status_code=404, detail="Node not found")
+        reparent = op["fields"].get("parent_id", node.get("parent_id")) != node.get("parent_id")
+        if reparent and diagram.hierarchy.would_cycle(op["id"], op["fields"]["parent_id"]):
+            raise HTTPException(status_code=422, detail="Parent change would create a cycle")
+        updated = {**node, **op["fields"]}
+        diagram.nodes[op["id"]] = updated
+        if reparent:
+            diagram.hierarchy.update(op["id"], updated["parent_id"])
+        return updated
+    if kind == "delete_node":
+        node = diagram.nodes.pop(op["id"], None)
+        if hierarchy is not None and node is not None:
+            hierarchy.remove(op["id"])
+        # Remove edges referencing this node
+        for eid in [
+            eid for eid, e in diagram.edges.items()
+            if e["source_id"] == op["id"] or e["target_id"] == op["id"]
+        ]:
+            del diagram.edges[eid]
+            diagram.touched_edges.add(eid)
+        return node
+    if kind == "add_edge":
+        edge = op["edge"]
+        diagram.edges[edge["id"]] = edge
+        return edge
+    if kind == "update_edge":
+        edge = diagram.edges.get(op["id"])
+        if edge is None:
+            raise HTTPException(status_code=404, detail="Edge not found")
+        updated = {**edge, **op["fields"]}
+        diagram.edges[op["id"]] = updated
+        return updated
+    if kind == "delete_edge":
+        return diagram.edges.pop(op["id"], None)
+    raise ValueError(f"Unknown diagram op: {kind}")
+
+
+def validate_ops(diagram: Diagram, ops: list[dict]) -> list[dict]:
+    """Check a batch of ops against `diagram` without applying it.
+
+    Ops are checked in order against the ids the earlier ops leave behind, so
+    a batch may create a node and then connect it. Returns one error per
+    invalid op ({"index", "op", "detail"}); an empty list means the batch
+    applies cleanly.
+    """
+    parents = {node_id: node.get("parent_id") for node_id, node in diagram.nodes.items()}
+    nodes = parents.keys()
+    edges = {eid: (e["source_id"], e["target_id"]) for eid, e in diagram.edges.items()}
+    errors: list[dict] = []
+
+    def creates_cycle(node_id: str, parent_id: str) -> bool:
+        seen = set()
+        while parent_id is not None and parent_id not in seen:
+            if parent_id == node_id:
+                return True
+            seen.add(parent_id)
+            parent_id = parents.get(parent_id)
+        return False
+
+    for index, op in enumerate(ops):
+        kind = op["op"]
+        problem = None
+        if kind == "add_node":
+            node = op["node"]
+            if node["id"] in nodes:
+                problem = f"Node '{node['id']}' already exists"
+            elif node.get("parent_id") and node["parent_id"] not in nodes:
+                problem = f"Parent node '{node['parent_id']}' not found"
+            else:
+                parents[node["id"]] = node.get("parent_id")
+        elif kind == "update_node":
+            parent_id = op["fields"].get("parent_id")
+            if op["id"] not in nodes:
+                problem = f"Node '{op['id']}' not found"
+            elif parent_id and parent_id not in nodes:
+                problem = f"Parent node '{parent_id}' not found"
+            elif parent_id and creates_cycle(op["id"], parent_id):
+                problem = f"Moving '{op['id']}' under '{parent_id}' would create a cycle"
+            elif "parent_id" in op["fields"]:
+                parents[op["id"]] = parent_id
+        elif kind == "delete_node":
+            if op["id"] not in nodes:
+                problem = f"Node '{op['id']}' not found"
+            else:
+                del parents[op["id"]]
+                edges = {eid: ends for eid, ends in edges.items() if op["id"] not in ends}
+        elif kind in ("add_edge", "update_edge"):
+            fields = op["edge"] if kind == "add_edge" else op["fields"]
+            edge_id = fields["id"] if kind == "add_edge" else op["id"]
+            if kind == "add_edge" and edge_id in edges:
+                problem = f"Edge '{edge_id}' already exists"
+            elif kind == "update_edge" and edge_id not in edges:
+                problem = f"Edge '{edge_id}' not found"
+            else:
+                source, target = edges.get(edge_id, (None, None))
+                source = fields.get("source_id", source)
+                target = fields.get("target_id", target)
+                missing = [n for n in (source, target) if n not in nodes]
+                if missing:
+                    problem = f"Node '{missing[0]}' not found"
+                else:
+                    edges[edge_id] = (source, target)
+        elif kind == "delete_edge":
+            if edges.pop(op["id"], None) is None:
+                problem = f"Edge '{op['id']}' not found"
+        else:
+            problem = f"Unknown op '{kind}'"
+
+        if problem is not None:
+            errors.append({"index": index, "op": kind, "detail": problem})
+    return errors
+
+
+def write_json_atomic(path: Path, data: dict) -> None:
+    """Write `data` to a temp file, fsync it and rename it over `path`.
+
+    The temp name does not end in .json, so the ingest watcher ignores it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class JsonFileBackend:
+    """Stores each diagram as data/org/<diagram_type>.json."""
+
+    def __init__(self, org_dir: Path) -> None:
+        self.org_dir = org_dir
+
+    def path(self, diagram_type: str) -> Path:
+        return self.org_dir / f"{diagram_type}.json"
+
+    def fingerprint(self, diagram_type: str) -> tuple | None:
+        try:
+            st = self.path(diagram_type).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self, diagram_type: str) -> dict:
+        with open(self.path(diagram_type), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, diagram: Diagram, ops: list[dict], results: list[dict | None]) -> None:
+        """Rewrite the whole file; `ops` are not needed for this backend."""
+        write_json_atomic(self.path(diagram.diagram_type), diagram.to_json())
+
+    def diagram_types(self) -> list[str]:
+        return sorted(p.stem for p in self.org_dir.glob("*.json"))
+
+
+class _Entry:
+    def __init__(self, diagram: Diagram, fingerprint: tuple) -> None:
+        self.diagram = diagram
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+
+
+class _ChangeSet:
+    """Node and edge ids changed by one version; None for a full reload."""
+
+    def __init__(self, version: int, nodes: frozenset | None, edges: frozenset | None) -> None:
+        self.version = version
+        self.nodes = nodes
+        self.edges = edges
+
+
+class DiagramStore:
+    """Caches parsed diagrams from a storage backend and writes mutations through.
+
+    Every diagram version gets a change set in a bounded log, so clients can
+    sync with `changes_since()` instead of re-reading the whole diagram.
+    Versions start from the store's creation time in milliseconds, so they
+    keep increasing across restarts and a client's old version is never
+    mistaken for a new one. Listeners added with `add_listener` hear about
+    every committed batch, whatever the backend writes to disk.
+    """
+
+    def __init__(
+        self,
+        backend,
+        stat_interval: float = STAT_INTERVAL,
+        change_log_size: int = CHANGE_LOG_SIZE,
+    ) -> None:
+        self.backend = backend
+        self.stat_interval = stat_interval
+        self._entries: dict[str, _Entry] = {}
+        # Survives invalidate() so versions never repeat
+        self._version_base = time.time_ns() // 1_000_000
+        self._versions: dict[str, int] = {}
+        self._changes: dict[str, deque[_ChangeSet]] = {}
+        self._change_log_size = change_log_size
+        self._locks: dict[str, threading.RLock] = {}
+        self._guard = threading.Lock()
+        self._listeners: list[Callable[[str], None]] = []
+
+    def _next_version(self, diagram_type: str) -> int:
+        version = self._versions.get(diagram_type, self._version_base) + 1
+        self._versions[diagram_type] = version
+        return version
+
+    def _record(self, diagram: Diagram, reload: bool = False) -> None:
+        log = self._changes.setdefault(diagram.diagram_type, deque(maxlen=self._change_log_size))
+        if reload:
+            log.append(_ChangeSet(diagram.version, None, None))
+        else:
+            log.append(_ChangeSet(
+                diagram.version, frozenset(diagram.touched_nodes), frozenset(diagram.touched_edges)
+            ))
+
+    def _lock(self, diagram_type: str) -> threading.RLock:
+        with self._guard:
+            return self._locks.setdefault(diagram_type, threading.RLock())
+
+    def get(self, diagram_type: str) -> Diagram:
+        """Return the cached diagram, reloading it if its storage changed."""
+        entry = self._entries.get(diagram_type)
+        if entry is not None and time.monotonic() - entry.checked_at < self.stat_interval:
+            return entry.diagram
+
+        with self._lock(diagram_type):
+            entry = self._entries.get(diagram_type)
+            fingerprint = self.backend.fingerprint(diagram_type)
+            if fingerprint is None:
+                self._entries.pop(diagram_type, None)
+                raise HTTPException(status_code=404, detail=f"Diagram '{diagram_type}' not found")
+            if entry is not None and entry.fingerprint == fingerprint:
+                entry.checked_at = time.monotonic()
+                return entry.diagram
+
+            data = self.backend.load(diagram_type)
+            diagram = Diagram(diagram_type, data, self._next_version(diagram_type))
+            self._entries[diagram_type] = _Entry(diagram, fingerprint)
+            self._record(diagram, reload=True)
+            return diagram
+
+    def apply(
+        self,
+        diagram_type: str,
+        ops: list[dict],
+        validate: bool = False,
+    ) -> list[dict | None]:
+        """Apply mutation ops in order, write them through, and bump the version.
+
+        All-or-nothing: if any op or the backend write fails, the cached
+        diagram is left untouched. With `validate=True` the whole batch is
+        checked first and rejected with a 422 listing every invalid op.
+        """
+        with self._lock(diagram_type):
+            current = self.get(diagram_type)
+            if validate:
+                errors = validate_ops(current, ops)
+                if errors:
+                    raise HTTPException(status_code=422, detail={
+                        "message": "Batch rejected; no changes were applied",
+                        "errors": errors,
+                    })
+            diagram = current.copy()
+            results = [apply_op(diagram, op) for op in ops]
+            diagram.version = self._next_version(diagram_type)
+            self.backend.save(diagram, ops, results)
+            entry = self._entries[diagram_type]
+            entry.diagram = diagram
+            entry.fingerprint = self.backend.fingerprint(diagram_type) or entry.fingerprint
+            entry.checked_at = time.monotonic()
+            self._record(diagram)
+        for listener in self._listeners:
+            listener(diagram_type)
+        return results
+
+    def changes_since(
+        self, diagram_type: str, since: int
+    ) -> tuple[Diagram, set[str] | None, set[str] | None]:
+        """Return (diagram, node ids, edge ids) changed after version `since`.
+
+        The id sets are None when the log cannot answer — `since` is unknown,
+        too old, or spans a reload from storage — and the client must fetch
+        the full diagram instead.
+        """
+        diagram = self.get(diagram_type)
+        if since == diagram.version:
+            return diagram, set(), set()
+        log = list(self._changes.get(diagram_type, ()))
+        if since > diagram.version or not log or log[0].version > since + 1:
+            return diagram, None, None
+        nodes: set[str] = set()
+        edges: set[str] = set()
+        for change in log:
+            if change.version <= since or change.version > diagram.version:
+                continue
+            if change.nodes is None:
+                return diagram, None, None
+            nodes |= change.nodes
+            edges |= change.edges
+        return diagram, nodes, edges
+
+    def diagram_types(self) -> list[str]:
+        """Every diagram the backend holds, whether or not it is cached."""
+        return self.backend.diagram_types()
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(diagram_type)` after every successful `apply`."""
+        self._listeners.append(listener)
+
+    def invalidate(self, diagram_type: str | None = None) -> None:
+        """Drop cached diagrams so the next read goes to storage."""
+        if diagram_type is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(diagram_type, None)
+
+
+def make_store() -> DiagramStore:
+    """Build the store for the configured ORG_STORAGE backend."""
+    if ORG_STORAGE == "sqlite":
+        from src.org_sqlite import SqliteBackend
+        return DiagramStore(SqliteBackend(ORG_DB_PATH))
+    if ORG_STORAGE == "journal":
+        from src.org_journal import JournalBackend
+        return DiagramStore(JournalBackend(ORG_DIR, compact_every=ORG_JOURNAL_COMPACT_EVERY))
+    return DiagramStore(JsonFileBackend(ORG_DIR))
+
+
+# Process-wide store used by the org router
+org_store = make_store()
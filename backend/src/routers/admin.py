@@ -1,17 +1,22 @@
-"""Admin API — document management, ingestion trigger, and README viewer.
+"""Admin API — document management, background ingestion jobs, and README viewer.
 
 All endpoints require admin role.
 """
 
-import asyncio
+import json
 from datetime import datetime, timezone
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import PlainTextResponse
+from sse_starlette.sse import EventSourceResponse
 
+from src.aio import lag_monitor, run_io
 from src.auth import get_current_user
+from src.bpmn.tiers import tier_stats
 from src.config import DATA_DIR, DOCUMENTS_DIR
+from src.ingest_jobs import IngestBusyError, ingest_jobs
+from src.jobs import Job
 
 router = APIRouter()
 
@@ -36,18 +41,17 @@ def _require_admin(user: dict = Depends(get_current_user)) -> dict:
 @router.get("/readme", response_class=PlainTextResponse)
 async def get_readme(_user: dict = Depends(_require_admin)) -> str:
     """Return the project README.md as plain text."""
-    if not _README_PATH.exists():
+    try:
+        return await run_io(_README_PATH.read_text, encoding="utf-8")
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="README.md not found")
-    return _README_PATH.read_text(encoding="utf-8")
 
 
 # ---------------------------------------------------------------------------
 # Document listing
 # ---------------------------------------------------------------------------
 
-@router.get("/documents")
-async def list_documents(_user: dict = Depends(_require_admin)) -> dict:
-    """List all files in the documents directory."""
+def _scan_documents() -> list[dict]:
     supported = {".pdf", ".xlsx", ".xls", ".md"}
     files = []
     if DOCUMENTS_DIR.exists():
@@ -62,40 +66,112 @@ async def list_documents(_user: dict = Depends(_require_admin)) -> dict:
                         stat.st_mtime, tz=timezone.utc
                     ).strftime("%Y-%m-%d %H:%M UTC"),
                 })
+    return files
+
+
+@router.get("/documents")
+async def list_documents(_user: dict = Depends(_require_admin)) -> dict:
+    """List all files in the documents directory."""
+    files = await run_io(_scan_documents)
     return {"documents": files, "count": len(files)}
 
 
 # ---------------------------------------------------------------------------
-# Ingest trigger
+# Ingest jobs
 # ---------------------------------------------------------------------------
 
-@router.post("/ingest")
+def _get_job(job_id: str) -> Job:
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job '{job_id}' not found")
+    return job
+
+
+@router.post("/ingest", status_code=202)
 async def trigger_ingest(_user: dict = Depends(_require_admin)) -> dict:
-    """Re-run the full document ingestion pipeline (admin only).
+    """Start a full re-ingestion as a background job (admin only).
 
-    Runs synchronously in a thread pool so the event loop is not blocked.
-    Returns a summary of the result.
+    Returns immediately with the job; poll GET /ingest/jobs/{id} or stream
+    GET /ingest/jobs/{id}/events for progress. Only one ingest job runs at a
+    time — a second request while one is running gets 409.
     """
-    def _run_ingest() -> dict:
-        # Import here to avoid circular imports and to ensure fresh state
-        from src.ingest import chunk_documents, create_vector_store, load_documents, load_url_map
-        from src.config import URL_MAP_PATH
-
-        url_map = load_url_map(URL_MAP_PATH)
-        documents = load_documents(DOCUMENTS_DIR, url_map)
-        if not documents:
-            return {"status": "ok", "documents": 0, "chunks": 0, "message": "No documents found to ingest."}
-        chunks = chunk_documents(documents)
-        create_vector_store(chunks)
-        return {
-            "status": "ok",
-            "documents": len(documents),
-            "chunks": len(chunks),
-            "message": f"Ingested {len(documents)} document(s) into {len(chunks)} chunks.",
-        }
-
     try:
-        result = await asyncio.to_thread(_run_ingest)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Ingestion failed: {e}") from e
+        job = ingest_jobs.submit("full")
+    except IngestBusyError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "job_id": e.running.id},
+        ) from e
+    return {
+        "status": job.status,
+        "job": job.to_dict(),
+        "message": f"Ingestion started (job {job.id}).",
+    }
+
+
+@router.get("/ingest/jobs")
+async def list_ingest_jobs(_user: dict = Depends(_require_admin)) -> dict:
+    """Return the ingest job history, newest first."""
+    running = ingest_jobs.running
+    return {
+        "jobs": [j.to_dict() for j in ingest_jobs.history()],
+        "running": running.id if running and not running.finished else None,
+    }
+
+
+@router.get("/ingest/jobs/{job_id}")
+async def get_ingest_job(
+    job_id: str,
+    since: int = 0,
+    _user: dict = Depends(_require_admin),
+) -> dict:
+    """Return one job with its progress events after sequence number `since`."""
+    job = _get_job(job_id)
+    data = job.to_dict()
+    data["events"] = job.events_since(since)
+    return data
+
+
+@router.get("/ingest/jobs/{job_id}/events")
+async def stream_ingest_job(
+    job_id: str,
+    since: int = 0,
+    _user: dict = Depends(_require_admin),
+):
+    """Stream a job's progress events via SSE until it finishes."""
+    job = _get_job(job_id)
+
+    async def event_generator():
+        async for evt in job.stream_events(since):
+            yield {"event": evt["event"], "id": str(evt["seq"]), "data": json.dumps(evt)}
+
+    return EventSourceResponse(event_generator())
+
+
+@router.post("/ingest/jobs/{job_id}/cancel")
+async def cancel_ingest_job(job_id: str, _user: dict = Depends(_require_admin)) -> dict:
+    """Request cancellation. The job stops at its next file or batch boundary."""
+    job = _get_job(job_id)
+    if not job.finished:
+        job.cancel()
+    return job.to_dict()
+
+
+# ---------------------------------------------------------------------------
+# Event loop health
+# ---------------------------------------------------------------------------
+
+@router.get("/loop-lag")
+async def get_loop_lag(_user: dict = Depends(_require_admin)) -> dict:
+    """Return event-loop stalls over LOOP_LAG_THRESHOLD_MS since startup."""
+    return lag_monitor.stats()
+
+
+# ---------------------------------------------------------------------------
+# BPMN parse model tiers
+# ---------------------------------------------------------------------------
+
+@router.get("/bpmn-tiers")
+async def get_bpmn_tiers(_user: dict = Depends(_require_admin)) -> dict:
+    """Return per-model-tier BPMN parse success rates and latencies since startup."""
+    return tier_stats.stats()
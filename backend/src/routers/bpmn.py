@@ -1,25 +1,61 @@
 """BPMN parse and template endpoints.
 
 POST /api/bpmn/parse   — text → BPMN 2.0 XML (manager/admin only)
+POST /api/bpmn/parse/stream — as /parse, streaming elements via SSE as they are parsed
+POST /api/bpmn/parse/long — long documents, parsed section by section
+POST /api/bpmn/batches — parse many texts as a resumable background job
 GET  /api/bpmn/templates — list sample process flows from data/templates/
+GET  /api/bpmn/templates/{id} — one template with its precompiled BPMN XML
 """
 
+import asyncio
+import json
 import logging
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
+from sse_starlette.sse import EventSourceResponse
+from starlette.concurrency import iterate_in_threadpool
 
+from src.aio import run_io
 from src.auth import get_current_user
+from src.bpmn.batch import BatchJobManager, BatchStore, RateLimiter
+from src.bpmn.cache import ParseCache
 from src.bpmn.generator import generate_bpmn_xml
-from src.bpmn.parser import parse_process_text
-from src.config import DATA_DIR
+from src.bpmn.longdoc import parse_long_text
+from src.bpmn.parser import parse_process_text, parse_text, stream_process_text
+from src.bpmn.rules import parse_structured
+from src.bpmn.templates import TemplateLibrary
+from src.bpmn.tiers import model_key
+from src.config import (
+    BPMN_BATCH_CONCURRENCY,
+    BPMN_BATCH_DB_PATH,
+    BPMN_BATCH_MAX_ATTEMPTS,
+    BPMN_BATCH_MAX_CONCURRENCY,
+    BPMN_BATCH_MAX_ITEMS,
+    BPMN_BATCH_RPM,
+    BPMN_CACHE_PATH,
+    BPMN_CACHE_SIZE,
+    BPMN_LONG_PARSE_MAX_CHARS,
+    DATA_DIR,
+)
+from src.etag import etag_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 TEMPLATES_DIR: Path = DATA_DIR / "templates"
 
+parse_cache = ParseCache(BPMN_CACHE_PATH, model_key(), max_entries=BPMN_CACHE_SIZE)
+template_library = TemplateLibrary(TEMPLATES_DIR, model_key())
+batch_jobs = BatchJobManager(
+    BatchStore(BPMN_BATCH_DB_PATH),
+    RateLimiter(BPMN_BATCH_RPM),
+    cache=parse_cache,
+    max_attempts=BPMN_BATCH_MAX_ATTEMPTS,
+)
+
 
 # ---------------------------------------------------------------------------
 # Request models
@@ -33,6 +69,24 @@ class ParseRequest(BaseModel):
     )
 
 
+class LongParseRequest(BaseModel):
+    text: str = Field(
+        min_length=10,
+        max_length=BPMN_LONG_PARSE_MAX_CHARS,
+        description="Process document (e.g. a full SOP) to parse section by section",
+    )
+
+
+class BatchItem(BaseModel):
+    id: str | None = Field(default=None, max_length=200, description="Caller's id for the item")
+    text: str = Field(min_length=10, max_length=5000)
+
+
+class BatchRequest(BaseModel):
+    items: list[BatchItem] = Field(min_length=1, max_length=BPMN_BATCH_MAX_ITEMS)
+    concurrency: int = Field(default=BPMN_BATCH_CONCURRENCY, ge=1, le=BPMN_BATCH_MAX_CONCURRENCY)
+
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
@@ -45,15 +99,34 @@ async def parse_process(
     """Parse plain-text process flow into BPMN 2.0 XML.
 
     Requires manager or admin role. Viewers may only view pre-existing diagrams.
+    Template text and text parsed before (ignoring whitespace and case) are
+    served without calling the LLM; `cached` says which happened.
     """
     if user["role"] == "viewer":
         raise HTTPException(status_code=403, detail="Insufficient permissions")
 
-    process_flow = parse_process_text(body.text)
+    template = await run_io(template_library.match, body.text)
+    if template is not None:
+        return {
+            "bpmn_xml": template.bpmn_xml,
+            "process_json": template.process_json,
+            "cached": True,
+        }
+
+    # Structured step lists parse locally in milliseconds; only the rest go to the LLM
+    process_flow = parse_structured(body.text)
+    parser = "rules"
+    if process_flow is None:
+        cached = await run_io(parse_cache.get, body.text)
+        if cached is not None:
+            return {**cached, "cached": True}
+        process_flow = await asyncio.to_thread(parse_process_text, body.text)
+        parser = "llm"
     bpmn_xml = generate_bpmn_xml(process_flow)
 
     logger.info(
-        "BPMN parse complete: process=%r actors=%d activities=%d gateways=%d flows=%d",
+        "BPMN parse complete (%s): process=%r actors=%d activities=%d gateways=%d flows=%d",
+        parser,
         process_flow.name,
         len(process_flow.actors),
         len(process_flow.activities),
@@ -61,26 +134,271 @@ async def parse_process(
         len(process_flow.sequence_flows),
     )
 
+    process_json = process_flow.model_dump()
+    if parser == "llm":
+        await run_io(parse_cache.put, body.text, process_json, bpmn_xml)
+    return {
+        "bpmn_xml": bpmn_xml,
+        "process_json": process_json,
+        "cached": False,
+    }
+
+
+def _element_event(kind: str, item: dict) -> dict:
+    """One SSE event for a parsed item: "actor", "element" (with its kind) or "flow"."""
+    if kind in ("actor", "flow"):
+        return {"event": kind, "data": json.dumps(item)}
+    return {"event": "element", "data": json.dumps({"kind": kind, **item})}
+
+
+def _replay(process_json: dict):
+    """Element events for an already-parsed process, in streaming order."""
+    for key, kind in (
+        ("actors", "actor"), ("events", "event"), ("activities", "activity"),
+        ("gateways", "gateway"), ("sequence_flows", "flow"),
+    ):
+        for item in process_json.get(key, []):
+            yield _element_event(kind, item)
+
+
+async def _parse_without_llm(text: str) -> dict | None:
+    """The template, rule-based or cached parse of `text`; None if it needs the LLM."""
+    template = await run_io(template_library.match, text)
+    if template is not None:
+        return {
+            "bpmn_xml": template.bpmn_xml,
+            "process_json": template.process_json,
+            "cached": True,
+        }
+    process_flow = parse_structured(text)
+    if process_flow is not None:
+        return {
+            "bpmn_xml": generate_bpmn_xml(process_flow),
+            "process_json": process_flow.model_dump(),
+            "cached": False,
+        }
+    cached = await run_io(parse_cache.get, text)
+    return {**cached, "cached": True} if cached is not None else None
+
+
+@router.post("/parse/stream")
+async def parse_process_stream(
+    body: ParseRequest,
+    user: dict = Depends(get_current_user),
+):
+    """Parse like /parse, streaming the result via SSE as it is generated.
+
+    Emits "actor" events, then "element" events (kind: event, activity or
+    gateway), then "flow" events as each completes in the LLM output, so
+    swimlanes can be drawn before the model has finished. A "result" event
+    carries the final (repaired) BPMN XML and JSON, followed by "done". On
+    failure an "error" event carries the detail and HTTP-equivalent status;
+    output that clearly cannot validate is aborted mid-stream.
+    """
+    if user["role"] == "viewer":
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    async def event_generator():
+        try:
+            result = await _parse_without_llm(body.text)
+            if result is not None:
+                for event in _replay(result["process_json"]):
+                    yield event
+            else:
+                process_flow = None
+                updates = stream_process_text(body.text)
+                try:
+                    async for kind, item in iterate_in_threadpool(updates):
+                        if kind == "process":
+                            process_flow = item
+                        else:
+                            yield _element_event(kind, item)
+                finally:
+                    # A client disconnect abandons this generator; closing the parser
+                    # closes the LLM stream, so generation stops instead of running on
+                    updates.close()
+                process_json = process_flow.model_dump()
+                bpmn_xml = await asyncio.to_thread(generate_bpmn_xml, process_flow)
+                await run_io(parse_cache.put, body.text, process_json, bpmn_xml)
+                result = {"bpmn_xml": bpmn_xml, "process_json": process_json, "cached": False}
+
+            yield {"event": "result", "data": json.dumps(result)}
+            yield {"event": "done", "data": json.dumps({"status": "complete"})}
+
+        except HTTPException as exc:
+            yield {
+                "event": "error",
+                "data": json.dumps({"error": exc.detail, "status": exc.status_code}),
+            }
+
+    return EventSourceResponse(event_generator())
+
+
+@router.post("/parse/long")
+async def parse_long_process(
+    body: LongParseRequest,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Parse a long process document into one BPMN 2.0 diagram.
+
+    The text is split at section boundaries and the sections are parsed
+    concurrently, then merged (see src/bpmn/longdoc.py). `sections` is how
+    many parts it was parsed in; 0 when served from the parse cache.
+    """
+    if user["role"] == "viewer":
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    cached = await run_io(parse_cache.get, body.text)
+    if cached is not None:
+        return {**cached, "cached": True, "sections": 0}
+
+    process_flow, sections = await asyncio.to_thread(parse_long_text, body.text)
+    bpmn_xml = await asyncio.to_thread(generate_bpmn_xml, process_flow)
+    logger.info(
+        "Long BPMN parse complete: process=%r sections=%d actors=%d activities=%d",
+        process_flow.name,
+        sections,
+        len(process_flow.actors),
+        len(process_flow.activities),
+    )
+
+    process_json = process_flow.model_dump()
+    await run_io(parse_cache.put, body.text, process_json, bpmn_xml)
     return {
         "bpmn_xml": bpmn_xml,
-        "process_json": process_flow.model_dump(),
+        "process_json": process_json,
+        "cached": False,
+        "sections": sections,
     }
 
 
+# ---------------------------------------------------------------------------
+# Batch jobs
+# ---------------------------------------------------------------------------
+
+def _require_editor(user: dict = Depends(get_current_user)) -> dict:
+    if user["role"] == "viewer":
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    return user
+
+
+async def _describe_batch(batch_id: str) -> dict:
+    """The batch's job dict; batches no longer in memory come from the database."""
+    batch = await run_io(batch_jobs.describe, batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch '{batch_id}' not found")
+    return batch
+
+
+async def _aiter(items: list):
+    for item in items:
+        yield item
+
+
+@router.post("/batches", status_code=202)
+async def create_batch(body: BatchRequest, user: dict = Depends(_require_editor)) -> dict:
+    """Parse many texts as a background job (manager/admin).
+
+    Returns immediately; stream GET /batches/{id}/events for an "item" event
+    per finished text (its status and any error), and page through
+    GET /batches/{id}/items for the XML and JSON. Unfinished batches resume
+    after a restart.
+    """
+    items = [
+        {"id": item.id or str(i + 1), "text": item.text} for i, item in enumerate(body.items)
+    ]
+    job = await run_io(batch_jobs.submit, items, body.concurrency, user["username"])
+    return {"job": job.to_dict(), "message": f"Batch of {len(items)} started (job {job.id})."}
+
+
+@router.get("/batches")
+async def list_batches(_user: dict = Depends(_require_editor)) -> dict:
+    """Batches started since the backend came up, newest first."""
+    return {"jobs": [j.to_dict() for j in batch_jobs.history()]}
+
+
+@router.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, _user: dict = Depends(_require_editor)) -> dict:
+    """Return one batch with its item counts by status."""
+    batch = await _describe_batch(batch_id)
+    return {**batch, "counts": await run_io(batch_jobs.store.counts, batch_id)}
+
+
+@router.get("/batches/{batch_id}/items")
+async def get_batch_items(
+    batch_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    status: str | None = Query(None, pattern="^(pending|succeeded|failed)$"),
+    _user: dict = Depends(_require_editor),
+) -> dict:
+    """Page through a batch's stored per-item results."""
+    await _describe_batch(batch_id)
+    items = await run_io(batch_jobs.store.items, batch_id, offset, limit, status)
+    return {"items": items, "offset": offset, "limit": limit}
+
+
+@router.get("/batches/{batch_id}/events")
+async def stream_batch(batch_id: str, since: int = 0, _user: dict = Depends(_require_editor)):
+    """Stream a batch's progress and per-item results via SSE until it finishes.
+
+    A batch no longer in memory replays its stored items and final status.
+    """
+    job = batch_jobs.get(batch_id)
+    if job is None:
+        await _describe_batch(batch_id)
+        stored = await run_io(batch_jobs.stored_events, batch_id, since)
+
+    async def event_generator():
+        events = job.stream_events(since) if job is not None else _aiter(stored)
+        async for evt in events:
+            yield {"event": evt["event"], "id": str(evt["seq"]), "data": json.dumps(evt)}
+
+    return EventSourceResponse(event_generator())
+
+
+@router.post("/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str, _user: dict = Depends(_require_editor)) -> dict:
+    """Request cancellation. Items already being parsed still finish and are stored."""
+    job = batch_jobs.get(batch_id)
+    if job is None:
+        return await _describe_batch(batch_id)  # not in memory: long finished
+    if not job.finished:
+        job.cancel()
+    return job.to_dict()
+
+
+# ---------------------------------------------------------------------------
+# Templates
+# ---------------------------------------------------------------------------
+
 @router.get("/templates")
 async def list_templates(
     user: dict = Depends(get_current_user),
-) -> list[dict]:
+    if_none_match: str | None = Header(default=None),
+) -> Response:
     """Return available process flow template texts from data/templates/."""
-    templates: list[dict] = []
-    if TEMPLATES_DIR.exists():
-        for path in sorted(TEMPLATES_DIR.glob("*.txt")):
-            name = path.stem.replace("_", " ").title()
-            try:
-                templates.append({
-                    "name": name,
-                    "text": path.read_text(encoding="utf-8"),
-                })
-            except OSError as exc:
-                logger.warning("Could not read template %s: %s", path.name, exc)
-    return templates
+    await run_io(template_library.ensure_loaded)
+    body, etag = template_library.listing
+    return etag_response(body, etag, if_none_match)
+
+
+@router.get("/templates/{template_id}")
+async def get_template(
+    template_id: str,
+    user: dict = Depends(get_current_user),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """Return one template with its precompiled ProcessFlow JSON and BPMN XML.
+
+    Templates are compiled at startup; one that is not compiled yet (e.g. just
+    added) is compiled on this request and persisted for everyone after.
+    """
+    template = await run_io(template_library.get, template_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"Template '{template_id}' not found")
+    if not template.compiled:
+        template = await asyncio.to_thread(
+            template_library.compile, template_id, parse_text
+        )
+    return etag_response(template.body, template.etag, if_none_match)
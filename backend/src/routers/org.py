@@ -1,19 +1,28 @@
-"""Org chart CRUD API — backed by JSON files in backend/data/org/."""
+"""Org chart CRUD API — backed by JSON files in backend/data/org/.
 
+Reads and writes go through the in-memory diagram store (src/org_store.py).
+"""
+
+import asyncio
+import base64
 import json
+import time
 import uuid
-from pathlib import Path
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+from sse_starlette.sse import EventSourceResponse
 
+from src.aio import run_io
 from src.auth import get_current_user
-from src.config import DATA_DIR
+from src.etag import etag_response, json_bytes, make_etag
+from src.org_graph import ancestors, children_page, descendants, edges_within
+from src.org_search import SearchIndex
+from src.org_store import Diagram, org_store
 
 router = APIRouter()
 
-ORG_DIR: Path = DATA_DIR / "org"
-
 ROLE_LEVELS: dict[str, list[str]] = {
     "admin":   ["public", "manager", "admin"],
     "manager": ["public", "manager"],
@@ -22,68 +31,176 @@ ROLE_LEVELS: dict[str, list[str]] = {
 
 VALID_TYPES = {"org_chart", "business_process", "workflow", "hr_policy"}
 
+MAX_BATCH_OPS = 5000
+MAX_SUBGRAPH_NODES = 2000
+MAX_CHANGES_WAIT = 30.0  # seconds a long-poll may be held open
+CHANGES_POLL_INTERVAL = 0.25
+
+search_index = SearchIndex(org_store, VALID_TYPES)
+
 
 # ---------------------------------------------------------------------------
-# File helpers
+# Store helpers
 # ---------------------------------------------------------------------------
 
-def _diagram_path(diagram_type: str) -> Path:
+def _check_type(diagram_type: str) -> None:
     if diagram_type not in VALID_TYPES:
         raise HTTPException(status_code=404, detail=f"Unknown diagram type: {diagram_type}")
-    return ORG_DIR / f"{diagram_type}.json"
 
 
-def _read_diagram(diagram_type: str) -> dict:
-    path = _diagram_path(diagram_type)
-    if not path.exists():
-        raise HTTPException(status_code=404, detail=f"Diagram '{diagram_type}' not found")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+# The store stats, reads and writes files, so every call runs off the event loop.
+
+async def _read_diagram(diagram_type: str) -> Diagram:
+    _check_type(diagram_type)
+    return await run_io(org_store.get, diagram_type)
 
 
-def _write_diagram(diagram_type: str, data: dict) -> None:
-    path = _diagram_path(diagram_type)
-    ORG_DIR.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+async def _apply(diagram_type: str, *ops: dict, validate: bool = False) -> list[dict | None]:
+    _check_type(diagram_type)
+    return await run_io(org_store.apply, diagram_type, list(ops), validate=validate)
 
 
-def _build_flow_response(diagram: dict, role: str) -> dict:
+def _flow_node(node: dict, allowed: list[str]) -> dict:
+    """Serialize one node for the canvas, masking it if the role may not see it."""
+    restricted = node["permission_level"] not in allowed
+    return {
+        "id": node["id"],
+        "type": "restrictedNode" if restricted else "orgNode",
+        "data": {
+            "id": node["id"],
+            "label": "Restricted" if restricted else node["label"],
+            "description": None if restricted else node.get("description"),
+            "node_type": node["node_type"],
+            "permission_level": node["permission_level"],
+            "is_restricted": restricted,
+        },
+    }
+
+
+def _flow_edge(edge: dict) -> dict:
+    return {
+        "id": edge["id"],
+        "source": edge["source_id"],
+        "target": edge["target_id"],
+        "label": edge.get("label", ""),
+    }
+
+
+def _build_flow_response(diagram: Diagram, role: str) -> dict:
     """Return permission-filtered flow data for the frontend canvas."""
     allowed = ROLE_LEVELS.get(role, ["public"])
-    flow_nodes = []
-    for node in diagram["nodes"]:
-        restricted = node["permission_level"] not in allowed
-        flow_nodes.append({
-            "id": node["id"],
-            "type": "restrictedNode" if restricted else "orgNode",
-            "data": {
-                "id": node["id"],
-                "label": "Restricted" if restricted else node["label"],
-                "description": None if restricted else node.get("description"),
-                "node_type": node["node_type"],
-                "permission_level": node["permission_level"],
-                "is_restricted": restricted,
-            },
-        })
-    visible_ids = {n["id"] for n in diagram["nodes"]}
+    flow_nodes = [_flow_node(node, allowed) for node in list(diagram.nodes.values())]
+    visible_ids = set(diagram.nodes)
     flow_edges = [
-        {
-            "id": e["id"],
-            "source": e["source_id"],
-            "target": e["target_id"],
-            "label": e.get("label", ""),
-        }
-        for e in diagram["edges"]
+        _flow_edge(e)
+        for e in list(diagram.edges.values())
         if e["source_id"] in visible_ids and e["target_id"] in visible_ids
     ]
     return {
-        "diagram_type": diagram["diagram_type"],
+        "diagram_type": diagram.meta["diagram_type"],
         "nodes": flow_nodes,
         "edges": flow_edges,
     }
 
 
+def _build_subgraph_response(diagram: Diagram, ids: list[str], role: str) -> dict:
+    """Flow data for a subset of nodes, with child counts and subtree sizes for expansion."""
+    allowed = ROLE_LEVELS.get(role, ["public"])
+    adj = diagram.adjacency
+    hierarchy = diagram.hierarchy
+    flow_nodes = []
+    for node_id in ids:
+        flow_node = _flow_node(diagram.nodes[node_id], allowed)
+        flow_node["data"]["child_count"] = len(adj.children.get(node_id, []))
+        flow_node["data"]["subtree_size"] = hierarchy.size[node_id]
+        flow_nodes.append(flow_node)
+    return {
+        "diagram_type": diagram.meta["diagram_type"],
+        "nodes": flow_nodes,
+        "edges": [_flow_edge(e) for e in edges_within(adj, diagram.edges, ids)],
+    }
+
+
+def _build_changes_response(
+    diagram: Diagram,
+    since: int,
+    node_ids: set[str] | None,
+    edge_ids: set[str] | None,
+    role: str,
+) -> dict:
+    """Delta between `since` and the current version, filtered like the full diagram.
+
+    `reset: true` means the delta is unavailable and the client should re-fetch
+    GET /diagram/{type}.
+    """
+    response = {
+        "diagram_type": diagram.meta["diagram_type"],
+        "version": diagram.version,
+        "since": since,
+        "reset": node_ids is None,
+    }
+    if node_ids is None:
+        return response
+    allowed = ROLE_LEVELS.get(role, ["public"])
+    present = [i for i in sorted(edge_ids) if i in diagram.edges]
+    upserted_edges = [
+        diagram.edges[i] for i in present
+        if diagram.edges[i]["source_id"] in diagram.nodes
+        and diagram.edges[i]["target_id"] in diagram.nodes
+    ]
+    upserted_edge_ids = {e["id"] for e in upserted_edges}
+    response["nodes"] = {
+        "upserted": [_flow_node(diagram.nodes[i], allowed) for i in sorted(node_ids)
+                     if i in diagram.nodes],
+        "removed": [i for i in sorted(node_ids) if i not in diagram.nodes],
+    }
+    response["edges"] = {
+        "upserted": [_flow_edge(e) for e in upserted_edges],
+        "removed": [i for i in sorted(edge_ids) if i not in upserted_edge_ids],
+    }
+    return response
+
+
+def _encode_cursor(next_start: int, last_id: str) -> str:
+    raw = f"{next_start}:{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _resolve_cursor(diagram: Diagram, parent_id: str | None, cursor: str) -> int:
+    """Start index for a page: just after the cursor's last child if it still
+    exists (so inserts and deletes elsewhere don't skip or repeat children),
+    otherwise the offset recorded in the cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start, last_id = raw.split(":", 1)
+        start = int(start)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    position = diagram.adjacency.position(parent_id, last_id)
+    return position + 1 if position is not None else max(start, 0)
+
+
+# Serialized flow responses per (diagram_type, role): (version, body, etag).
+# There are only len(ROLE_LEVELS) variants per diagram, so each is built once
+# per diagram version and then served as bytes.
+_flow_cache: dict[tuple[str, str], tuple[int, bytes, str]] = {}
+
+
+def _cached_flow_response(diagram_type: str, role: str) -> tuple[int, bytes, str]:
+    """Runs on the I/O pool: it may load the diagram and serialise it."""
+    _check_type(diagram_type)
+    diagram = org_store.get(diagram_type)
+    key = (diagram_type, role)
+    cached = _flow_cache.get(key)
+    if cached is not None and cached[0] == diagram.version:
+        return cached
+    version = diagram.version
+    body = json_bytes(_build_flow_response(diagram, role))
+    etag = make_etag(body)
+    _flow_cache[key] = (version, body, etag)
+    return version, body, etag
+
+
 # ---------------------------------------------------------------------------
 # Pydantic models
 # ---------------------------------------------------------------------------
@@ -111,6 +228,73 @@ class EdgeCreate(BaseModel):
     edge_type: str = "hierarchy"
 
 
+class EdgeUpdate(BaseModel):
+    source_id: str | None = None
+    target_id: str | None = None
+    label: str | None = None
+    edge_type: str | None = None
+
+
+# Batch operations. Creates may carry a client-chosen id so later operations
+# in the same batch can refer to the new node or edge.
+
+class BatchCreateNode(NodeCreate):
+    op: Literal["create_node"]
+    id: str | None = None
+
+
+class BatchUpdateNode(NodeUpdate):
+    op: Literal["update_node"]
+    id: str
+
+
+class BatchDeleteNode(BaseModel):
+    op: Literal["delete_node"]
+    id: str
+
+
+class BatchCreateEdge(EdgeCreate):
+    op: Literal["create_edge"]
+    id: str | None = None
+
+
+class BatchUpdateEdge(EdgeUpdate):
+    op: Literal["update_edge"]
+    id: str
+
+
+class BatchDeleteEdge(BaseModel):
+    op: Literal["delete_edge"]
+    id: str
+
+
+BatchOperation = Annotated[
+    BatchCreateNode | BatchUpdateNode | BatchDeleteNode
+    | BatchCreateEdge | BatchUpdateEdge | BatchDeleteEdge,
+    Field(discriminator="op"),
+]
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPS)
+
+
+def _store_op(operation: BaseModel) -> dict:
+    """Translate a batch operation into a diagram store op record."""
+    fields = operation.model_dump(exclude={"op", "id"})
+    if isinstance(operation, BatchCreateNode):
+        return {"op": "add_node", "node": {"id": operation.id or str(uuid.uuid4()), **fields}}
+    if isinstance(operation, BatchCreateEdge):
+        return {"op": "add_edge", "edge": {"id": operation.id or str(uuid.uuid4()), **fields}}
+    if isinstance(operation, (BatchUpdateNode, BatchUpdateEdge)):
+        return {
+            "op": operation.op,
+            "id": operation.id,
+            "fields": operation.model_dump(exclude={"op", "id"}, exclude_none=True),
+        }
+    return {"op": operation.op, "id": operation.id}
+
+
 # ---------------------------------------------------------------------------
 # Read endpoints (all authenticated roles)
 # ---------------------------------------------------------------------------
@@ -119,10 +303,224 @@ class EdgeCreate(BaseModel):
 async def get_diagram(
     diagram_type: str,
     user: dict = Depends(get_current_user),
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """Return permission-filtered flow data.
+
+    Responds with a strong ETag and honours If-None-Match with 304. The
+    X-Diagram-Version header is the version to pass as `since` to
+    GET .../changes.
+    """
+    version, body, etag = await run_io(_cached_flow_response, diagram_type, user["role"])
+    return etag_response(
+        body, etag, if_none_match,
+        headers={"Vary": "Authorization", "X-Diagram-Version": str(version)},
+    )
+
+
+@router.get("/diagram/{diagram_type}/changes")
+async def get_changes(
+    diagram_type: str,
+    since: int,
+    wait: float = Query(0, ge=0, le=MAX_CHANGES_WAIT),
+    user: dict = Depends(get_current_user),
 ) -> dict:
-    """Return permission-filtered flow data."""
-    diagram = _read_diagram(diagram_type)
-    return _build_flow_response(diagram, user["role"])
+    """Return nodes and edges added, updated or removed after version `since`.
+
+    With `wait` > 0 this is a long-poll: if nothing has changed yet, the
+    request is held for up to `wait` seconds until a change arrives.
+    """
+    _check_type(diagram_type)
+    deadline = time.monotonic() + wait
+    while True:
+        diagram, node_ids, edge_ids = await run_io(org_store.changes_since, diagram_type, since)
+        if diagram.version != since or time.monotonic() >= deadline:
+            return _build_changes_response(diagram, since, node_ids, edge_ids, user["role"])
+        await asyncio.sleep(CHANGES_POLL_INTERVAL)
+
+
+@router.get("/diagram/{diagram_type}/changes/stream")
+async def stream_changes(
+    diagram_type: str,
+    since: int | None = None,
+    user: dict = Depends(get_current_user),
+    last_event_id: str | None = Header(default=None),
+) -> EventSourceResponse:
+    """Server-sent events carrying the same deltas as GET .../changes.
+
+    Each event's id is the diagram version, so a reconnecting EventSource
+    resumes from Last-Event-ID. Without `since` the stream starts at the
+    current version.
+    """
+    _check_type(diagram_type)
+    if since is None:
+        since = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    if since is None:
+        since = (await run_io(org_store.get, diagram_type)).version
+
+    async def event_generator():
+        version = since
+        while True:
+            diagram, node_ids, edge_ids = await run_io(
+                org_store.changes_since, diagram_type, version
+            )
+            if diagram.version != version:
+                body = _build_changes_response(diagram, version, node_ids, edge_ids, user["role"])
+                version = diagram.version
+                yield {
+                    "event": "reset" if body["reset"] else "changes",
+                    "id": str(version),
+                    "data": json.dumps(body),
+                }
+            await asyncio.sleep(CHANGES_POLL_INTERVAL)
+
+    return EventSourceResponse(event_generator())
+
+
+async def _read_node_diagram(diagram_type: str, node_id: str) -> Diagram:
+    diagram = await _read_diagram(diagram_type)
+    if node_id not in diagram.nodes:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return diagram
+
+
+@router.get("/diagram/{diagram_type}/subtree/{node_id}")
+async def get_subtree(
+    diagram_type: str,
+    node_id: str,
+    depth: int = Query(1, ge=0, le=50),
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Return a node plus its descendants down to `depth` levels.
+
+    Stops after MAX_SUBGRAPH_NODES nodes and sets `truncated`; each node's
+    `child_count` tells the canvas whether it can be expanded further.
+    """
+    diagram = await _read_node_diagram(diagram_type, node_id)
+    ids, truncated = descendants(diagram.adjacency, node_id, depth, MAX_SUBGRAPH_NODES)
+    return {
+        **_build_subgraph_response(diagram, ids, user["role"]),
+        "root_id": node_id,
+        "depth": depth,
+        "truncated": truncated,
+    }
+
+
+@router.get("/diagram/{diagram_type}/ancestors/{node_id}")
+async def get_ancestors(
+    diagram_type: str,
+    node_id: str,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Return a node plus every node above it up to the root, nearest first."""
+    diagram = await _read_node_diagram(diagram_type, node_id)
+    ids = ancestors(diagram.adjacency, node_id)
+    return _build_subgraph_response(diagram, ids, user["role"])
+
+
+@router.get("/diagram/{diagram_type}/children")
+async def get_children(
+    diagram_type: str,
+    parent_id: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Return one page of a node's children, or of the root nodes without `parent_id`.
+
+    Pass the returned `next_cursor` to fetch the next page; it is null on the
+    last page.
+    """
+    diagram = (
+        await _read_node_diagram(diagram_type, parent_id) if parent_id is not None
+        else await _read_diagram(diagram_type)
+    )
+    start = _resolve_cursor(diagram, parent_id, cursor) if cursor else 0
+    ids, next_start = children_page(diagram.adjacency, parent_id, start, limit)
+    return {
+        **_build_subgraph_response(diagram, ids, user["role"]),
+        "parent_id": parent_id,
+        "total": len(diagram.adjacency.child_ids(parent_id)),
+        "next_cursor": _encode_cursor(next_start, ids[-1]) if next_start is not None else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Search (all authenticated roles)
+# ---------------------------------------------------------------------------
+
+@router.get("/search")
+async def search_nodes(
+    q: str = Query(..., min_length=1, max_length=200),
+    diagram_type: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Find nodes by label or description across diagrams, best match first.
+
+    Prefix and misspelt queries match ("eng", "enginering"). Nodes above the
+    caller's role are excluded entirely rather than masked.
+    """
+    types = None
+    if diagram_type is not None:
+        _check_type(diagram_type)
+        types = {diagram_type}
+    allowed = ROLE_LEVELS.get(user["role"], ["public"])
+    results = await run_io(search_index.search, q, allowed, diagram_types=types, limit=limit)
+    return {"query": q, "results": results}
+
+
+# ---------------------------------------------------------------------------
+# Hierarchy queries (all authenticated roles)
+# ---------------------------------------------------------------------------
+
+@router.get("/hierarchy/{diagram_type}/relation")
+async def get_relation(
+    diagram_type: str,
+    node_id: str,
+    ancestor_id: str,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Answer "is `node_id` under `ancestor_id`?" in constant time."""
+    diagram = await _read_node_diagram(diagram_type, node_id)
+    if ancestor_id not in diagram.nodes:
+        raise HTTPException(status_code=404, detail="Node not found")
+    hierarchy = diagram.hierarchy
+    under = hierarchy.is_ancestor(ancestor_id, node_id)
+    return {
+        "node_id": node_id,
+        "ancestor_id": ancestor_id,
+        "is_under": under,
+        "distance": hierarchy.depth(node_id) - hierarchy.depth(ancestor_id) if under else None,
+    }
+
+
+@router.get("/hierarchy/{diagram_type}/{node_id}")
+async def get_hierarchy_info(
+    diagram_type: str,
+    node_id: str,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Return a node's depth, reporting chain (root first) and subtree size."""
+    diagram = await _read_node_diagram(diagram_type, node_id)
+    hierarchy = diagram.hierarchy
+    allowed = ROLE_LEVELS.get(user["role"], ["public"])
+    chain = []
+    for ancestor_id in hierarchy.path[node_id]:
+        data = _flow_node(diagram.nodes[ancestor_id], allowed)["data"]
+        chain.append({
+            "id": ancestor_id,
+            "label": data["label"],
+            "is_restricted": data["is_restricted"],
+        })
+    return {
+        "id": node_id,
+        "parent_id": hierarchy.parent[node_id],
+        "depth": hierarchy.depth(node_id),
+        "ancestors": chain,
+        "child_count": len(hierarchy.children[node_id]),
+        "subtree_size": hierarchy.size[node_id],
+    }
 
 
 @router.get("/nodes/{diagram_type}")
@@ -133,8 +531,8 @@ async def list_nodes(
     """Return raw nodes + edges (admin only)."""
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    diagram = _read_diagram(diagram_type)
-    return {"nodes": diagram["nodes"], "edges": diagram["edges"]}
+    diagram = await _read_diagram(diagram_type)
+    return {"nodes": list(diagram.nodes.values()), "edges": list(diagram.edges.values())}
 
 
 # ---------------------------------------------------------------------------
@@ -149,7 +547,6 @@ async def create_node(
 ) -> dict:
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    diagram = _read_diagram(diagram_type)
     new_node = {
         "id": str(uuid.uuid4()),
         "label": body.label,
@@ -158,8 +555,7 @@ async def create_node(
         "parent_id": body.parent_id,
         "permission_level": body.permission_level,
     }
-    diagram["nodes"].append(new_node)
-    _write_diagram(diagram_type, diagram)
+    await _apply(diagram_type, {"op": "add_node", "node": new_node})
     return new_node
 
 
@@ -172,40 +568,29 @@ async def update_node(
 ) -> dict:
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    diagram = _read_diagram(diagram_type)
-    for node in diagram["nodes"]:
-        if node["id"] == node_id:
-            if body.label is not None:
-                node["label"] = body.label
-            if body.description is not None:
-                node["description"] = body.description
-            if body.node_type is not None:
-                node["node_type"] = body.node_type
-            if body.parent_id is not None:
-                node["parent_id"] = body.parent_id
-            if body.permission_level is not None:
-                node["permission_level"] = body.permission_level
-            _write_diagram(diagram_type, diagram)
-            return node
-    raise HTTPException(status_code=404, detail="Node not found")
+    fields = body.model_dump(exclude_none=True)
+    [node] = await _apply(diagram_type, {"op": "update_node", "id": node_id, "fields": fields})
+    return node
 
 
 @router.delete("/nodes/{diagram_type}/{node_id}", status_code=204)
 async def delete_node(
     diagram_type: str,
     node_id: str,
+    cascade: bool = False,
     user: dict = Depends(get_current_user),
 ) -> None:
+    """Delete a node; with `cascade=true` its whole subtree goes with it."""
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    diagram = _read_diagram(diagram_type)
-    diagram["nodes"] = [n for n in diagram["nodes"] if n["id"] != node_id]
-    # Remove edges referencing this node
-    diagram["edges"] = [
-        e for e in diagram["edges"]
-        if e["source_id"] != node_id and e["target_id"] != node_id
-    ]
-    _write_diagram(diagram_type, diagram)
+    ids = [node_id]
+    if cascade:
+        diagram = await _read_diagram(diagram_type)
+        if node_id in diagram.nodes:
+            # Deepest first, so no op leaves children pointing at a deleted node
+            ids = [*reversed(diagram.hierarchy.descendants(node_id)), node_id]
+    # Edges referencing the nodes are removed with them
+    await _apply(diagram_type, *({"op": "delete_node", "id": i} for i in ids))
 
 
 # ---------------------------------------------------------------------------
@@ -220,7 +605,6 @@ async def create_edge(
 ) -> dict:
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    diagram = _read_diagram(diagram_type)
     new_edge = {
         "id": str(uuid.uuid4()),
         "source_id": body.source_id,
@@ -228,8 +612,7 @@ async def create_edge(
         "label": body.label,
         "edge_type": body.edge_type,
     }
-    diagram["edges"].append(new_edge)
-    _write_diagram(diagram_type, diagram)
+    await _apply(diagram_type, {"op": "add_edge", "edge": new_edge})
     return new_edge
 
 
@@ -241,6 +624,33 @@ async def delete_edge(
 ) -> None:
     if user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    diagram = _read_diagram(diagram_type)
-    diagram["edges"] = [e for e in diagram["edges"] if e["id"] != edge_id]
-    _write_diagram(diagram_type, diagram)
+    await _apply(diagram_type, {"op": "delete_edge", "id": edge_id})
+
+
+# ---------------------------------------------------------------------------
+# Batch mutations (admin only)
+# ---------------------------------------------------------------------------
+
+@router.post("/batch/{diagram_type}")
+async def apply_batch(
+    diagram_type: str,
+    body: BatchRequest,
+    user: dict = Depends(get_current_user),
+) -> dict:
+    """Apply an ordered list of node/edge operations in one write.
+
+    The whole batch is validated first (operations may refer to ids created
+    earlier in the batch) and applied all-or-nothing. If any operation is
+    invalid, responds 422 listing every failing operation by index and
+    leaves the diagram unchanged.
+    """
+    if user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    ops = [_store_op(operation) for operation in body.operations]
+    results = await _apply(diagram_type, *ops, validate=True)
+    return {
+        "diagram_type": diagram_type,
+        "applied": len(results),
+        "version": (await run_io(org_store.get, diagram_type)).version,
+        "results": results,
+    }
@@ -0,0 +1,180 @@
+"""Debounced file-system watcher.
+
+Watches directories for changes and reports bursts of changes as one set of
+paths once things have been quiet for `debounce` seconds. Uses inotify through
+`watchfiles` (installed with uvicorn[standard]) when available and falls back
+to polling file mtimes/sizes otherwise.
+
+`start_ingest_watcher()` wires a watcher over data/documents and data/org to
+incremental re-indexing jobs. With ORG_STORAGE=sqlite or journal, diagram
+edits never touch (or only eventually reach) data/org/*.json, so it also
+listens to the org store directly.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PathFilter = Callable[[Path], bool]
+ChangeCallback = Callable[[set[Path]], None]
+
+
+class DirectoryWatcher:
+    """Watch `dirs` (non-recursively) and call `on_change` with debounced path sets."""
+
+    def __init__(
+        self,
+        dirs: Iterable[Path],
+        on_change: ChangeCallback,
+        path_filter: PathFilter = lambda p: True,
+        debounce: float = 3.0,
+        poll_interval: float = 1.0,
+        force_polling: bool = False,
+    ) -> None:
+        self.dirs = [Path(d) for d in dirs]
+        self.on_change = on_change
+        self.path_filter = path_filter
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self.backend = "polling"
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "DirectoryWatcher":
+        try:
+            if self.force_polling:
+                raise ImportError
+            import watchfiles  # noqa: F401
+            self.backend = "inotify"
+            target = self._run_watchfiles
+        except ImportError:
+            self.backend = "polling"
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, name="dir-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s (%s backend)", ", ".join(map(str, self.dirs)), self.backend)
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _emit(self, paths: set[Path]) -> None:
+        paths = {p for p in paths if self.path_filter(p)}
+        if not paths:
+            return
+        try:
+            self.on_change(paths)
+        except Exception:
+            logger.exception("Watcher callback failed for %d path(s)", len(paths))
+
+    # -- inotify (watchfiles) -------------------------------------------------
+
+    def _run_watchfiles(self) -> None:
+        import watchfiles
+
+        quiet_ms = int(self.debounce * 1000)
+        existing = [d for d in self.dirs if d.exists()]
+        for changes in watchfiles.watch(
+            *existing,
+            watch_filter=lambda _change, path: self.path_filter(Path(path)),
+            step=quiet_ms,
+            debounce=quiet_ms * 10,
+            stop_event=self._stop,
+            recursive=False,
+            raise_interrupt=False,
+        ):
+            self._emit({Path(path) for _change, path in changes})
+
+    # -- polling fallback -----------------------------------------------------
+
+    def _snapshot(self) -> dict[Path, tuple[int, int]]:
+        snap: dict[Path, tuple[int, int]] = {}
+        for d in self.dirs:
+            if not d.exists():
+                continue
+            for p in d.iterdir():
+                if not self.path_filter(p):
+                    continue
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue  # removed between iterdir and stat
+                snap[p] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def _run_polling(self) -> None:
+        previous = self._snapshot()
+        pending: set[Path] = set()
+        last_change = 0.0
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = {p for p in previous.keys() | current.keys()
+                       if previous.get(p) != current.get(p)}
+            previous = current
+            if changed:
+                pending |= changed
+                last_change = time.monotonic()
+            elif pending and time.monotonic() - last_change >= self.debounce:
+                batch, pending = pending, set()
+                self._emit(batch)
+
+
+def start_ingest_watcher(debounce: float | None = None) -> DirectoryWatcher:
+    """Watch data/documents and data/org and re-index changed files.
+
+    Changes are queued as incremental ingest jobs. If another ingest job is
+    running, the paths are kept and retried after the debounce interval.
+    Diagram edits stored outside data/org/*.json are picked up from the org
+    store and re-indexed the debounce interval after the edit.
+    """
+    from src.config import DOCUMENTS_DIR, INGEST_WATCH_DEBOUNCE, ORG_DIR, ORG_STORAGE
+    from src.ingest import SUPPORTED_EXTENSIONS
+    from src.ingest_jobs import IngestBusyError, ingest_jobs
+    from src.org_store import org_store
+
+    delay = INGEST_WATCH_DEBOUNCE if debounce is None else debounce
+    pending: set[Path] = set()
+    lock = threading.Lock()
+
+    def _is_source(path: Path) -> bool:
+        if path.parent == ORG_DIR:
+            return path.suffix == ".json"
+        return path.parent == DOCUMENTS_DIR and path.suffix.lower() in SUPPORTED_EXTENSIONS
+
+    def _flush() -> None:
+        with lock:
+            batch = sorted(pending)
+            if not batch:
+                return
+            try:
+                ingest_jobs.submit_reindex(batch)
+            except IngestBusyError:
+                threading.Timer(delay, _flush).start()
+                return
+            pending.clear()
+        logger.info("Queued re-index of %d changed file(s)", len(batch))
+
+    def _on_change(paths: set[Path]) -> None:
+        with lock:
+            pending.update(paths)
+        _flush()
+
+    def _on_diagram_edit(diagram_type: str) -> None:
+        with lock:
+            pending.add(ORG_DIR / f"{diagram_type}.json")
+        threading.Timer(delay, _flush).start()
+
+    if ORG_STORAGE != "json":
+        org_store.add_listener(_on_diagram_edit)
+
+    return DirectoryWatcher(
+        [DOCUMENTS_DIR, ORG_DIR], _on_change, path_filter=_is_source, debounce=delay
+    ).start()
+
@@ -7,15 +7,37 @@ Slow tests (live Groq call) are opt-in: pytest -m slow
 Run with: cd backend && pytest tests/test_bpmn.py -v
 """
 
+import json
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
 import pytest
 import httpx
+from fastapi import HTTPException
 
 from src.bpmn.models import (
     Actor, Activity, BPMNEvent, Gateway, ProcessFlow, SequenceFlow,
 )
+from src.bpmn import batch as batch_module
+from src.bpmn import parser as parser_module
+from src.bpmn.batch import BatchJobManager, BatchStore, RateLimiter
+from src.bpmn.cache import ParseCache, parse_cache_key
 from src.bpmn.generator import generate_bpmn_xml
+from src.bpmn.layout import layered_layout, layout_process
+from src.bpmn.longdoc import merge_flows, parse_long_text, split_sections
+from src.bpmn.routing import EdgeRouter, GridIndex
+from src.bpmn.rules import parse_structured
+from src.bpmn.stream import IncrementalFlowParser, StreamAborted
+from src.bpmn.templates import TemplateLibrary
+from src.bpmn.tiers import TierStats, is_simple, model_key
+from src.bpmn.validator import (
+    UnrepairableFlow, extract_json, repair_flow, repair_process, validate_flow,
+)
+from src.config import LLM_MODEL, ROUTER_MODEL
 
 BASE = "http://localhost:8000"
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "data" / "templates"
 
 SIMPLE_TEXT = (
     "Actors: Customer, Agent.\n"
@@ -174,6 +196,846 @@ class TestBPMNGenerator:
         assert xml.count("bpmn:lane") >= 5
 
 
+# ---------------------------------------------------------------------------
+# Layout unit tests (no server)
+# ---------------------------------------------------------------------------
+
+def _crossings(pf: ProcessFlow, columns: dict[str, int], rows: dict[str, int]) -> int:
+    """Crossing pairs among flows between adjacent columns of a single-lane process."""
+    spans = [
+        (columns[f.source_id], rows.get(f.source_id, 0), rows.get(f.target_id, 0))
+        for f in pf.sequence_flows if columns[f.target_id] == columns[f.source_id] + 1
+    ]
+    return sum(
+        1 for i, (col, a, b) in enumerate(spans) for other, c, d in spans[i + 1:]
+        if col == other and (a - c) * (b - d) < 0
+    )
+
+
+def _fan_out_flow() -> ProcessFlow:
+    """Gateway → A, B; A → D and B → C, declared so that the naive order crosses."""
+    acts = [Activity(id=f"act_{n}", name=n, lane_id="l") for n in "ABCD"]
+    pairs = [("evt_start", "gw"), ("gw", "act_A"), ("gw", "act_B"), ("act_A", "act_D"),
+             ("act_B", "act_C"), ("act_C", "evt_end"), ("act_D", "evt_end")]
+    return ProcessFlow(
+        name="Fan out",
+        actors=[Actor(id="l", name="Lane")],
+        events=[
+            BPMNEvent(id="evt_start", name="Start", event_type="start", lane_id="l"),
+            BPMNEvent(id="evt_end", name="End", event_type="end", lane_id="l"),
+        ],
+        activities=acts,
+        gateways=[Gateway(id="gw", name="Which?", lane_id="l")],
+        sequence_flows=[
+            SequenceFlow(id=f"sf_{i}", source_id=s, target_id=t) for i, (s, t) in enumerate(pairs)
+        ],
+    )
+
+
+class TestLayout:
+    def test_bfs_is_the_default_and_unchanged(self, sample_flow):
+        layout = layout_process(sample_flow)
+        assert layout.columns == {"evt_start": 0, "act_1": 1, "gw_1": 2, "act_2": 3, "evt_end": 4}
+        assert layout.rows == {}
+
+    def test_layered_separates_elements_sharing_a_cell(self):
+        pf = _fan_out_flow()
+        layout = layered_layout(pf)
+        cells = {(layout.columns[i], layout.rows[i]) for i in layout.columns}
+        assert len(cells) == len(layout.columns)
+        assert layout.lane_rows == {"l": 2}
+
+    def test_layered_reduces_crossings(self):
+        pf = _fan_out_flow()
+        naive = layered_layout(pf, sweeps=0)
+        assert _crossings(pf, naive.columns, naive.rows) == 1
+        layout = layered_layout(pf)
+        assert _crossings(pf, layout.columns, layout.rows) == 0
+
+    def test_layered_handles_loop_backs(self, sample_flow):
+        sample_flow.sequence_flows.append(
+            SequenceFlow(id="sf_5", source_id="gw_1", target_id="act_1", condition_label="No")
+        )
+        layout = layered_layout(sample_flow)
+        assert layout.columns["act_1"] < layout.columns["gw_1"] < layout.columns["act_2"]
+
+    def test_layered_lays_out_2000_elements_quickly(self):
+        n = 2000
+        pf = ProcessFlow(
+            name="Big",
+            actors=[Actor(id=f"a{i}", name=f"Lane {i}") for i in range(5)],
+            events=[BPMNEvent(id="evt_start", name="Start", event_type="start", lane_id="a0")],
+            activities=[Activity(id=f"t{i}", name=f"T{i}", lane_id=f"a{i % 5}") for i in range(n)],
+            sequence_flows=[SequenceFlow(id="sf_0", source_id="evt_start", target_id="t0")] + [
+                SequenceFlow(id=f"sf_{i}", source_id=f"t{(i * 7) // 8}", target_id=f"t{i}")
+                for i in range(1, n)
+            ],
+        )
+        start = time.perf_counter()
+        layout = layered_layout(pf)
+        assert time.perf_counter() - start < 1.0
+        assert len(layout.columns) == n + 1
+
+    def test_generator_accepts_layered_layout(self, sample_flow):
+        xml = generate_bpmn_xml(sample_flow, layout="layered")
+        assert "bpmndi:BPMNShape" in xml
+        with pytest.raises(ValueError):
+            generate_bpmn_xml(sample_flow, layout="circular")
+
+
+# ---------------------------------------------------------------------------
+# Edge routing unit tests (no server)
+# ---------------------------------------------------------------------------
+
+_DI = {
+    "bpmn": "http://www.omg.org/spec/BPMN/20100524/MODEL",
+    "bpmndi": "http://www.omg.org/spec/BPMN/20100524/DI",
+    "dc": "http://www.omg.org/spec/DD/20100524/DC",
+    "di": "http://www.omg.org/spec/DD/20100524/DI",
+}
+
+
+def _geometry(xml: str):
+    """(shape bounds by element id, flow endpoints by id, waypoints and label by flow id)."""
+    root = ET.fromstring(xml.split("\n", 1)[1])
+    shapes = {}
+    for sh in root.iter(f"{{{_DI['bpmndi']}}}BPMNShape"):
+        if sh.get("isHorizontal"):
+            continue  # pool and lanes
+        b = sh.find("dc:Bounds", _DI)
+        x, y, w, h = (int(b.get(k)) for k in ("x", "y", "width", "height"))
+        shapes[sh.get("bpmnElement")] = (x, y, x + w, y + h)
+    flows = {
+        f.get("id"): (f.get("sourceRef"), f.get("targetRef"))
+        for f in root.iter(f"{{{_DI['bpmn']}}}sequenceFlow")
+    }
+    edges = {}
+    for edge in root.iter(f"{{{_DI['bpmndi']}}}BPMNEdge"):
+        points = [(int(w.get("x")), int(w.get("y"))) for w in edge.findall("di:waypoint", _DI)]
+        b = edge.find("bpmndi:BPMNLabel/dc:Bounds", _DI)
+        label = None
+        if b is not None:
+            x, y, w, h = (int(b.get(k)) for k in ("x", "y", "width", "height"))
+            label = (x, y, x + w, y + h)
+        edges[edge.get("bpmnElement")] = (points, label)
+    return shapes, flows, edges
+
+
+def _overlaps(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class TestEdgeRouting:
+    @pytest.fixture
+    def telco(self):
+        text = (TEMPLATES_DIR / "telco_case_management.txt").read_text(encoding="utf-8")
+        return _geometry(generate_bpmn_xml(parse_structured(text), layout="layered"))
+
+    def test_flows_are_orthogonal_and_avoid_shapes(self, telco):
+        shapes, flows, edges = telco
+        for flow_id, (points, _label) in edges.items():
+            source, target = flows[flow_id]
+            assert len(points) >= 2
+            for p, q in zip(points, points[1:]):
+                assert p[0] == q[0] or p[1] == q[1], flow_id
+                segment = (min(p[0], q[0]), min(p[1], q[1]),
+                           max(p[0], q[0]) + 1, max(p[1], q[1]) + 1)
+                hit = [k for k, b in shapes.items() if k not in (source, target)
+                       and _overlaps(segment, b)]
+                assert hit == [], flow_id
+
+    def test_loop_back_goes_around(self, telco):
+        shapes, flows, edges = telco
+        flow_id = next(f for f, (s, t) in flows.items() if shapes[t][0] < shapes[s][0])
+        points, _ = edges[flow_id]
+        assert len(points) >= 4
+        assert points[0][0] == shapes[flows[flow_id][0]][2]   # leaves the source's right edge
+        assert points[-1][0] == shapes[flows[flow_id][1]][0]  # enters the target's left edge
+
+    def test_labels_avoid_shapes_and_each_other(self, telco):
+        shapes, _flows, edges = telco
+        labels = [label for _points, label in edges.values() if label]
+        assert labels
+        for i, label in enumerate(labels):
+            assert not any(_overlaps(label, b) for b in shapes.values())
+            assert not any(_overlaps(label, other) for other in labels[i + 1:])
+
+    def test_channel_nudges_never_cut_a_shape(self):
+        blocker = (127, 100, 160, 140)  # clear of the channel centre (x=120) only
+        router = EdgeRouter(
+            {"a": (0, 0, 40, 40), "b": (300, 200, 340, 240), "block": blocker}, 200, []
+        )
+        for _ in range(8):  # enough flows to use every nudge offset
+            points = router.route("a", "b")
+            for p, q in zip(points, points[1:]):
+                segment = (min(p[0], q[0]), min(p[1], q[1]),
+                           max(p[0], q[0]) + 1, max(p[1], q[1]) + 1)
+                assert not _overlaps(segment, blocker), points
+
+    def test_grid_index(self):
+        index = GridIndex(cell=50)
+        index.insert("a", (0, 0, 40, 40))
+        index.insert("b", (180, 180, 260, 260))
+        assert index.hits((30, 30, 35, 35))
+        assert not index.hits((45, 45, 170, 170))
+        assert index.hits((100, 200, 400, 201))
+        assert not index.hits((100, 200, 400, 201), ignore=("b",))
+
+
+# ---------------------------------------------------------------------------
+# Rule-based parser unit tests (no server, no LLM)
+# ---------------------------------------------------------------------------
+
+LEAVE_TEXT = (
+    "Leave request\n"
+    "Actors:\n- Employee\n- Manager\n- HR\n"
+    "1. Employee: Submit leave request\n"
+    "2. Manager: Review the request\n"
+    "3. If approved then step 5; otherwise step 4\n"
+    "4. Employee: Revise the request. Go to step 2.\n"
+    "5. HR: Record the leave in the system\n"
+)
+
+
+def _flows(pf: ProcessFlow) -> set[tuple[str, str, str | None]]:
+    names = {e.id: e.name for e in [*pf.events, *pf.activities, *pf.gateways]}
+    return {(names[f.source_id], names[f.target_id], f.condition_label) for f in pf.sequence_flows}
+
+
+class TestRuleParser:
+    def test_telco_template_parses_locally(self):
+        text = (TEMPLATES_DIR / "telco_case_management.txt").read_text(encoding="utf-8")
+        start = time.perf_counter()
+        pf = parse_structured(text)
+        assert time.perf_counter() - start < 0.05
+        assert pf.name == "Telco Store Case Management Process"
+        assert [a.name for a in pf.actors][:2] == ["Customer", "Store Frontliner"]
+        assert [g.name for g in pf.gateways][:2] == [
+            "Can it be resolved on-the-spot?",
+            "Does it require escalation to the Backend Support Team?",
+        ]
+        # "Return to step 6" loops back; "Frontliner" resolves to Store Frontliner
+        flows = _flows(pf)
+        assert ("Case is reopened and re-escalated to the Backend Support…",
+                "Receives the escalated case", None) in flows
+        resolve = next(a for a in pf.activities if a.name == "Resolves the issue immediately")
+        assert resolve.lane_id == pf.actors[1].id
+        assert "bpmn:definitions" in generate_bpmn_xml(pf)
+
+    def test_steps_that_are_branches_join_the_previous_decision(self):
+        pf = parse_structured(SIMPLE_TEXT)
+        assert len(pf.gateways) == 1
+        flows = _flows(pf)
+        assert ("Issue is simple?", "Resolves on the spot", "Issue is simple") in flows
+        assert ("Issue is simple?", "Creates a case", "Otherwise") in flows
+        assert ("Confirms", "End", None) in flows  # "Done."
+        assert len([e for e in pf.events if e.event_type == "start"]) == 1
+
+    def test_inline_jumps(self):
+        pf = parse_structured(LEAVE_TEXT)
+        flows = _flows(pf)
+        assert ("Approved?", "Record the leave in the system", "Approved") in flows
+        assert ("Approved?", "Revise the request", "Otherwise") in flows
+        assert ("Revise the request", "Review the request", None) in flows
+        assert ("Record the leave in the system", "End", None) in flows
+
+    @pytest.mark.parametrize("text", [
+        "We get a call, someone handles it and then we close the ticket.",
+        "Actors: Customer\n1. Customer calls.",  # a single step
+        "Actors: Customer, Agent\n1. Customer calls.\n2. Stranger answers.",  # unknown actor
+        LEAVE_TEXT.replace("step 4\n", "step 9\n"),  # missing step
+        LEAVE_TEXT.replace("5. HR", "6. HR"),  # numbering gap
+        "Actors: Agent\n1. Agent: Done.\n2. Otherwise: Done.",  # only directives
+        "Actors:\n- (HR)\n1. HR: Files it.\n2. HR: Closes it.",  # no named actor
+    ])
+    def test_unstructured_text_falls_back(self, text):
+        assert parse_structured(text) is None
+
+    def test_parenthetical_only_actor_is_skipped(self):
+        pf = parse_structured("Actors:\n- (HR)\n- Agent\n1. Agent: Files it.\n2. Agent: Closes it.")
+        assert [a.name for a in pf.actors] == ["Agent"]
+
+
+# ---------------------------------------------------------------------------
+# Flow validator unit tests (no server)
+# ---------------------------------------------------------------------------
+
+class TestFlowValidator:
+    def test_sound_flow_is_left_alone(self, sample_flow):
+        assert validate_flow(sample_flow) == []
+        repaired, repairs = repair_flow(sample_flow)
+        assert repairs == []
+        assert repaired == sample_flow
+
+    def test_repairs_broken_llm_output(self):
+        data = {
+            "name": "Claims",
+            "actors": [{"id": "actor_1", "name": "Clerk"}],
+            "events": [{"id": "evt_start", "name": "Start", "event_type": "start",
+                        "lane_id": "actor_1"}],
+            "activities": [
+                {"id": "act_1", "name": "Check claim", "lane_id": "actor_1"},
+                {"name": "Pay claim", "lane_id": "actor_9", "activity_type": "task"},
+                {"id": "act_1", "name": "Reject claim", "lane_id": "actor_1"},
+            ],
+            "gateways": [{"id": "gw_1", "name": "Valid?", "lane_id": "actor_1"}],
+            "sequence_flows": [
+                {"id": "sf_1", "source_id": "evt_start", "target_id": "act_1"},
+                {"id": "sf_2", "source_id": "act_1", "target_id": "gw_1"},
+                {"id": "sf_3", "source_id": "gw_1", "target_id": "act_2"},
+                {"id": "sf_4", "source_id": "gw_1", "target_id": "act_3"},
+                {"id": "sf_5", "source_id": "act_3", "target_id": "evt_missing"},
+            ],
+        }
+        pf, repairs = repair_process(data)
+        assert validate_flow(pf) == []
+        assert any("dropped dangling flow 'sf_5'" in r for r in repairs)
+        assert {a.id for a in pf.activities} == {"act_1", "act_2", "act_3"}
+        assert next(a for a in pf.activities if a.id == "act_2").lane_id == "actor_1"
+        flows = _flows(pf)
+        assert ("Valid?", "Pay claim", "Yes") in flows
+        assert ("Valid?", "Reject claim", "No") in flows
+        assert ("Pay claim", "End", None) in flows
+        assert ("Reject claim", "End", None) in flows
+
+    def test_unreached_step_is_spliced_before_the_end(self, sample_flow):
+        sample_flow.activities.append(
+            Activity(id="act_3", name="Archive", activity_type="manualTask", lane_id="actor_2")
+        )
+        pf, repairs = repair_flow(sample_flow)
+        assert validate_flow(pf) == []
+        flows = _flows(pf)
+        assert ("Process Request", "Archive", None) in flows
+        assert ("Archive", "End", None) in flows
+        assert ("Process Request", "End", None) not in flows
+
+    def test_missing_start_event_is_added(self, sample_flow):
+        sample_flow.events = [e for e in sample_flow.events if e.event_type != "start"]
+        sample_flow.sequence_flows = sample_flow.sequence_flows[1:]
+        pf, _ = repair_flow(sample_flow)
+        assert validate_flow(pf) == []
+        assert ("Start", "Submit Request", None) in _flows(pf)
+
+    def test_extract_json_tolerates_fences_and_prose(self):
+        assert extract_json('```json\n{"a": 1}\n```') == {"a": 1}
+        assert extract_json('Here it is: {"a": {"b": 2}} hope that helps') == {"a": {"b": 2}}
+        with pytest.raises(ValueError):
+            extract_json("no json here")
+
+    @pytest.mark.parametrize("data", [
+        [],
+        {"actors": [], "activities": []},
+        {"activities": "Check claim"},
+        {"activities": [{"id": "act_1", "name": "Check claim", "description": 5}]},
+    ])
+    def test_unrepairable_output_escalates(self, data):
+        with pytest.raises(UnrepairableFlow):
+            repair_process(data)
+
+
+# ---------------------------------------------------------------------------
+# Long-document parsing unit tests (no server, no LLM)
+# ---------------------------------------------------------------------------
+
+def _phase(n: int) -> str:
+    return (
+        f"## Phase {n}: Review round {n}\n"
+        "Actors: Analyst, Quality Lead\n"
+        f"1. Analyst: Prepare the review package for round {n} with all evidence\n"
+        f"2. Quality Lead: Inspect the package for round {n} against the checklist\n"
+        f"3. Analyst: File the signed-off package for round {n} in the archive\n"
+    )
+
+
+class TestLongDocument:
+    def test_split_at_headings_folding_the_title(self):
+        doc = "# Review SOP\n\n" + "\n".join(_phase(n) for n in (1, 2, 3))
+        sections = split_sections(doc)
+        assert len(sections) == 3
+        assert sections[0].startswith("# Review SOP")
+        assert all(parse_structured(s) is not None for s in sections)
+
+    def test_oversized_sections_split_at_paragraphs(self):
+        paragraph = "The analyst checks every record. " * 10
+        sections = split_sections("\n\n".join([paragraph] * 10), max_chars=1000)
+        assert len(sections) > 1
+        assert all(len(s) <= 1000 for s in sections)
+        assert all(s.startswith("The analyst") for s in sections)
+
+    def test_merge_unifies_actors_and_stitches_sections(self):
+        first = parse_structured(_phase(1))
+        second = parse_structured(_phase(2).replace("Quality Lead", "the quality lead"))
+        pf = merge_flows([first, second], "Review")
+        assert [a.name for a in pf.actors] == ["Analyst", "Quality Lead"]
+        assert [e.event_type for e in pf.events] == ["start", "end"]
+        assert validate_flow(pf) == []
+        assert ("File the signed-off package for round 1 in the archive",
+                "Prepare the review package for round 2 with all evidence", None) in _flows(pf)
+        assert all(a.id.startswith(("s1_", "s2_")) for a in pf.activities)
+
+    def test_merge_keeps_rejection_ends_terminal(self):
+        # The reject branch is listed after the approval path but must still end the process
+        first = ProcessFlow(
+            name="Intake",
+            actors=[Actor(id="actor_1", name="Analyst")],
+            events=[
+                BPMNEvent(id="start_1", name="Start", event_type="start", lane_id="actor_1"),
+                BPMNEvent(id="end_1", name="Done", event_type="end", lane_id="actor_1"),
+                BPMNEvent(id="end_2", name="Rejected", event_type="end", lane_id="actor_1"),
+            ],
+            activities=[
+                Activity(id="act_1", name="Check request", lane_id="actor_1"),
+                Activity(id="act_2", name="Record request", lane_id="actor_1"),
+                Activity(id="act_3", name="Notify requester", lane_id="actor_1"),
+            ],
+            gateways=[Gateway(id="gw_1", name="Complete?", lane_id="actor_1")],
+            sequence_flows=[
+                SequenceFlow(id="sf_1", source_id="start_1", target_id="act_1"),
+                SequenceFlow(id="sf_2", source_id="act_1", target_id="gw_1"),
+                SequenceFlow(id="sf_3", source_id="gw_1", target_id="act_2"),
+                SequenceFlow(id="sf_4", source_id="act_2", target_id="end_1"),
+                SequenceFlow(id="sf_5", source_id="gw_1", target_id="act_3",
+                             condition_label="No"),
+                SequenceFlow(id="sf_6", source_id="act_3", target_id="end_2"),
+            ],
+        )
+        pf = merge_flows([first, parse_structured(_phase(2))], "Intake")
+        flows = _flows(pf)
+        assert validate_flow(pf) == []
+        assert ("Notify requester", "Rejected", None) in flows
+        assert ("Record request",
+                "Prepare the review package for round 2 with all evidence", None) in flows
+        assert [e.name for e in pf.events if e.event_type == "end"] == ["Rejected", "End"]
+
+    def test_sections_parse_concurrently(self):
+        def slow_parse(text: str) -> ProcessFlow:
+            time.sleep(0.2)
+            return parse_structured(text)
+
+        doc = "\n".join(_phase(n) for n in range(1, 5))
+        start = time.perf_counter()
+        pf, sections = parse_long_text(doc, parse=slow_parse, max_workers=4)
+        assert sections == 4
+        assert time.perf_counter() - start < 0.6  # ~ one section, not four
+        assert len(pf.activities) == 12
+
+    def test_failed_section_names_the_section(self):
+        def parse(text: str) -> ProcessFlow:
+            if "Phase 2" in text:
+                raise HTTPException(status_code=422, detail="Could not parse")
+            return parse_structured(text)
+
+        with pytest.raises(HTTPException) as exc:
+            parse_long_text("\n".join(_phase(n) for n in (1, 2, 3)), parse=parse)
+        assert exc.value.status_code == 422
+        assert exc.value.detail.startswith("Section 2 of 3")
+
+    def test_unexpected_section_error_is_reported_with_its_section(self):
+        def parse(text: str) -> ProcessFlow:
+            if "Phase 3" in text:
+                raise IndexError("list index out of range")
+            return parse_structured(text)
+
+        with pytest.raises(HTTPException) as exc:
+            parse_long_text("\n".join(_phase(n) for n in (1, 2, 3)), parse=parse)
+        assert exc.value.status_code == 500
+        assert exc.value.detail == "Section 3 of 3: Internal error (IndexError)"
+
+    def test_failure_does_not_wait_for_sections_in_flight(self):
+        def parse(text: str) -> ProcessFlow:
+            if "Phase 1" in text:
+                raise HTTPException(status_code=422, detail="Could not parse")
+            time.sleep(1.0)
+            return parse_structured(text)
+
+        start = time.perf_counter()
+        with pytest.raises(HTTPException):
+            parse_long_text("\n".join(_phase(n) for n in (1, 2, 3)), parse=parse)
+        assert time.perf_counter() - start < 0.5
+
+
+# ---------------------------------------------------------------------------
+# Batch job unit tests (no server, no LLM)
+# ---------------------------------------------------------------------------
+
+def _wait(job, timeout: float = 10.0) -> None:
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.02)
+    assert job.finished
+
+
+class TestBatchJobs:
+    @pytest.fixture
+    def manager(self, tmp_path):
+        return BatchJobManager(BatchStore(tmp_path / "batches.sqlite3"), RateLimiter(0))
+
+    def test_items_stream_results_and_persist(self, manager):
+        items = [{"id": f"phase-{n}", "text": _phase(n)} for n in (1, 2, 3)]
+        job = manager.submit(items, concurrency=2, created_by="manager")
+        _wait(job)
+        assert job.status == "succeeded"
+        assert job.result == {"pending": 0, "succeeded": 3, "failed": 0, "total": 3}
+        streamed = [e for e in job.events if e["event"] == "item"]
+        assert sorted(e["id"] for e in streamed) == ["phase-1", "phase-2", "phase-3"]
+        assert all(e["source"] == "rules" and e["status"] == "succeeded" for e in streamed)
+        assert not any("bpmn_xml" in e or "process_json" in e for e in streamed)
+        stored = manager.store.items(job.id)
+        assert [i["id"] for i in stored] == ["phase-1", "phase-2", "phase-3"]
+        assert stored[0]["process_json"]["actors"][0]["name"] == "Analyst"
+
+    def test_failed_items_do_not_fail_the_batch(self, manager, monkeypatch):
+        calls = []
+
+        def flaky(text, throttle):
+            throttle()
+            calls.append(text)
+            if len(calls) == 1:
+                raise HTTPException(status_code=503, detail="Rate limited")
+            raise HTTPException(status_code=422, detail="Could not parse")
+
+        monkeypatch.setattr(batch_module, "parse_process_text", flaky)
+        monkeypatch.setattr(batch_module, "RETRY_BACKOFF_S", 0.01)
+        items = [{"id": "free-form", "text": "someone handles the request somehow"},
+                 {"id": "structured", "text": _phase(1)}]
+        job = manager.submit(items, concurrency=1, created_by="manager")
+        _wait(job)
+        assert job.status == "succeeded"
+        failed = manager.store.items(job.id, status="failed")
+        assert [(i["id"], i["attempts"], i["error"]) for i in failed] == [
+            ("free-form", 2, "Could not parse")  # 503 retried, 422 final
+        ]
+        assert job.result["succeeded"] == 1
+
+    def test_unfinished_batches_resume_without_reparsing(self, tmp_path):
+        store = BatchStore(tmp_path / "batches.sqlite3")
+        store.create("crashed", [{"id": str(n), "text": _phase(n)} for n in (1, 2)], 2, "admin")
+        store.set_status("crashed", "running")
+        store.save_result("crashed", 0, {"status": "failed", "attempts": 1, "error": "kept"})
+
+        manager = BatchJobManager(store, RateLimiter(0))
+        [job] = manager.resume()
+        _wait(job)
+        assert job.id == "crashed"
+        assert [e["id"] for e in job.events if e["event"] == "item"] == ["2"]
+        assert store.counts("crashed") == {"pending": 0, "succeeded": 1, "failed": 1, "total": 2}
+        assert store.unfinished() == []
+
+    def test_finished_batches_are_served_after_leaving_history(self, tmp_path):
+        manager = BatchJobManager(BatchStore(tmp_path / "batches.sqlite3"), RateLimiter(0),
+                                  history_size=1)
+        old = manager.submit([{"id": "a", "text": _phase(1)}], 1, "manager")
+        _wait(old)
+        _wait(manager.submit([{"id": "b", "text": _phase(2)}], 1, "manager"))
+        assert manager.get(old.id) is None
+
+        batch = manager.describe(old.id)
+        assert batch["status"] == "succeeded"
+        assert batch["result"] == {"pending": 0, "succeeded": 1, "failed": 0, "total": 1}
+        assert [i["id"] for i in manager.store.items(old.id)] == ["a"]
+        events = manager.stored_events(old.id)
+        assert [(e["seq"], e["event"]) for e in events] == [(1, "item"), (2, "succeeded")]
+        assert events[0]["status"] == "succeeded" and "bpmn_xml" not in events[0]
+        assert manager.stored_events(old.id, since=1)[0]["event"] == "succeeded"
+        assert manager.describe("missing") is None
+
+    def test_every_llm_request_is_rate_limited(self, manager, sample_flow, monkeypatch):
+        responses = iter(['{"name": "x"}', sample_flow.model_dump_json()])  # small tier fails
+        acquired = []
+        monkeypatch.setattr(manager.limiter, "acquire", lambda: acquired.append(1))
+
+        class FakeLLM:
+            def invoke(self, messages):
+                return type("Response", (), {"content": next(responses)})()
+
+        monkeypatch.setattr(parser_module, "_llm", lambda model=LLM_MODEL: FakeLLM())
+        monkeypatch.setattr(parser_module, "tier_stats", TierStats())
+        text = "A clerk checks the request and then files it."
+        job = manager.submit([{"id": "free", "text": text}], 1, "manager")
+        _wait(job)
+        assert job.result["succeeded"] == 1
+        assert len(acquired) == 2
+
+    def test_rate_limiter_spaces_requests(self):
+        limiter = RateLimiter(per_minute=1200)  # one every 50 ms
+        start = time.perf_counter()
+        for _ in range(4):
+            limiter.acquire()
+        assert time.perf_counter() - start >= 0.14
+        limiter.backoff(0.1)
+        assert limiter.acquire() >= 0.05
+
+
+# ---------------------------------------------------------------------------
+# Streaming parse unit tests (no LLM)
+# ---------------------------------------------------------------------------
+
+class _FakeStreamingLLM:
+    """Streams `text` in small chunks; records how much was consumed."""
+
+    def __init__(self, text: str, chunk: int = 7) -> None:
+        self.chunks = [text[i:i + chunk] for i in range(0, len(text), chunk)]
+        self.sent = 0
+        self.closed = False
+
+    def stream(self, messages):
+        try:
+            for piece in self.chunks:
+                self.sent += 1
+                yield type("Chunk", (), {"content": piece})()
+        finally:
+            self.closed = True
+
+
+class TestIncrementalFlowParser:
+    def _feed(self, text: str, chunk: int = 5) -> list[tuple[str, dict]]:
+        parser = IncrementalFlowParser()
+        items = []
+        for i in range(0, len(text), chunk):
+            items += parser.feed(text[i:i + chunk])
+        return items
+
+    def test_items_emitted_in_order_as_they_complete(self, sample_flow):
+        raw = sample_flow.model_dump_json(indent=2)
+        items = self._feed(raw)
+        assert [kind for kind, _ in items] == (
+            ["actor"] * 2 + ["event"] * 2 + ["activity"] * 2 + ["gateway"] + ["flow"] * 4
+        )
+        assert items[0][1]["name"] == "Customer"
+        assert items[-1][1]["target_id"] == "evt_end"
+
+    def test_items_are_emitted_before_the_response_ends(self, sample_flow):
+        raw = sample_flow.model_dump_json()
+        parser = IncrementalFlowParser()
+        cut = raw.index('"events"')
+        assert [kind for kind, _ in parser.feed(raw[:cut])] == ["actor", "actor"]
+
+    def test_strings_containing_brackets_do_not_confuse_nesting(self, sample_flow):
+        flow = sample_flow.model_copy(update={"actors": [
+            Actor(id="actor_1", name='Customer {"vip"} [tier 1]'),
+            Actor(id="actor_2", name="Agent"),
+        ]})
+        items = self._feed(flow.model_dump_json())
+        assert items[0][1]["name"] == 'Customer {"vip"} [tier 1]'
+        assert len(items) == 11
+
+    def test_invalid_items_are_skipped_not_fatal(self):
+        raw = '{"actors": [{"id": "a1"}, {"id": "a2", "name": "Clerk"}], "activities": [{}]}'
+        assert self._feed(raw) == [("actor", {"id": "a2", "name": "Clerk", "description": ""})]
+
+    @pytest.mark.parametrize("raw", [
+        "Sure! Here is the process:",
+        '{"name": "x", "actors": {"id": "a1"}}',
+        '{"actors": [{"id": "a1", "name": "A"}}',
+        '{"actors": [{"id": "a1", "name": "A"}], "activities": []',
+    ])
+    def test_aborts_when_output_cannot_validate(self, raw):
+        with pytest.raises(StreamAborted):
+            self._feed(raw)
+
+    def test_aborted_stream_stops_generation(self, monkeypatch):
+        llm = _FakeStreamingLLM('{"name": "x", "actors": "Clerk", ' + " " * 500 + "}")
+        monkeypatch.setattr(parser_module, "_llm", lambda: llm)
+        with pytest.raises(HTTPException) as exc:
+            list(parser_module.stream_process_text("irrelevant"))
+        assert exc.value.status_code == 422
+        assert llm.closed and llm.sent < len(llm.chunks)
+
+    def test_stream_ends_with_repaired_process(self, sample_flow, monkeypatch):
+        broken = sample_flow.model_copy(update={"sequence_flows": sample_flow.sequence_flows[:3]})
+        llm = _FakeStreamingLLM(broken.model_dump_json())
+        monkeypatch.setattr(parser_module, "_llm", lambda: llm)
+        *items, (kind, process) = parser_module.stream_process_text("irrelevant")
+        assert len(items) == 10 and kind == "process"
+        ends = {e.id for e in process.events if e.event_type == "end"}
+        assert ("act_2", True) in {(sf.source_id, sf.target_id in ends)
+                                   for sf in process.sequence_flows}
+
+    def test_client_disconnect_closes_the_llm_stream(self, sample_flow, monkeypatch):
+        import asyncio
+
+        from src.routers import bpmn as bpmn_router
+
+        llm = _FakeStreamingLLM(sample_flow.model_dump_json())
+        monkeypatch.setattr(parser_module, "_llm", lambda: llm)
+        monkeypatch.setattr(bpmn_router.template_library, "match", lambda text: None)
+        monkeypatch.setattr(bpmn_router.parse_cache, "get", lambda text: None)
+
+        async def disconnect_after_first_event():
+            response = await bpmn_router.parse_process_stream(
+                bpmn_router.ParseRequest(text="A clerk checks the request and then files it."),
+                user={"role": "manager"},
+            )
+            first = await response.body_iterator.__anext__()
+            await response.body_iterator.aclose()  # what an abandoned response amounts to
+            return first
+
+        assert asyncio.run(disconnect_after_first_event())["event"] == "actor"
+        assert llm.closed and llm.sent < len(llm.chunks)
+
+
+# ---------------------------------------------------------------------------
+# Tiered model unit tests (no LLM)
+# ---------------------------------------------------------------------------
+
+class TestTieredParse:
+    @pytest.fixture
+    def stats(self, monkeypatch):
+        stats = TierStats()
+        monkeypatch.setattr(parser_module, "tier_stats", stats)
+        return stats
+
+    def _models(self, monkeypatch, responses: dict[str, str]) -> list[str]:
+        called = []
+
+        class FakeLLM:
+            def __init__(self, model):
+                self.model = model
+
+            def invoke(self, messages):
+                called.append(self.model)
+                return type("Response", (), {"content": responses[self.model]})()
+
+        monkeypatch.setattr(parser_module, "_llm", lambda model=LLM_MODEL: FakeLLM(model))
+        return called
+
+    def test_heuristic_prefers_small_model_for_short_linear_text(self):
+        assert is_simple(SIMPLE_TEXT, max_chars=1500, max_branches=2)
+        assert not is_simple(SIMPLE_TEXT, max_chars=100, max_branches=2)
+        assert not is_simple(SIMPLE_TEXT + " If urgent, escalate; else wait.",
+                             max_chars=1500, max_branches=2)
+
+    def test_cache_key_covers_both_models_and_the_tier_policy(self):
+        key = model_key(True, "small", "large", 1500, 2)
+        assert model_key(False, "small", "large", 1500, 2) == "large"
+        assert len({
+            key,
+            model_key(True, "small-2", "large", 1500, 2),
+            model_key(True, "small", "large-2", 1500, 2),
+            model_key(True, "small", "large", 800, 2),
+            model_key(True, "small", "large", 1500, 3),
+            model_key(False, "small", "large", 1500, 2),
+        }) == 6
+
+    def test_small_model_result_is_used_when_valid(self, sample_flow, stats, monkeypatch):
+        called = self._models(monkeypatch, {ROUTER_MODEL: sample_flow.model_dump_json()})
+        assert parser_module.parse_process_text(SIMPLE_TEXT).name == "Test Process"
+        assert called == [ROUTER_MODEL]
+        tiers = stats.stats()["tiers"]
+        assert tiers["small"]["successes"] == 1 and "large" not in tiers
+
+    def test_escalates_when_small_output_cannot_be_repaired(self, sample_flow, stats,
+                                                           monkeypatch):
+        called = self._models(monkeypatch, {
+            ROUTER_MODEL: '{"name": "x", "actors": []}',
+            LLM_MODEL: sample_flow.model_dump_json(),
+        })
+        assert parser_module.parse_process_text(SIMPLE_TEXT).name == "Test Process"
+        assert called == [ROUTER_MODEL, LLM_MODEL]
+        result = stats.stats()
+        assert result["escalations"] == 1
+        assert result["tiers"]["small"]["success_rate"] == 0
+        assert result["tiers"]["large"]["success_rate"] == 1
+
+    def test_escalates_when_small_output_needs_graph_repair(self, sample_flow, stats,
+                                                           monkeypatch):
+        dead_end = sample_flow.model_copy(update={"sequence_flows": sample_flow.sequence_flows[:3]})
+        called = self._models(monkeypatch, {
+            ROUTER_MODEL: dead_end.model_dump_json(),
+            LLM_MODEL: sample_flow.model_dump_json(),
+        })
+        process = parser_module.parse_process_text(SIMPLE_TEXT)
+        assert called == [ROUTER_MODEL, LLM_MODEL]
+        assert process.sequence_flows == sample_flow.sequence_flows
+        assert stats.stats()["tiers"]["small"]["successes"] == 0
+
+    def test_complex_text_goes_straight_to_large_model(self, sample_flow, stats, monkeypatch):
+        called = self._models(monkeypatch, {LLM_MODEL: sample_flow.model_dump_json()})
+        parser_module.parse_process_text(SIMPLE_TEXT * 20)
+        assert called == [LLM_MODEL]
+
+
+# ---------------------------------------------------------------------------
+# Parse cache unit tests (no server)
+# ---------------------------------------------------------------------------
+
+class TestParseCache:
+    def test_key_ignores_whitespace_and_case_but_not_model(self):
+        key = parse_cache_key(SIMPLE_TEXT, "model-a")
+        assert parse_cache_key("  " + SIMPLE_TEXT.upper().replace(" ", "\n  "), "model-a") == key
+        assert parse_cache_key(SIMPLE_TEXT, "model-b") != key
+        assert parse_cache_key(SIMPLE_TEXT, "model-a", prompt_version="other") != key
+        assert parse_cache_key(SIMPLE_TEXT, "model-a", xml_version="1-bfs") != key
+
+    def test_round_trip_and_lru_falls_back_to_disk(self, tmp_path, sample_flow):
+        cache = ParseCache(tmp_path / "parses.sqlite3", "model-a", max_entries=1)
+        assert cache.get(SIMPLE_TEXT) is None
+        xml = generate_bpmn_xml(sample_flow)
+        cache.put(SIMPLE_TEXT, sample_flow.model_dump(), xml)
+        cache.put("another process", {"name": "x"}, "<xml/>")  # evicts the first entry
+
+        hit = cache.get(SIMPLE_TEXT.lower())
+        assert hit["bpmn_xml"] == xml
+        assert ProcessFlow.model_validate(hit["process_json"]) == sample_flow
+        assert cache.get(SIMPLE_TEXT) is hit
+        assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1
+
+    def test_entries_survive_restart(self, tmp_path):
+        path = tmp_path / "parses.sqlite3"
+        first = ParseCache(path, "model-a")
+        first.put(SIMPLE_TEXT, {"name": "x"}, "<xml/>")
+        first.close()
+        assert ParseCache(path, "model-a").get(SIMPLE_TEXT)["bpmn_xml"] == "<xml/>"
+        assert ParseCache(path, "model-b").get(SIMPLE_TEXT) is None
+
+
+# ---------------------------------------------------------------------------
+# Template library unit tests (no server, fake parser)
+# ---------------------------------------------------------------------------
+
+class TestTemplateLibrary:
+    @pytest.fixture
+    def library(self, tmp_path):
+        (tmp_path / "support_flow.txt").write_text(SIMPLE_TEXT, encoding="utf-8")
+        return TemplateLibrary(tmp_path, "model-a")
+
+    def test_compiles_once_and_persists_next_to_text(self, library, sample_flow, tmp_path):
+        calls = []
+        parse = lambda text: calls.append(text) or sample_flow  # noqa: E731
+        assert library.compile_missing(parse) == ["support_flow"]
+        assert library.compile_missing(parse) == []
+        assert len(calls) == 1
+        assert (tmp_path / "support_flow.compiled.json").exists()
+
+        reopened = TemplateLibrary(tmp_path, "model-a")
+        template = reopened.get("support_flow")
+        assert template.compiled and template.name == "Support Flow"
+        assert template.bpmn_xml == generate_bpmn_xml(sample_flow)
+        assert reopened.match("  " + SIMPLE_TEXT.upper()) is template
+        assert not TemplateLibrary(tmp_path, "model-b").get("support_flow").compiled
+
+    def test_edited_text_is_stale_and_changes_etag(self, library, sample_flow, tmp_path):
+        library.compile_missing(lambda text: sample_flow)
+        listing_etag = library.listing[1]
+        (tmp_path / "support_flow.txt").write_text(SIMPLE_TEXT + " Extra step.", encoding="utf-8")
+        library.reload()
+        assert not library.get("support_flow").compiled
+        assert library.match(SIMPLE_TEXT) is None
+        assert library.listing[1] != listing_etag
+
+    def test_old_generator_output_is_redrawn_without_reparsing(self, library, sample_flow,
+                                                               tmp_path):
+        library.compile_missing(lambda text: sample_flow)
+        path = tmp_path / "support_flow.compiled.json"
+        compiled = json.loads(path.read_text(encoding="utf-8"))
+        path.write_text(json.dumps({**compiled, "xml_version": "1-bfs", "bpmn_xml": "<old/>"}),
+                        encoding="utf-8")
+        library.reload()
+        template = library.get("support_flow")
+        assert template.compiled
+        assert template.bpmn_xml == generate_bpmn_xml(sample_flow)
+
+
 # ---------------------------------------------------------------------------
 # API endpoint tests (require running server — fast, no LLM)
 # ---------------------------------------------------------------------------
@@ -213,6 +1075,87 @@ class TestBPMNEndpoints:
         )
         assert r.status_code == 422
 
+    def test_structured_text_parses_without_llm(self):
+        token = login("manager", "manager123")
+        r = httpx.post(
+            f"{BASE}/api/bpmn/parse", json={"text": LEAVE_TEXT}, headers=auth_headers(token)
+        )
+        assert r.status_code == 200
+        assert "bpmn:definitions" in r.json()["bpmn_xml"]
+        assert r.json()["process_json"]["name"] == "Leave request"
+
+    def test_long_document_parses_by_section(self):
+        token = login("manager", "manager123")
+        doc = "# Review SOP\n\n" + "\n".join(_phase(n) for n in range(1, 21))
+        assert len(doc) > 5000
+        r = httpx.post(
+            f"{BASE}/api/bpmn/parse/long", json={"text": doc},
+            headers=auth_headers(token), timeout=30,
+        )
+        assert r.status_code == 200
+        body = r.json()
+        assert body["sections"] in (0, 20)  # 0 when cached by an earlier run
+        assert len(body["process_json"]["activities"]) == 60
+        assert len(body["process_json"]["actors"]) == 2
+
+    def test_parse_stream_emits_elements_then_result(self):
+        token = login("manager", "manager123")
+        events = []
+        with httpx.stream(
+            "POST", f"{BASE}/api/bpmn/parse/stream", json={"text": LEAVE_TEXT},
+            headers=auth_headers(token), timeout=30,
+        ) as stream:
+            for line in stream.iter_lines():
+                if line.startswith("event:"):
+                    events.append(line.split(":", 1)[1].strip())
+        assert events[-2:] == ["result", "done"]
+        kinds = [e for e in events if e in ("actor", "element", "flow")]
+        assert kinds == sorted(kinds, key=["actor", "element", "flow"].index)
+        assert kinds.count("actor") == 3
+
+    def test_tier_stats_are_admin_only(self):
+        r = httpx.get(f"{BASE}/api/admin/bpmn-tiers",
+                      headers=auth_headers(login("admin", "admin123")))
+        assert r.status_code == 200
+        assert {"escalations", "tiers"} <= r.json().keys()
+        r = httpx.get(f"{BASE}/api/admin/bpmn-tiers",
+                      headers=auth_headers(login("manager", "manager123")))
+        assert r.status_code == 403
+
+    def test_batch_job_streams_items(self):
+        token = login("manager", "manager123")
+        items = [{"id": f"p{n}", "text": _phase(n)} for n in (1, 2)]
+        r = httpx.post(
+            f"{BASE}/api/bpmn/batches", json={"items": items, "concurrency": 2},
+            headers=auth_headers(token),
+        )
+        assert r.status_code == 202
+        job_id = r.json()["job"]["id"]
+
+        events = []
+        with httpx.stream(
+            "GET", f"{BASE}/api/bpmn/batches/{job_id}/events",
+            headers=auth_headers(token), timeout=30,
+        ) as stream:
+            for line in stream.iter_lines():
+                if line.startswith("event:"):
+                    events.append(line.split(":", 1)[1].strip())
+        assert events.count("item") == 2
+        assert events[-1] == "succeeded"
+
+        r = httpx.get(f"{BASE}/api/bpmn/batches/{job_id}", headers=auth_headers(token))
+        assert r.json()["counts"]["succeeded"] == 2
+        r = httpx.get(f"{BASE}/api/bpmn/batches/{job_id}/items", headers=auth_headers(token))
+        assert [i["id"] for i in r.json()["items"]] == ["p1", "p2"]
+
+    def test_viewer_cannot_start_batch(self):
+        token = login("viewer", "viewer123")
+        r = httpx.post(
+            f"{BASE}/api/bpmn/batches", json={"items": [{"text": _phase(1)}]},
+            headers=auth_headers(token),
+        )
+        assert r.status_code == 403
+
     def test_templates_endpoint_returns_list(self):
         token = login("admin", "admin123")
         r = httpx.get(f"{BASE}/api/bpmn/templates", headers=auth_headers(token))
@@ -229,6 +1172,18 @@ class TestBPMNEndpoints:
         names = [t["name"].lower() for t in r.json()]
         assert any("telco" in n for n in names)
 
+    def test_templates_etag_returns_304(self):
+        headers = auth_headers(login("viewer", "viewer123"))
+        r = httpx.get(f"{BASE}/api/bpmn/templates", headers=headers)
+        etag = r.headers["etag"]
+        r2 = httpx.get(f"{BASE}/api/bpmn/templates", headers={**headers, "If-None-Match": etag})
+        assert r2.status_code == 304
+
+    def test_unknown_template_returns_404(self):
+        token = login("viewer", "viewer123")
+        r = httpx.get(f"{BASE}/api/bpmn/templates/nope", headers=auth_headers(token))
+        assert r.status_code == 404
+
     def test_templates_requires_auth(self):
         r = httpx.get(f"{BASE}/api/bpmn/templates")
         assert r.status_code == 401
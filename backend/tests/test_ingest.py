@@ -0,0 +1,354 @@
+"""Ingestion pipeline unit tests.
+
+Covers the embedding cache and loaders without touching the real vector store.
+Run with: cd backend && pytest tests/test_ingest.py -v
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from src.embedding_cache import EmbeddingCache, cache_key, embed_with_cache
+from src.ingest_jobs import IngestBusyError, IngestJobManager
+
+
+class _CountingEmbedder:
+    """Fake embedding function that records which texts it was asked to embed."""
+
+    def __init__(self) -> None:
+        self.seen: list[str] = []
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.seen.extend(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+
+# ---------------------------------------------------------------------------
+# Embedding cache
+# ---------------------------------------------------------------------------
+
+class TestEmbeddingCache:
+    def test_key_depends_on_model(self):
+        assert cache_key("model-a", "text") != cache_key("model-b", "text")
+
+    def test_second_run_is_all_hits(self, tmp_path):
+        texts = ["alpha", "beta", "gamma"]
+        embed = _CountingEmbedder()
+        with EmbeddingCache(tmp_path / "cache.sqlite3") as cache:
+            first, computed = embed_with_cache(texts, embed, cache)
+            assert computed == 3
+        with EmbeddingCache(tmp_path / "cache.sqlite3") as cache:
+            second, computed = embed_with_cache(texts, embed, cache)
+            assert computed == 0
+        assert embed.seen == texts
+        for a, b in zip(first, second):
+            assert np.allclose(a, b)
+
+    def test_only_misses_are_embedded(self, tmp_path):
+        embed = _CountingEmbedder()
+        with EmbeddingCache(tmp_path / "cache.sqlite3") as cache:
+            embed_with_cache(["alpha", "beta"], embed, cache)
+            embed.seen.clear()
+            vectors, computed = embed_with_cache(["beta", "delta", "delta"], embed, cache)
+        assert computed == 1
+        assert embed.seen == ["delta"]
+        assert len(vectors) == 3
+        assert vectors[0][0] == 4.0 and vectors[2][0] == 5.0
+
+
+# ---------------------------------------------------------------------------
+# Excel loader
+# ---------------------------------------------------------------------------
+
+class TestExcelLoader:
+    def _workbook(self, path, rows: int):
+        import openpyxl
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Staff"
+        ws.append(["Name", "Team"])
+        for i in range(rows):
+            ws.append([f"Person {i}", "Ops" if i % 2 else None])
+        wb.save(path)
+
+    def test_rows_are_windowed_with_header_context(self, tmp_path):
+        from src.ingest import _load_excel
+
+        path = tmp_path / "staff.xlsx"
+        self._workbook(path, rows=7)
+        docs = _load_excel(path, rows_per_window=3)
+        assert len(docs) == 3
+        assert [(d.metadata["row_start"], d.metadata["row_end"]) for d in docs] == [
+            (2, 4), (5, 7), (8, 8),
+        ]
+        for doc in docs:
+            assert doc.page_content.startswith("Sheet: Staff\nColumns: Name | Team")
+        assert "Row 8: Name: Person 6" in docs[-1].page_content
+
+
+# ---------------------------------------------------------------------------
+# Incremental re-indexing
+# ---------------------------------------------------------------------------
+
+class _FakeCollection:
+    """The slice of the Chroma collection API reindex_files uses."""
+
+    def __init__(self, rows: dict[str, str]) -> None:
+        self.rows = dict(rows)  # id -> source
+
+    def get(self, where, include):
+        return {"ids": [i for i, src in self.rows.items() if src == where["source"]]}
+
+    def delete(self, ids=None, where=None):
+        for i in ids or [i for i, src in self.rows.items() if src == where["source"]]:
+            self.rows.pop(i, None)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.rows.update((i, m["source"]) for i, m in zip(ids, metadatas))
+
+
+class TestReindexFiles:
+    @pytest.fixture
+    def reindex(self, tmp_path, monkeypatch):
+        import src.ingest as ingest
+
+        doc = tmp_path / "policy.md"
+        doc.write_text("# Policy\n\nOne short section.", encoding="utf-8")
+        collection = _FakeCollection({f"{doc}#{n}": str(doc) for n in range(3)})
+        client = type("Client", (), {"get_collection": lambda self, **kw: collection})()
+        monkeypatch.setattr(ingest.chromadb, "PersistentClient", lambda path: client)
+        monkeypatch.setattr(ingest, "DefaultEmbeddingFunction", _CountingEmbedder)
+        monkeypatch.setattr(ingest, "EMBEDDING_CACHE_PATH", str(tmp_path / "emb.sqlite3"))
+        return ingest, doc, collection
+
+    def test_new_chunks_replace_old_and_stale_ids_are_dropped(self, reindex):
+        ingest, doc, collection = reindex
+        assert ingest.reindex_files([doc])["chunks"] == 1
+        assert collection.rows == {f"{doc}#0": str(doc)}
+
+    def test_repeated_chunk_texts_do_not_inflate_cache_hits(self, reindex, capsys):
+        from langchain_core.documents import Document
+
+        ingest, doc, collection = reindex
+        chunks = [Document(page_content="Same text", metadata={"source": str(doc), "page": 0})
+                  for _ in range(3)]
+        ingest._add_chunks(collection, chunks, _CountingEmbedder(), lambda *a, **kw: None)
+        assert "(1 unique texts: 1 computed, 0 from cache)" in capsys.readouterr().out
+
+    def test_failed_embedding_keeps_the_old_chunks(self, reindex, monkeypatch):
+        ingest, doc, collection = reindex
+        before = dict(collection.rows)
+
+        def failing(*args, **kwargs):
+            raise RuntimeError("embedding model unavailable")
+
+        monkeypatch.setattr(ingest, "embed_with_cache", failing)
+        with pytest.raises(RuntimeError):
+            ingest.reindex_files([doc])
+        assert collection.rows == before
+
+
+class TestOrgDiagrams:
+    def test_edits_held_only_in_sqlite_are_ingested(self, tmp_path):
+        from src.ingest import load_org_diagrams
+        from src.org_sqlite import SqliteBackend
+        from src.org_store import DiagramStore
+
+        backend = SqliteBackend(tmp_path / "org.sqlite3")
+        backend.import_diagram("org_chart", {
+            "diagram_type": "org_chart",
+            "nodes": [{"id": "ceo", "label": "CEO", "parent_id": None}],
+            "edges": [],
+        })
+        store = DiagramStore(backend)
+        heard = []
+        store.add_listener(heard.append)
+        store.apply("org_chart", [{"op": "update_node", "id": "ceo", "fields": {"label": "Chief"}}])
+        docs = load_org_diagrams(store)
+        backend.close()
+
+        assert heard == ["org_chart"]
+        assert not list(tmp_path.glob("*.json"))
+        assert "## Chief" in docs[0].page_content
+        assert docs[0].metadata["filename"] == "org_chart.json"
+
+    def test_journal_records_are_ingested_before_compaction(self, tmp_path):
+        import json
+
+        from src.ingest import load_org_diagrams
+        from src.org_journal import JournalBackend
+        from src.org_store import DiagramStore
+
+        snapshot = {"diagram_type": "org_chart", "nodes": [{"id": "ceo", "label": "CEO"}]}
+        (tmp_path / "org_chart.json").write_text(json.dumps(snapshot), encoding="utf-8")
+        store = DiagramStore(JournalBackend(tmp_path, compact_every=100), stat_interval=0)
+        store.apply("org_chart", [{"op": "update_node", "id": "ceo", "fields": {"label": "Chief"}}])
+
+        assert "CEO" in (tmp_path / "org_chart.json").read_text(encoding="utf-8")
+        assert "## Chief" in load_org_diagrams(store)[0].page_content
+
+
+# ---------------------------------------------------------------------------
+# Background ingest jobs
+# ---------------------------------------------------------------------------
+
+class TestIngestJobs:
+    def _blocking_target(self, release: threading.Event):
+        def target(job):
+            for i in range(100):
+                job.emit("progress", stage="load", file=f"f{i}")
+                job.check_cancelled()
+                if release.wait(0.01):
+                    break
+            return {"documents": 1, "chunks": 2}
+
+        return target
+
+    def _wait(self, job):
+        for _ in range(500):
+            if job.finished:
+                return
+            threading.Event().wait(0.01)
+        raise AssertionError("job did not finish")
+
+    def test_single_runner_lock(self):
+        manager = IngestJobManager()
+        release = threading.Event()
+        job = manager.submit(target=self._blocking_target(release))
+        with pytest.raises(IngestBusyError) as exc:
+            manager.submit(target=self._blocking_target(release))
+        assert exc.value.running is job
+        release.set()
+        self._wait(job)
+        assert job.status == "succeeded"
+        assert job.result == {"documents": 1, "chunks": 2}
+        assert job.duration_s is not None
+        # Lock is released once the job finishes
+        second = manager.submit(target=lambda j: {})
+        self._wait(second)
+        assert [j.id for j in manager.history()] == [second.id, job.id]
+
+    def test_concurrent_submits_start_one_job(self):
+        manager = IngestJobManager()
+        release = threading.Event()
+        barrier = threading.Barrier(8)
+        started, busy = [], []
+
+        def submit():
+            barrier.wait()
+            try:
+                started.append(manager.submit(target=self._blocking_target(release)))
+            except IngestBusyError:
+                busy.append(1)
+
+        threads = [threading.Thread(target=submit) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(started) == 1 and len(busy) == 7
+        release.set()
+        self._wait(started[0])
+        for _ in range(500):  # the slot frees only after the job has finished
+            if manager.running is None:
+                break
+            threading.Event().wait(0.01)
+        assert manager.running is None and started[0].finished
+
+    def test_cancel_stops_at_checkpoint(self):
+        manager = IngestJobManager()
+        job = manager.submit(target=self._blocking_target(threading.Event()))
+        job.cancel()
+        self._wait(job)
+        assert job.status == "cancelled"
+        assert job.events_since(0)[-1]["event"] == "cancelled"
+
+
+# ---------------------------------------------------------------------------
+# File watcher
+# ---------------------------------------------------------------------------
+
+class TestDirectoryWatcher:
+    @pytest.mark.parametrize("force_polling", [True, False])
+    def test_burst_is_debounced_into_one_callback(self, tmp_path, force_polling):
+        from src.watcher import DirectoryWatcher
+
+        calls: list[set] = []
+        done = threading.Event()
+
+        def on_change(paths):
+            calls.append(paths)
+            done.set()
+
+        watcher = DirectoryWatcher(
+            [tmp_path],
+            on_change,
+            path_filter=lambda p: p.suffix == ".md",
+            debounce=0.4,
+            poll_interval=0.1,
+            force_polling=force_polling,
+        ).start()
+        try:
+            threading.Event().wait(0.3)
+            for i in range(3):
+                (tmp_path / f"doc{i}.md").write_text(f"# Doc {i}")
+                (tmp_path / f"ignored{i}.txt").write_text("x")
+            assert done.wait(5), "watcher never fired"
+            threading.Event().wait(0.6)
+        finally:
+            watcher.stop()
+        assert len(calls) == 1
+        assert {p.name for p in calls[0]} == {"doc0.md", "doc1.md", "doc2.md"}
+
+
+# ---------------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------------
+
+class TestIngestProfile:
+    def test_stage_is_noop_without_profiler(self):
+        from src.ingest_profile import stage
+
+        with stage("chunking") as st:
+            st.items = 5  # accepted and discarded
+
+    def test_stages_accumulate_and_report_throughput(self, tmp_path):
+        import json
+
+        from src.ingest_profile import profiling, stage
+
+        with profiling(cprofile_dir=tmp_path / "prof") as profiler:
+            for _ in range(2):
+                with stage("load:markdown") as st:
+                    st.items = 3
+            with stage("chunking") as st:
+                st.items = 10
+        profiler.write_json(tmp_path / "report.json")
+
+        report = json.loads((tmp_path / "report.json").read_text())
+        assert report["stages"]["load:markdown"]["calls"] == 2
+        assert report["stages"]["load:markdown"]["items"] == 6
+        assert report["throughput"]["chunks_per_s"] is not None
+        assert report["throughput"]["embeddings_per_s"] is None
+        assert (tmp_path / "prof" / "load_markdown.prof").exists()
+
+    def test_memory_tracing_is_opt_in(self):
+        import tracemalloc
+
+        from src.ingest_profile import profiling, stage
+
+        with profiling() as profiler:
+            assert not tracemalloc.is_tracing()
+            with stage("chunking"):
+                pass
+        assert profiler.report()["stages"]["chunking"]["peak_mem_mb"] is None
+
+        with profiling(trace_memory=True) as profiler:
+            assert tracemalloc.is_tracing()
+            with stage("chunking"):
+                _ = [0] * 10_000
+        assert not tracemalloc.is_tracing()
+        assert profiler.report()["stages"]["chunking"]["peak_mem_mb"] > 0
+        assert profiler.report()["trace_memory"] is True
@@ -0,0 +1,499 @@
+"""Org diagram store unit tests.
+
+Exercise src/org_store.py against a temporary data/org directory — no server.
+Run with: cd backend && pytest tests/test_org_store.py -v
+"""
+
+import json
+import os
+import random
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.org_graph import Hierarchy, ancestors, children_page, descendants, edges_within
+from src.org_journal import JournalBackend
+from src.org_search import SearchIndex
+from src.org_sqlite import SqliteBackend, export_to_json, migrate_from_json
+from src.org_store import DiagramStore, JsonFileBackend, validate_ops
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+SAMPLE = {
+    "diagram_type": "org_chart",
+    "nodes": [
+        {"id": "ceo", "label": "CEO", "description": "Chief", "node_type": "person",
+         "parent_id": None, "permission_level": "public"},
+        {"id": "cto", "label": "CTO", "description": "Tech", "node_type": "person",
+         "parent_id": "ceo", "permission_level": "manager"},
+        {"id": "eng", "label": "Engineering", "description": "", "node_type": "department",
+         "parent_id": "cto", "permission_level": "admin"},
+    ],
+    "edges": [
+        {"id": "e1", "source_id": "ceo", "target_id": "cto", "label": "", "edge_type": "hierarchy"},
+        {"id": "e2", "source_id": "cto", "target_id": "eng", "label": "", "edge_type": "hierarchy"},
+    ],
+}
+
+
+@pytest.fixture
+def org_dir(tmp_path):
+    (tmp_path / "org_chart.json").write_text(json.dumps(SAMPLE), encoding="utf-8")
+    return tmp_path
+
+
+@pytest.fixture
+def store(org_dir):
+    return DiagramStore(JsonFileBackend(org_dir), stat_interval=0)
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+# ---------------------------------------------------------------------------
+# Caching and invalidation
+# ---------------------------------------------------------------------------
+
+class TestDiagramStoreCache:
+    def test_unchanged_file_is_served_from_memory(self, store):
+        first = store.get("org_chart")
+        assert store.get("org_chart") is first
+        assert set(first.nodes) == {"ceo", "cto", "eng"}
+
+    def test_external_edit_is_picked_up(self, store, org_dir):
+        first = store.get("org_chart")
+        data = dict(SAMPLE, nodes=SAMPLE["nodes"][:1], edges=[])
+        path = org_dir / "org_chart.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        _bump_mtime(path)
+        reloaded = store.get("org_chart")
+        assert reloaded is not first
+        assert list(reloaded.nodes) == ["ceo"]
+        assert reloaded.version > first.version
+
+    def test_missing_file_is_404(self, store):
+        with pytest.raises(HTTPException) as exc:
+            store.get("workflow")
+        assert exc.value.status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# Mutations
+# ---------------------------------------------------------------------------
+
+class TestDiagramStoreMutations:
+    def test_mutations_write_through(self, store, org_dir):
+        store.apply("org_chart", [
+            {"op": "update_node", "id": "cto", "fields": {"label": "Chief Tech"}},
+            {"op": "add_edge", "edge": {"id": "e3", "source_id": "ceo", "target_id": "eng",
+                                        "label": "", "edge_type": "hierarchy"}},
+        ])
+        on_disk = json.loads((org_dir / "org_chart.json").read_text(encoding="utf-8"))
+        assert {n["id"]: n["label"] for n in on_disk["nodes"]}["cto"] == "Chief Tech"
+        assert [e["id"] for e in on_disk["edges"]] == ["e1", "e2", "e3"]
+        # Our own write does not count as an external change
+        assert store.get("org_chart").nodes["cto"]["label"] == "Chief Tech"
+
+    def test_delete_node_removes_incident_edges(self, store):
+        store.apply("org_chart", [{"op": "delete_node", "id": "cto"}])
+        diagram = store.get("org_chart")
+        assert "cto" not in diagram.nodes
+        assert diagram.edges == {}
+
+    def test_update_replaces_node_dict(self, store):
+        before = store.get("org_chart").nodes["ceo"]
+        store.apply("org_chart", [{"op": "update_node", "id": "ceo", "fields": {"label": "Boss"}}])
+        assert before["label"] == "CEO"  # readers' snapshots are not mutated
+
+    def test_update_unknown_node_is_404(self, store):
+        with pytest.raises(HTTPException) as exc:
+            store.apply("org_chart", [{"op": "update_node", "id": "nope", "fields": {}}])
+        assert exc.value.status_code == 404
+
+
+class TestDiagramStoreBatches:
+    def test_batch_may_reference_ids_it_creates(self, store):
+        ops = [
+            {"op": "add_node", "node": {"id": "ops", "label": "Ops", "parent_id": "ceo"}},
+            {"op": "add_edge", "edge": {"id": "e3", "source_id": "ceo", "target_id": "ops"}},
+            {"op": "update_edge", "id": "e3", "fields": {"label": "runs"}},
+        ]
+        assert validate_ops(store.get("org_chart"), ops) == []
+        store.apply("org_chart", ops, validate=True)
+        assert store.get("org_chart").edges["e3"]["label"] == "runs"
+
+    def test_every_invalid_op_is_reported(self, store):
+        errors = validate_ops(store.get("org_chart"), [
+            {"op": "delete_node", "id": "cto"},  # also drops e1 and e2
+            {"op": "delete_edge", "id": "e2"},
+            {"op": "add_node", "node": {"id": "ceo", "label": "Dup"}},
+            {"op": "add_edge", "edge": {"id": "e9", "source_id": "ceo", "target_id": "cto"}},
+            {"op": "update_node", "id": "eng", "fields": {"parent_id": "cto"}},
+        ])
+        assert [e["index"] for e in errors] == [1, 2, 3, 4]
+
+    def test_rejected_batch_changes_nothing(self, store, org_dir):
+        before = (org_dir / "org_chart.json").read_text(encoding="utf-8")
+        diagram = store.get("org_chart")
+        with pytest.raises(HTTPException) as exc:
+            store.apply("org_chart", [
+                {"op": "delete_edge", "id": "e1"},
+                {"op": "update_node", "id": "nope", "fields": {}},
+            ], validate=True)
+        assert exc.value.status_code == 422
+        assert exc.value.detail["errors"][0]["index"] == 1
+        assert store.get("org_chart") is diagram
+        assert "e1" in diagram.edges
+        assert (org_dir / "org_chart.json").read_text(encoding="utf-8") == before
+
+    def test_failed_write_leaves_cache_untouched(self, store, monkeypatch):
+        diagram = store.get("org_chart")
+
+        def fail(*args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(store.backend, "save", fail)
+        with pytest.raises(OSError):
+            store.apply("org_chart", [{"op": "delete_node", "id": "ceo"}])
+        assert store.get("org_chart") is diagram
+        assert "ceo" in diagram.nodes
+
+
+class TestDiagramVersions:
+    def test_versions_never_repeat_after_invalidate(self, store):
+        v1 = store.get("org_chart").version
+        store.invalidate()
+        v2 = store.get("org_chart").version
+        store.apply("org_chart", [{"op": "delete_edge", "id": "e1"}])
+        v3 = store.get("org_chart").version
+        assert v1 < v2 < v3
+
+
+class TestChangeLog:
+    def test_changes_accumulate_across_versions(self, store):
+        v0 = store.get("org_chart").version
+        store.apply("org_chart", [{"op": "update_node", "id": "eng", "fields": {"label": "Eng"}}])
+        store.apply("org_chart", [{"op": "delete_node", "id": "cto"}])
+        diagram, nodes, edges = store.changes_since("org_chart", v0)
+        assert diagram.version == v0 + 2
+        assert nodes == {"eng", "cto"}
+        assert edges == {"e1", "e2"}  # removed with cto
+        _, nodes, edges = store.changes_since("org_chart", v0 + 1)
+        assert nodes == {"cto"}
+        assert store.changes_since("org_chart", v0 + 2)[1:] == (set(), set())
+
+    def test_unknown_or_reloaded_versions_need_a_reset(self, store, org_dir):
+        v0 = store.get("org_chart").version
+        assert store.changes_since("org_chart", v0 - 1)[1] is None
+        assert store.changes_since("org_chart", v0 + 99)[1] is None
+        path = org_dir / "org_chart.json"
+        path.write_text(json.dumps(SAMPLE), encoding="utf-8")
+        _bump_mtime(path)
+        assert store.changes_since("org_chart", v0)[1] is None
+
+    def test_versions_increase_across_store_instances(self, org_dir):
+        first = DiagramStore(JsonFileBackend(org_dir)).get("org_chart").version
+        time.sleep(0.01)  # a restart
+        second = DiagramStore(JsonFileBackend(org_dir)).get("org_chart").version
+        assert second > first
+
+
+# ---------------------------------------------------------------------------
+# SQLite backend
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def sqlite_backend(org_dir, tmp_path):
+    backend = SqliteBackend(tmp_path / "db" / "org.sqlite3")
+    migrate_from_json(backend, org_dir)
+    yield backend
+    backend.close()
+
+
+class TestSqliteBackend:
+    def test_migrate_preserves_order_and_meta(self, sqlite_backend):
+        data = sqlite_backend.load("org_chart")
+        assert data == SAMPLE
+
+    def test_mutations_are_row_level_and_persist(self, sqlite_backend, tmp_path):
+        store = DiagramStore(sqlite_backend, stat_interval=0)
+        store.apply("org_chart", [
+            {"op": "add_node", "node": {"id": "ops", "label": "Ops", "parent_id": "ceo"}},
+            {"op": "update_node", "id": "ops", "fields": {"label": "Operations"}},
+            {"op": "delete_node", "id": "cto"},
+        ])
+        reopened = SqliteBackend(sqlite_backend.path)
+        data = reopened.load("org_chart")
+        reopened.close()
+        assert [n["id"] for n in data["nodes"]] == ["ceo", "eng", "ops"]
+        assert data["nodes"][-1]["label"] == "Operations"
+        assert data["edges"] == []
+
+    def test_external_write_changes_fingerprint(self, sqlite_backend):
+        store = DiagramStore(sqlite_backend, stat_interval=0)
+        first = store.get("org_chart")
+        other = SqliteBackend(sqlite_backend.path)
+        other.import_diagram("org_chart", dict(SAMPLE, nodes=SAMPLE["nodes"][:1], edges=[]))
+        other.close()
+        assert list(store.get("org_chart").nodes) == ["ceo"]
+        assert store.get("org_chart") is not first
+
+    def test_failed_batch_leaves_database_untouched(self, sqlite_backend):
+        before = sqlite_backend.load("org_chart")
+        with pytest.raises(KeyError):
+            sqlite_backend.save(
+                DiagramStore(sqlite_backend).get("org_chart"),
+                [{"op": "delete_edge", "id": "e1"}, {"op": "add_edge", "edge": {"id": "bad"}}],
+                [None, None],
+            )
+        assert sqlite_backend.load("org_chart") == before
+
+    def test_export_round_trips(self, sqlite_backend, tmp_path):
+        out = tmp_path / "export"
+        assert export_to_json(sqlite_backend, out) == ["org_chart"]
+        assert json.loads((out / "org_chart.json").read_text(encoding="utf-8")) == SAMPLE
+
+
+# ---------------------------------------------------------------------------
+# Journal backend
+# ---------------------------------------------------------------------------
+
+RENAME_CTO = {"op": "update_node", "id": "cto", "fields": {"label": "Chief Tech"}}
+
+
+class TestJournalBackend:
+    def test_writes_append_to_journal_not_snapshot(self, org_dir):
+        store = DiagramStore(JournalBackend(org_dir, compact_every=100), stat_interval=0)
+        snapshot = (org_dir / "org_chart.json").read_text(encoding="utf-8")
+        store.apply("org_chart", [RENAME_CTO])
+        store.apply("org_chart", [{"op": "delete_edge", "id": "e2"}])
+
+        assert (org_dir / "org_chart.json").read_text(encoding="utf-8") == snapshot
+        lines = (org_dir / "org_chart.journal.jsonl").read_text(encoding="utf-8").splitlines()
+        ops = [json.loads(line)["ops"][0]["op"] for line in lines]
+        assert ops == ["update_node", "delete_edge"]
+
+        # A fresh process sees snapshot + replay
+        data = JournalBackend(org_dir).load("org_chart")
+        assert {n["id"]: n["label"] for n in data["nodes"]}["cto"] == "Chief Tech"
+        assert [e["id"] for e in data["edges"]] == ["e1"]
+
+    def test_compaction_folds_journal_into_snapshot(self, org_dir):
+        backend = JournalBackend(org_dir, compact_every=2, background=False)
+        store = DiagramStore(backend, stat_interval=0)
+        store.apply("org_chart", [RENAME_CTO])
+        store.apply("org_chart", [{"op": "delete_node", "id": "eng"}])
+
+        assert not (org_dir / "org_chart.journal.jsonl").exists()
+        on_disk = json.loads((org_dir / "org_chart.json").read_text(encoding="utf-8"))
+        assert [n["id"] for n in on_disk["nodes"]] == ["ceo", "cto"]
+        assert store.get("org_chart").nodes["cto"]["label"] == "Chief Tech"
+
+    def test_own_compaction_does_not_force_a_reload(self, org_dir):
+        backend = JournalBackend(org_dir, compact_every=100)
+        store = DiagramStore(backend, stat_interval=0)
+        before = store.get("org_chart").version
+        store.apply("org_chart", [RENAME_CTO])
+        store.apply("org_chart", [{"op": "delete_edge", "id": "e2"}])
+        assert backend.compact("org_chart") == 2  # as the background thread would
+        assert not (org_dir / "org_chart.journal.jsonl").exists()
+
+        diagram, nodes, edges = store.changes_since("org_chart", before)
+        assert nodes == {"cto"} and edges == {"e2"}  # a delta, not a reset
+        store.apply("org_chart", [{"op": "delete_edge", "id": "e1"}])
+        assert store.changes_since("org_chart", diagram.version)[2] == {"e1"}
+
+        # A snapshot written by someone else still triggers a reload
+        path = org_dir / "org_chart.json"
+        path.write_text(json.dumps(SAMPLE), encoding="utf-8")
+        _bump_mtime(path)
+        assert store.changes_since("org_chart", before)[1] is None
+
+    def test_torn_tail_and_interrupted_compaction_recover(self, org_dir):
+        # Simulate a crash after rotating the journal and mid-append on the new one
+        (org_dir / "org_chart.journal.compacting.jsonl").write_text(
+            json.dumps({"ops": [RENAME_CTO]}) + "\n", encoding="utf-8"
+        )
+        (org_dir / "org_chart.journal.jsonl").write_text(
+            json.dumps({"ops": [{"op": "delete_edge", "id": "e1"}]}) + "\n" + '{"ops": [{"op"',
+            encoding="utf-8",
+        )
+        backend = JournalBackend(org_dir)
+        data = backend.load("org_chart")
+        assert {n["id"]: n["label"] for n in data["nodes"]}["cto"] == "Chief Tech"
+        assert [e["id"] for e in data["edges"]] == ["e2"]
+
+        journal = org_dir / "org_chart.journal.jsonl"
+        assert journal.read_text(encoding="utf-8").endswith("\n")  # torn tail dropped
+
+        assert backend.compact("org_chart") == 1  # the leftover is folded first
+        assert backend.load("org_chart") == data
+
+
+# ---------------------------------------------------------------------------
+# Subgraph traversals
+# ---------------------------------------------------------------------------
+
+class TestSubgraphs:
+    def test_descendants_respect_depth_and_limit(self, store):
+        adj = store.get("org_chart").adjacency
+        assert descendants(adj, "ceo", 1, 100) == (["ceo", "cto"], False)
+        assert descendants(adj, "ceo", 5, 100) == (["ceo", "cto", "eng"], False)
+        assert descendants(adj, "ceo", 5, 2) == (["ceo", "cto"], True)
+
+    def test_ancestors_walk_to_root(self, store):
+        assert ancestors(store.get("org_chart").adjacency, "eng") == ["eng", "cto", "ceo"]
+
+    def test_flow_edges_join_adjacency_and_cycles_terminate(self, store):
+        store.apply("org_chart", [
+            {"op": "add_node", "node": {"id": "qa", "label": "QA", "parent_id": None}},
+            {"op": "add_edge", "edge": {"id": "e3", "source_id": "eng", "target_id": "qa"}},
+            {"op": "add_edge", "edge": {"id": "e4", "source_id": "qa", "target_id": "ceo"}},
+        ])
+        diagram = store.get("org_chart")
+        ids, _ = descendants(diagram.adjacency, "ceo", 10, 100)
+        assert ids == ["ceo", "cto", "eng", "qa"]
+        assert [e["id"] for e in edges_within(diagram.adjacency, diagram.edges, ids)] == [
+            "e1", "e2", "e3", "e4",
+        ]
+
+    def test_children_pages_and_index_rebuilt_per_version(self, store):
+        adj = store.get("org_chart").adjacency
+        assert children_page(adj, None, 0, 10) == (["ceo"], None)
+        store.apply("org_chart", [
+            {"op": "add_node", "node": {"id": f"d{i}", "label": "", "parent_id": "ceo"}}
+            for i in range(3)
+        ])
+        adj = store.get("org_chart").adjacency
+        assert children_page(adj, "ceo", 0, 2) == (["cto", "d0"], 2)
+        assert children_page(adj, "ceo", 2, 2) == (["d1", "d2"], None)
+
+
+# ---------------------------------------------------------------------------
+# Hierarchy index
+# ---------------------------------------------------------------------------
+
+def _index_state(hierarchy):
+    return (
+        hierarchy.parent, hierarchy.path, hierarchy.size,
+        {k: set(v) for k, v in hierarchy.children.items()},
+        {k: set(v) for k, v in hierarchy.dangling.items()},
+    )
+
+
+class TestHierarchy:
+    def test_queries(self, store):
+        h = store.get("org_chart").hierarchy
+        assert h.path["eng"] == ("ceo", "cto")
+        assert h.depth("eng") == 2
+        assert h.is_ancestor("ceo", "eng") and not h.is_ancestor("eng", "ceo")
+        assert h.size["ceo"] == 3
+        assert h.descendants("ceo") == ["cto", "eng"]
+
+    def test_reparent_into_own_subtree_is_rejected(self, store):
+        with pytest.raises(HTTPException) as exc:
+            store.apply("org_chart", [
+                {"op": "update_node", "id": "cto", "fields": {"parent_id": "eng"}},
+            ])
+        assert exc.value.status_code == 422
+        errors = validate_ops(store.get("org_chart"), [
+            {"op": "update_node", "id": "ceo", "fields": {"parent_id": "eng"}},
+        ])
+        assert "cycle" in errors[0]["detail"]
+
+    def test_older_versions_keep_their_index(self, store):
+        before = store.get("org_chart")
+        assert before.hierarchy.size["ceo"] == 3
+        store.apply("org_chart", [{"op": "delete_node", "id": "eng"}])
+        assert before.hierarchy.size["ceo"] == 3
+        assert store.get("org_chart").hierarchy.size["ceo"] == 2
+
+    def test_incremental_updates_match_a_fresh_build(self, store):
+        rng = random.Random(7)
+        store.get("org_chart").hierarchy  # build once, then maintain
+        for step in range(300):
+            diagram = store.get("org_chart")
+            ids = list(diagram.nodes)
+            roll = rng.random()
+            if roll < 0.45 or len(ids) < 3:
+                op = {"op": "add_node", "node": {
+                    "id": f"n{step}", "label": "", "parent_id": rng.choice(ids + [None, "gone"]),
+                }}
+            elif roll < 0.8:
+                node_id, parent_id = rng.choice(ids), rng.choice(ids + [None])
+                if diagram.hierarchy.would_cycle(node_id, parent_id):
+                    continue
+                op = {"op": "update_node", "id": node_id, "fields": {"parent_id": parent_id}}
+            else:
+                op = {"op": "delete_node", "id": rng.choice(ids)}
+            store.apply("org_chart", [op])
+            diagram = store.get("org_chart")
+            assert _index_state(diagram.hierarchy) == _index_state(Hierarchy(diagram.nodes))
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+ALL_LEVELS = ["public", "manager", "admin"]
+
+
+@pytest.fixture
+def index(store):
+    return SearchIndex(store, {"org_chart", "workflow"})  # workflow has no file
+
+
+def _ids(results):
+    return [r["id"] for r in results]
+
+
+class TestSearchIndex:
+    def test_exact_prefix_typo_and_description(self, index):
+        assert _ids(index.search("engineering", ALL_LEVELS)) == ["eng"]
+        assert _ids(index.search("eng", ALL_LEVELS)) == ["eng"]
+        assert _ids(index.search("enginering", ALL_LEVELS)) == ["eng"]
+        assert _ids(index.search("tech", ALL_LEVELS)) == ["cto"]
+        assert index.search("zzz", ALL_LEVELS) == []
+
+    def test_label_matches_rank_before_description_matches(self, index, store):
+        store.apply("org_chart", [
+            {"op": "add_node", "node": {"id": "ops", "label": "Ops",
+                                        "description": "Runs the CTO office",
+                                        "permission_level": "public"}},
+        ])
+        results = index.search("cto", ALL_LEVELS)
+        assert _ids(results) == ["cto", "ops"]
+        assert results[0]["score"] > results[1]["score"]
+
+    def test_restricted_nodes_never_match(self, index):
+        assert index.search("engineering", ["public", "manager"]) == []
+        assert index.search("tech", ["public"]) == []
+        assert _ids(index.search("c", ["public"])) == ["ceo"]
+
+    def test_filters_by_diagram_type(self, index):
+        assert index.search("ceo", ALL_LEVELS, diagram_types={"workflow"}) == []
+
+    def test_follows_store_mutations(self, index, store):
+        index.search("ceo", ALL_LEVELS)  # build
+        store.apply("org_chart", [
+            {"op": "update_node", "id": "eng", "fields": {"label": "Platform"}},
+            {"op": "delete_node", "id": "cto"},
+        ])
+        assert index.search("engineering", ALL_LEVELS) == []
+        assert _ids(index.search("plat", ALL_LEVELS)) == ["eng"]
+        assert index.search("cto", ALL_LEVELS) == []
+
+    def test_external_edit_rebuilds_diagram(self, index, store, org_dir):
+        index.search("ceo", ALL_LEVELS)
+        data = json.loads((org_dir / "org_chart.json").read_text())
+        data["nodes"][0]["label"] = "Founder"
+        path = org_dir / "org_chart.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        _bump_mtime(path)
+        assert index.search("ceo", ALL_LEVELS) == []
+        assert _ids(index.search("founder", ALL_LEVELS)) == ["ceo"]
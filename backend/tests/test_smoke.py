@@ -5,6 +5,7 @@ Run with: cd backend && pytest tests/test_smoke.py -v
 """
 
 import json
+import time
 import pytest
 import httpx
 
@@ -95,10 +96,200 @@ class TestOrgDiagrams:
         viewer_restricted  = sum(1 for n in r_viewer.json()["nodes"]  if n["data"]["is_restricted"])
         assert manager_restricted <= viewer_restricted, "Manager should have fewer (or equal) restricted nodes than viewer"
 
+    def test_etag_round_trip_returns_304(self):
+        headers = auth_headers(self.viewer_token)
+        r = httpx.get(f"{BASE}/api/org/diagram/org_chart", headers=headers)
+        assert r.status_code == 200
+        etag = r.headers["etag"]
+        r2 = httpx.get(
+            f"{BASE}/api/org/diagram/org_chart",
+            headers={**headers, "If-None-Match": etag},
+        )
+        assert r2.status_code == 304
+        assert r2.content == b""
+
+    def test_etag_differs_by_role(self):
+        url = f"{BASE}/api/org/diagram/org_chart"
+        r_admin = httpx.get(url, headers=auth_headers(self.admin_token))
+        r_viewer = httpx.get(url, headers=auth_headers(self.viewer_token))
+        assert r_admin.headers["etag"] != r_viewer.headers["etag"]
+        r = httpx.get(
+            url,
+            headers={**auth_headers(self.admin_token), "If-None-Match": r_viewer.headers["etag"]},
+        )
+        assert r.status_code == 200
+
     def test_invalid_diagram_type(self):
         r = httpx.get(f"{BASE}/api/org/diagram/nonexistent", headers=auth_headers(self.admin_token))
         assert r.status_code == 404
 
+    def test_subtree_is_role_filtered_and_depth_limited(self):
+        full = httpx.get(
+            f"{BASE}/api/org/diagram/org_chart", headers=auth_headers(self.viewer_token)
+        ).json()
+        roots = httpx.get(
+            f"{BASE}/api/org/diagram/org_chart/children", headers=auth_headers(self.viewer_token)
+        ).json()
+        root_id = roots["nodes"][0]["id"]
+        r = httpx.get(
+            f"{BASE}/api/org/diagram/org_chart/subtree/{root_id}?depth=1",
+            headers=auth_headers(self.viewer_token),
+        )
+        assert r.status_code == 200
+        data = r.json()
+        assert data["nodes"][0]["id"] == root_id
+        assert len(data["nodes"]) == 1 + data["nodes"][0]["data"]["child_count"]
+        # Same masking as the full diagram
+        by_id = {n["id"]: n for n in full["nodes"]}
+        for node in data["nodes"]:
+            assert node["data"]["label"] == by_id[node["id"]]["data"]["label"]
+
+    def test_children_cursor_pagination(self):
+        headers = auth_headers(self.admin_token)
+        url = f"{BASE}/api/org/diagram/org_chart/children"
+        root_id = httpx.get(url, headers=headers).json()["nodes"][0]["id"]
+        seen, cursor = [], None
+        while True:
+            params = {"parent_id": root_id, "limit": 1, **({"cursor": cursor} if cursor else {})}
+            page = httpx.get(url, params=params, headers=headers).json()
+            seen += [n["id"] for n in page["nodes"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == page["total"] == len(set(seen))
+
+    def test_ancestors_end_at_root(self):
+        headers = auth_headers(self.admin_token)
+        nodes = httpx.get(f"{BASE}/api/org/nodes/org_chart", headers=headers).json()["nodes"]
+        leaf = next(n for n in nodes if not any(c.get("parent_id") == n["id"] for c in nodes))
+        r = httpx.get(f"{BASE}/api/org/diagram/org_chart/ancestors/{leaf['id']}", headers=headers)
+        chain = [n["id"] for n in r.json()["nodes"]]
+        assert chain[0] == leaf["id"]
+        assert next(n for n in nodes if n["id"] == chain[-1])["parent_id"] is None
+
+    def test_hierarchy_info_and_relation(self):
+        headers = auth_headers(self.viewer_token)
+        nodes = httpx.get(
+            f"{BASE}/api/org/nodes/org_chart", headers=auth_headers(self.admin_token)
+        ).json()["nodes"]
+        child = next(n for n in nodes if n["parent_id"])
+        url = f"{BASE}/api/org/hierarchy/org_chart"
+        info = httpx.get(f"{url}/{child['id']}", headers=headers).json()
+        assert info["parent_id"] == child["parent_id"]
+        assert info["depth"] == len(info["ancestors"]) >= 1
+        assert info["ancestors"][-1]["id"] == child["parent_id"]
+        root_id = info["ancestors"][0]["id"]
+        root = httpx.get(f"{url}/{root_id}", headers=headers).json()
+        assert root["subtree_size"] == len(nodes)
+
+        r = httpx.get(
+            f"{url}/relation",
+            params={"node_id": child["id"], "ancestor_id": root_id},
+            headers=headers,
+        ).json()
+        assert r["is_under"] is True and r["distance"] == info["depth"]
+
+    def test_search_excludes_restricted_nodes(self):
+        admin, viewer = auth_headers(self.admin_token), auth_headers(self.viewer_token)
+        nodes = httpx.get(f"{BASE}/api/org/nodes/org_chart", headers=admin).json()["nodes"]
+        hidden = next(n for n in nodes if n["permission_level"] == "admin")
+        params = {"q": hidden["label"], "diagram_type": "org_chart"}
+        r = httpx.get(f"{BASE}/api/org/search", params=params, headers=admin)
+        assert r.status_code == 200
+        assert r.json()["results"][0]["id"] == hidden["id"]
+        r = httpx.get(f"{BASE}/api/org/search", params=params, headers=viewer)
+        assert hidden["id"] not in [res["id"] for res in r.json()["results"]]
+
+    def test_changes_since_current_version_is_empty(self):
+        headers = auth_headers(self.viewer_token)
+        r = httpx.get(f"{BASE}/api/org/diagram/org_chart", headers=headers)
+        version = int(r.headers["x-diagram-version"])
+        delta = httpx.get(
+            f"{BASE}/api/org/diagram/org_chart/changes", params={"since": version}, headers=headers
+        ).json()
+        assert delta["version"] == version and delta["reset"] is False
+        assert delta["nodes"] == {"upserted": [], "removed": []}
+        # An unknown version asks the client to re-fetch
+        stale = httpx.get(
+            f"{BASE}/api/org/diagram/org_chart/changes", params={"since": 1}, headers=headers
+        ).json()
+        assert stale["reset"] is True
+
+    def test_changes_long_poll_times_out(self):
+        headers = auth_headers(self.viewer_token)
+        r = httpx.get(f"{BASE}/api/org/diagram/org_chart", headers=headers)
+        version = int(r.headers["x-diagram-version"])
+        start = time.monotonic()
+        r = httpx.get(
+            f"{BASE}/api/org/diagram/org_chart/changes",
+            params={"since": version, "wait": 0.5},
+            headers=headers,
+        )
+        assert r.status_code == 200 and r.json()["version"] == version
+        assert time.monotonic() - start >= 0.5
+
+    def test_batch_requires_admin(self):
+        r = httpx.post(
+            f"{BASE}/api/org/batch/org_chart",
+            json={"operations": [{"op": "delete_edge", "id": "x"}]},
+            headers=auth_headers(self.viewer_token),
+        )
+        assert r.status_code == 403
+
+    def test_invalid_batch_is_rejected_whole(self):
+        headers = auth_headers(self.admin_token)
+        before = httpx.get(f"{BASE}/api/org/nodes/org_chart", headers=headers).json()
+        r = httpx.post(
+            f"{BASE}/api/org/batch/org_chart",
+            json={"operations": [
+                {"op": "create_node", "id": "batch-test", "label": "Batch test"},
+                {"op": "create_edge", "source_id": "batch-test", "target_id": "missing-node"},
+            ]},
+            headers=headers,
+        )
+        assert r.status_code == 422
+        assert [e["index"] for e in r.json()["detail"]["errors"]] == [1]
+        after = httpx.get(f"{BASE}/api/org/nodes/org_chart", headers=headers).json()
+        assert after == before
+
+
+# ---------------------------------------------------------------------------
+# Admin — ingest jobs
+# ---------------------------------------------------------------------------
+
+class TestAdminIngestJobs:
+    def test_viewer_cannot_list_jobs(self):
+        token = login("viewer", "viewer123")["token"]
+        r = httpx.get(f"{BASE}/api/admin/ingest/jobs", headers=auth_headers(token))
+        assert r.status_code == 403
+
+    def test_admin_lists_jobs(self):
+        token = login("admin", "admin123")["token"]
+        r = httpx.get(f"{BASE}/api/admin/ingest/jobs", headers=auth_headers(token))
+        assert r.status_code == 200
+        data = r.json()
+        assert isinstance(data["jobs"], list)
+        assert "running" in data
+
+    def test_unknown_job_returns_404(self):
+        token = login("admin", "admin123")["token"]
+        r = httpx.get(f"{BASE}/api/admin/ingest/jobs/nope", headers=auth_headers(token))
+        assert r.status_code == 404
+
+
+class TestAdminLoopLag:
+    def test_loop_lag_is_admin_only(self):
+        token = login("viewer", "viewer123")["token"]
+        r = httpx.get(f"{BASE}/api/admin/loop-lag", headers=auth_headers(token))
+        assert r.status_code == 403
+
+    def test_monitor_is_sampling(self):
+        token = login("admin", "admin123")["token"]
+        data = httpx.get(f"{BASE}/api/admin/loop-lag", headers=auth_headers(token)).json()
+        assert data["running"] is True
+        assert data["samples"] > 0
+        assert isinstance(data["recent_stalls"], list)
+
 
 # ---------------------------------------------------------------------------
 # Chat / RAG
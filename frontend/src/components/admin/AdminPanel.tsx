@@ -48,8 +48,17 @@ function DocumentsTab() {
     setIngesting(true);
     setIngestResult(null);
     try {
-      const result = await adminApi.triggerIngest();
-      setIngestResult(result.message);
+      const { job } = await adminApi.triggerIngest();
+      let current = job;
+      while (current.status === "queued" || current.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        current = await adminApi.getIngestJob(job.id);
+      }
+      if (current.status === "succeeded") {
+        setIngestResult(current.result.message ?? "Ingestion complete.");
+      } else {
+        setIngestResult(`Error: ingestion ${current.status}${current.error ? ` — ${current.error}` : ""}`);
+      }
     } catch (e) {
       setIngestResult(`Error: ${(e as Error).message}`);
     } finally {
@@ -1,4 +1,17 @@
-import type { DiagramResponse, DiagramType, OrgEdge, OrgNode } from "@/types/org";
+import type {
+  ChildrenPage,
+  DiagramChanges,
+  DiagramResponse,
+  DiagramType,
+  HierarchyInfo,
+  OrgBatchOperation,
+  OrgBatchResponse,
+  OrgEdge,
+  OrgNode,
+  SearchResult,
+  SubgraphResponse,
+  SubtreeResponse,
+} from "@/types/org";
 
 export interface DocumentInfo {
   name: string;
@@ -7,6 +20,15 @@ export interface DocumentInfo {
   last_modified: string;
 }
 
+export interface IngestJob {
+  id: string;
+  kind: string;
+  status: "queued" | "running" | "succeeded" | "failed" | "cancelled";
+  duration_s: number | null;
+  result: { documents?: number; chunks?: number; message?: string };
+  error: string | null;
+}
+
 const BASE =
   process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
@@ -68,6 +90,24 @@ export const orgApi = {
   getDiagram: (type: DiagramType) =>
     apiFetch<DiagramResponse>(`/api/org/diagram/${type}`),
 
+  /** Long-polls for up to `wait` seconds when nothing changed since `since`. */
+  getChanges: (type: DiagramType, since: number, wait = 0) =>
+    apiFetch<DiagramChanges>(`/api/org/diagram/${type}/changes?since=${since}&wait=${wait}`),
+
+  getSubtree: (type: DiagramType, nodeId: string, depth = 1) =>
+    apiFetch<SubtreeResponse>(`/api/org/diagram/${type}/subtree/${nodeId}?depth=${depth}`),
+
+  getAncestors: (type: DiagramType, nodeId: string) =>
+    apiFetch<SubgraphResponse>(`/api/org/diagram/${type}/ancestors/${nodeId}`),
+
+  /** Children of `parentId` (or the roots), one page at a time. */
+  getChildren: (type: DiagramType, parentId?: string, cursor?: string, limit = 50) => {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (parentId) params.set("parent_id", parentId);
+    if (cursor) params.set("cursor", cursor);
+    return apiFetch<ChildrenPage>(`/api/org/diagram/${type}/children?${params}`);
+  },
+
   getNodes: (type: DiagramType) =>
     apiFetch<{ nodes: OrgNode[]; edges: OrgEdge[] }>(`/api/org/nodes/${type}`),
 
@@ -83,8 +123,20 @@ export const orgApi = {
       body: JSON.stringify(body),
     }),
 
-  deleteNode: (type: DiagramType, id: string) =>
-    apiFetch<void>(`/api/org/nodes/${type}/${id}`, { method: "DELETE" }),
+  deleteNode: (type: DiagramType, id: string, cascade = false) =>
+    apiFetch<void>(`/api/org/nodes/${type}/${id}${cascade ? "?cascade=true" : ""}`, {
+      method: "DELETE",
+    }),
+
+  /** Search node labels and descriptions across diagrams (prefixes and typos match). */
+  search: (query: string, type?: DiagramType, limit = 20) => {
+    const params = new URLSearchParams({ q: query, limit: String(limit) });
+    if (type) params.set("diagram_type", type);
+    return apiFetch<{ query: string; results: SearchResult[] }>(`/api/org/search?${params}`);
+  },
+
+  getHierarchy: (type: DiagramType, nodeId: string) =>
+    apiFetch<HierarchyInfo>(`/api/org/hierarchy/${type}/${nodeId}`),
 
   createEdge: (type: DiagramType, body: Omit<OrgEdge, "id">) =>
     apiFetch<OrgEdge>(`/api/org/edges/${type}`, {
@@ -94,6 +146,13 @@ export const orgApi = {
 
   deleteEdge: (type: DiagramType, id: string) =>
     apiFetch<void>(`/api/org/edges/${type}/${id}`, { method: "DELETE" }),
+
+  /** Apply many edits in one all-or-nothing request (422 lists invalid ops). */
+  applyBatch: (type: DiagramType, operations: OrgBatchOperation[]) =>
+    apiFetch<OrgBatchResponse>(`/api/org/batch/${type}`, {
+      method: "POST",
+      body: JSON.stringify({ operations }),
+    }),
 };
 
 export const adminApi = {
@@ -103,20 +162,122 @@ export const adminApi = {
     apiFetch<{ documents: DocumentInfo[]; count: number }>("/api/admin/documents"),
 
   triggerIngest: () =>
-    apiFetch<{ status: string; documents: number; chunks: number; message: string }>(
+    apiFetch<{ status: string; job: IngestJob; message: string }>(
       "/api/admin/ingest",
       { method: "POST" }
     ),
+
+  getIngestJob: (id: string) => apiFetch<IngestJob>(`/api/admin/ingest/jobs/${id}`),
+
+  /** BPMN parse success rate and latency per model tier ("small", "large"). */
+  getBpmnTiers: () =>
+    apiFetch<{
+      enabled: boolean;
+      escalations: number;
+      tiers: Record<string, {
+        model: string;
+        attempts: number;
+        successes: number;
+        success_rate: number;
+        mean_ms: number;
+        p95_ms: number;
+      }>;
+    }>("/api/admin/bpmn-tiers"),
 };
 
 export interface BPMNTemplate {
+  id: string;
   name: string;
   text: string;
+  compiled: boolean;
+}
+
+export interface BPMNCompiledTemplate extends BPMNTemplate {
+  bpmn_xml: string;
+  process_json: object;
 }
 
 export interface BPMNParseResult {
   bpmn_xml: string;
   process_json: object;
+  /** True when served from the parse cache without calling the LLM. */
+  cached: boolean;
+  /** Long documents only: how many sections were parsed (0 when cached). */
+  sections?: number;
+}
+
+export interface BPMNBatchItemResult {
+  index: number;
+  id: string;
+  status: "pending" | "succeeded" | "failed";
+  /** "rules", "cache" or "llm" — which parser produced the result. */
+  source: string | null;
+  attempts: number;
+  error: string | null;
+  bpmn_xml: string | null;
+  process_json: object | null;
+}
+
+export interface BPMNBatch extends Omit<IngestJob, "result"> {
+  result: { total?: number; succeeded?: number; failed?: number; pending?: number };
+  counts?: { total: number; succeeded: number; failed: number; pending: number };
+}
+
+/** A parsed item from /api/bpmn/parse/stream, in the order the model wrote it. */
+export type BPMNStreamEvent =
+  | { event: "actor"; data: { id: string; name: string; description: string } }
+  | { event: "element"; data: { kind: "event" | "activity" | "gateway"; id: string; name: string; lane_id: string } }
+  | { event: "flow"; data: { id: string; source_id: string; target_id: string; condition_label: string | null } };
+
+/**
+ * POST to an SSE endpoint and hand each event to `onEvent` as it arrives.
+ * Resolves with the "result" event's data; rejects on an "error" event.
+ */
+async function apiStream<T>(
+  path: string,
+  body: unknown,
+  onEvent: (evt: { event: string; data: unknown }) => void
+): Promise<T> {
+  const token = typeof window !== "undefined" ? _getToken() : "";
+  const res = await fetch(`${BASE}${path}`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(body),
+  });
+  if (res.status === 401) {
+    localStorage.removeItem("pulse_auth");
+    window.location.replace("/login");
+    throw new Error("Session expired");
+  }
+  if (!res.ok || !res.body) throw new Error(`API ${res.status}: ${await res.text()}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let event = "message";
+  let result: T | undefined;
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split(/\r?\n/);
+    buffer = lines.pop() ?? "";
+    for (const line of lines) {
+      if (line.startsWith("event:")) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith("data:")) {
+        const data = JSON.parse(line.slice(5).trim());
+        if (event === "error") throw new Error(`API ${data.status}: ${data.error}`);
+        if (event === "result") result = data as T;
+        else onEvent({ event, data });
+      }
+    }
+  }
+  if (result === undefined) throw new Error("Stream ended without a result");
+  return result;
 }
 
 export const bpmnApi = {
@@ -126,5 +287,38 @@ export const bpmnApi = {
       body: JSON.stringify({ text }),
     }),
 
+  /** Like `parse`, but reports actors, elements and flows as the model writes them. */
+  parseStream: (text: string, onEvent: (evt: BPMNStreamEvent) => void) =>
+    apiStream<BPMNParseResult>("/api/bpmn/parse/stream", { text }, (evt) => {
+      if (evt.event !== "done") onEvent(evt as BPMNStreamEvent);
+    }),
+
+  /** Documents over 5,000 characters, parsed section by section. */
+  parseLong: (text: string) =>
+    apiFetch<BPMNParseResult>("/api/bpmn/parse/long", {
+      method: "POST",
+      body: JSON.stringify({ text }),
+    }),
+
+  /** Parse many texts as a background job; follow /api/bpmn/batches/{id}/events. */
+  createBatch: (items: { id?: string; text: string }[], concurrency?: number) =>
+    apiFetch<{ job: BPMNBatch; message: string }>("/api/bpmn/batches", {
+      method: "POST",
+      body: JSON.stringify({ items, concurrency }),
+    }),
+
+  getBatch: (id: string) => apiFetch<BPMNBatch>(`/api/bpmn/batches/${id}`),
+
+  getBatchItems: (id: string, offset = 0, limit = 100) =>
+    apiFetch<{ items: BPMNBatchItemResult[] }>(
+      `/api/bpmn/batches/${id}/items?offset=${offset}&limit=${limit}`
+    ),
+
+  cancelBatch: (id: string) =>
+    apiFetch<BPMNBatch>(`/api/bpmn/batches/${id}/cancel`, { method: "POST" }),
+
   getTemplates: () => apiFetch<BPMNTemplate[]>("/api/bpmn/templates"),
+
+  /** A template with its precompiled diagram (no LLM call). */
+  getTemplate: (id: string) => apiFetch<BPMNCompiledTemplate>(`/api/bpmn/templates/${id}`),
 };
@@ -37,6 +37,25 @@ export interface DiagramResponse {
   edges: FlowEdge[];
 }
 
+/** Partial diagram from the subtree/ancestors/children endpoints. */
+export interface SubgraphResponse {
+  diagram_type: DiagramType;
+  nodes: (FlowNode & { data: FlowNodeData & { child_count: number; subtree_size: number } })[];
+  edges: FlowEdge[];
+}
+
+export interface SubtreeResponse extends SubgraphResponse {
+  root_id: string;
+  depth: number;
+  truncated: boolean;
+}
+
+export interface ChildrenPage extends SubgraphResponse {
+  parent_id: string | null;
+  total: number;
+  next_cursor: string | null;
+}
+
 export interface OrgNode {
   id: string;
   label: string;
@@ -53,3 +72,46 @@ export interface OrgEdge {
   label?: string;
   edge_type: string;
 }
+
+export type OrgBatchOperation =
+  | ({ op: "create_node"; id?: string } & Omit<OrgNode, "id">)
+  | ({ op: "update_node"; id: string } & Partial<Omit<OrgNode, "id">>)
+  | { op: "delete_node"; id: string }
+  | ({ op: "create_edge"; id?: string } & Omit<OrgEdge, "id">)
+  | ({ op: "update_edge"; id: string } & Partial<Omit<OrgEdge, "id">>)
+  | { op: "delete_edge"; id: string };
+
+export interface OrgBatchResponse {
+  diagram_type: DiagramType;
+  applied: number;
+  version: number;
+  results: (OrgNode | OrgEdge | null)[];
+}
+
+export interface HierarchyInfo {
+  id: string;
+  parent_id: string | null;
+  depth: number;
+  /** Root first. */
+  ancestors: { id: string; label: string; is_restricted: boolean }[];
+  child_count: number;
+  subtree_size: number;
+}
+
+/** Delta from GET /api/org/diagram/{type}/changes; re-fetch the diagram when `reset`. */
+export interface DiagramChanges {
+  diagram_type: DiagramType;
+  version: number;
+  since: number;
+  reset: boolean;
+  nodes?: { upserted: FlowNode[]; removed: string[] };
+  edges?: { upserted: FlowEdge[]; removed: string[] };
+}
+
+/** One hit from GET /api/org/search; higher `score` is a closer match. */
+export interface SearchResult {
+  diagram_type: DiagramType;
+  id: string;
+  label: string;
+  score: number;
+}